@@ -2,9 +2,42 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
 import csv
 import os
-import math
 import json
-from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageTk, ImageDraw, ImageOps
+import page_output
+import render_profile
+import font_registry
+import text_sprites
+import image_assets
+from spatial_index import SpatialIndex
+
+def _union(a, b):
+    """两个矩形(x0, y0, x1, y1)的外接矩形，None视为空"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_boxes(boxes):
+    """合并相交的矩形，避免同一区域重绘多次"""
+    merged = []
+    for box in boxes:
+        while True:
+            for i, other in enumerate(merged):
+                if _intersects(box, other):
+                    box = _union(box, merged.pop(i))
+                    break
+            else:
+                break
+        merged.append(box)
+    return merged
+
 
 class BarcodeDesigner:
     def __init__(self, root):
@@ -58,6 +91,11 @@ class BarcodeDesigner:
             'rotation': 0
         }
         
+        # 变换后的文字图块缓存：相同文字只渲染一次
+        self.text_sprites = text_sprites.TextSpriteCache()
+        # 叠加图片缓存：预览和导出共用，图片文件修改后自动重新加载
+        self.image_assets = image_assets.ImageAssetCache()
+        
         # 创建界面
         self.create_widgets()
         
@@ -67,6 +105,9 @@ class BarcodeDesigner:
                                       int(self.a4_height_mm * self.scale)), 
                                      'white')
         self.draw = ImageDraw.Draw(self.canvas_image)
+        self._grid_cache = None   # ((尺寸, 缩放), 网格图层)
+        self.label_bounds = []    # 每个标签在预览画布上的外接矩形，用于局部重绘
+        self.label_index = SpatialIndex(10)  # 标签矩形（毫米）的空间索引，用于点选
         self.update_canvas()
     
     def px_to_mm(self, px):
@@ -84,6 +125,7 @@ class BarcodeDesigner:
         file_menu.add_command(label="导入CSV数据", command=self.import_csv)
         file_menu.add_command(label="保存设计", command=self.save_design)
         file_menu.add_command(label="导出为图片", command=self.export_as_image)
+        file_menu.add_command(label="导出为单色图片(1位PNG/TIFF)", command=lambda: self.export_as_image(monochrome=True))
         file_menu.add_separator()
         file_menu.add_command(label="退出", command=self.root.quit)
         menubar.add_cascade(label="文件", menu=file_menu)
@@ -320,6 +362,8 @@ class BarcodeDesigner:
                 self.labels[self.selected_label]['width'] = new_width
                 self.labels[self.selected_label]['height'] = new_height
                 self.status_var.set(f"已更新选中标签尺寸为 {new_width}×{new_height}mm")
+                self.redraw_labels([self.selected_label])
+                return
             else:
                 self.barcode_width = new_width
                 self.barcode_height = new_height
@@ -352,23 +396,21 @@ class BarcodeDesigner:
         x = event.x / (self.scale * self.zoom_factor)
         y = event.y / (self.scale * self.zoom_factor)
         
-        for i, label in enumerate(self.labels):
-            half_w = label['width'] / 2
-            half_h = label['height'] / 2
-            x1 = label['x'] - half_w
-            y1 = label['y'] - half_h
-            x2 = label['x'] + half_w
-            y2 = label['y'] + half_h
-            
-            if x1 <= x <= x2 and y1 <= y <= y2:
-                self.selected_label = i
-                self.update_selected_label_info()
-                self.redraw_all_labels()
-                return
+        # 空间索引只检查点击位置所在格子里的标签；重叠时取序号最小的一个（与原来按顺序扫描一致）
+        # 选中变化只重绘前后两个标签
+        previous = self.selected_label
+        hits = self.label_index.query_point(x, y)
+        if hits:
+            i = hits[0]
+            self.selected_label = i
+            self.update_selected_label_info()
+            self.redraw_labels([j for j in (previous, i) if j is not None])
+            return
         
         self.selected_label = None
         self.selected_label_info.config(text="无")
-        self.redraw_all_labels()
+        if previous is not None:
+            self.redraw_labels([previous])
     
     def update_selected_label_info(self):
         """更新选中标签信息"""
@@ -381,50 +423,115 @@ class BarcodeDesigner:
             self.selected_label_info.config(text=info_text)
     
     def redraw_all_labels(self):
-        """重绘所有标签"""
-        self.canvas_image = Image.new('RGB', 
-                                     (int(self.a4_width_mm * self.scale * self.zoom_factor), 
-                                      int(self.a4_height_mm * self.scale * self.zoom_factor)), 
-                                     'white')
+        """重绘所有标签（缩放、导入数据或全局设置变化时调用）"""
+        self.canvas_image = self._grid_layer().copy()
         self.draw = ImageDraw.Draw(self.canvas_image)
         
-        self._draw_grid()
+        self.label_bounds = [self._draw_label(i, label) for i, label in enumerate(self.labels)]
+        self.label_index = SpatialIndex(10, ((i, self._label_rect(label)) for i, label in enumerate(self.labels)))
         
-        for i, label in enumerate(self.labels):
-            half_w = label['width'] / 2
-            half_h = label['height'] / 2
-            x1 = label['x'] - half_w
-            y1 = label['y'] - half_h
-            x2 = label['x'] + half_w
-            y2 = label['y'] + half_h
-            
-            scale = self.scale * self.zoom_factor
-            px1 = x1 * scale
-            py1 = y1 * scale
-            px2 = x2 * scale
-            py2 = y2 * scale
-            
+        self.update_canvas()
+    
+    def redraw_labels(self, indices):
+        """只重绘指定标签（选中、移动或单独修改后调用）
+        
+        脏区域为这些标签重绘前后外接矩形的并集。每个脏区域先恢复网格背景，
+        再按原顺序重绘与之相交的所有标签，最后只保留区域内的结果，与整体重绘逐像素一致。
+        """
+        if len(self.label_bounds) != len(self.labels):
+            self.redraw_all_labels()
+            return
+        
+        dirty = []
+        for i in set(indices):
+            old = self.label_bounds[i]
+            self.label_bounds[i] = self._label_extent(i)
+            dirty.append(_union(old, self.label_bounds[i]))
+            self.label_index.update(i, self._label_rect(self.labels[i]))
+        
+        grid = self._grid_layer()
+        width, height = self.canvas_image.size
+        for box in _merge_boxes(dirty):
+            box = (max(0, box[0]), max(0, box[1]), min(width, box[2]), min(height, box[3]))
+            if box[0] >= box[2] or box[1] >= box[3]:
+                continue
+            hits = [i for i, bounds in enumerate(self.label_bounds) if _intersects(bounds, box)]
+            # 相交的标签会画到区域外面，先保存区域外受影响的部分，画完再还原
+            extent = box
+            for i in hits:
+                extent = _union(extent, self.label_bounds[i])
+            extent = (max(0, extent[0]), max(0, extent[1]), min(width, extent[2]), min(height, extent[3]))
+            saved = self.canvas_image.crop(extent)
+            
+            self.canvas_image.paste(grid.crop(box), box[:2])
+            for i in hits:
+                self._draw_label(i, self.labels[i])
+            region = self.canvas_image.crop(box)
+            self.canvas_image.paste(saved, extent[:2])
+            self.canvas_image.paste(region, box[:2])
+        
+        self.update_canvas()
+    
+    def _label_rect(self, label):
+        """标签矩形(x0, y0, x1, y1)，单位毫米"""
+        half_w = label['width'] / 2
+        half_h = label['height'] / 2
+        return (label['x'] - half_w, label['y'] - half_h, label['x'] + half_w, label['y'] + half_h)
+    
+    def _grid_layer(self):
+        """当前缩放下的空白网格图层（缓存，缩放变化时重建）"""
+        size = (int(self.a4_width_mm * self.scale * self.zoom_factor),
+                int(self.a4_height_mm * self.scale * self.zoom_factor))
+        if self._grid_cache is None or self._grid_cache[0] != (size, self.zoom_factor):
+            layer = Image.new('RGB', size, 'white')
+            self._draw_grid(ImageDraw.Draw(layer))
+            self._grid_cache = ((size, self.zoom_factor), layer)
+        return self._grid_cache[1]
+    
+    def _label_extent(self, index):
+        """第index个标签在预览画布上的外接矩形（不绘制）"""
+        return self._draw_label(index, self.labels[index], measure_only=True)
+    
+    def _draw_label(self, index, label, measure_only=False):
+        """在预览画布上绘制一个标签（框、中心点、文字、图片），返回外接矩形(x0, y0, x1, y1)"""
+        half_w = label['width'] / 2
+        half_h = label['height'] / 2
+        x1 = label['x'] - half_w
+        y1 = label['y'] - half_h
+        x2 = label['x'] + half_w
+        y2 = label['y'] + half_h
+        
+        scale = self.scale * self.zoom_factor
+        px1 = x1 * scale
+        py1 = y1 * scale
+        px2 = x2 * scale
+        py2 = y2 * scale
+        
+        center_x = label['x'] * scale
+        center_y = label['y'] * scale
+        bounds = _union((px1, py1, px2, py2), (center_x - 3, center_y - 3, center_x + 3, center_y + 3))
+        
+        if not measure_only:
             # 绘制条码区域（仅预览用）
-            color = (255, 0, 0) if i == self.selected_label else (0, 0, 0)
+            color = (255, 0, 0) if index == self.selected_label else (0, 0, 0)
             self.draw.rectangle([px1, py1, px2, py2], outline=color, width=2)
             
             # 绘制中心点（仅预览用）
-            center_x = label['x'] * scale
-            center_y = label['y'] * scale
             self.draw.ellipse([
                 center_x - 3, 
                 center_y - 3,
                 center_x + 3, 
                 center_y + 3
             ], fill=(0, 255, 0))
-            
-            # 绘制文字标签
-            self._draw_label_text(label, scale)
-            
-            # 绘制图片
-            self._draw_label_image(label, scale)
         
-        self.update_canvas()
+        # 绘制文字标签
+        bounds = _union(bounds, self._draw_label_text(label, scale, measure_only))
+        
+        # 绘制图片
+        bounds = _union(bounds, self._draw_label_image(label, scale, measure_only))
+        
+        # 取整并留出抗锯齿和取整误差的余量
+        return (int(bounds[0]) - 2, int(bounds[1]) - 2, int(bounds[2]) + 3, int(bounds[3]) + 3)
     
     def _replace_placeholders(self, text, label_data):
         """替换文本中的所有占位符"""
@@ -436,10 +543,19 @@ class BarcodeDesigner:
                 result = result.replace(placeholder, str(value))
         return result
     
-    def _draw_label_text(self, label, scale):
-        """绘制标签文字"""
+    def _text_sprite(self, display_text, font_size):
+        """按当前全局文字设置取变换后的文字图块（RGBA，缓存）"""
+        settings = self.global_text_settings
+        return self.text_sprites.get(
+            display_text, settings['font'], font_size, settings['color'],
+            scale=(settings['scale_x'], settings['scale_y']),
+            skew=(settings['skew_x'], settings['skew_y']),
+            rotation=settings['rotation'])
+    
+    def _draw_label_text(self, label, scale, measure_only=False):
+        """绘制标签文字，返回所占矩形（没有文字时返回None）"""
         if not self.global_text_settings['text']:
-            return
+            return None
             
         try:
             # 替换所有占位符
@@ -449,154 +565,99 @@ class BarcodeDesigner:
             text_x = (label['x'] + self.global_text_settings['x_offset']) * scale
             text_y = (label['y'] + self.global_text_settings['y_offset']) * scale
             
-            # 准备字体
-            font_size = int(self.global_text_settings['font_size'] * self.zoom_factor)
-            # 尝试加载指定字体，失败则使用默认字体
-            try:
-                font = ImageFont.truetype(f"{self.global_text_settings['font']}.ttf", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype(self.global_text_settings['font'], font_size)
-                except:
-                    font = ImageFont.load_default()
-            
-            # 创建临时图像用于绘制变换文字
-            text_bbox = self.draw.textbbox((0, 0), display_text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            temp_img = Image.new('RGBA', (text_width + 10, text_height + 10), (255, 255, 255, 0))
-            temp_draw = ImageDraw.Draw(temp_img)
-            temp_draw.text((5, 5), display_text, font=font, fill=self.global_text_settings['color'] + (255,))
-            
-            # 应用缩放
-            if self.global_text_settings['scale_x'] != 1.0 or self.global_text_settings['scale_y'] != 1.0:
-                temp_img = temp_img.resize(
-                    (int(temp_img.width * self.global_text_settings['scale_x']),
-                     int(temp_img.height * self.global_text_settings['scale_y'])),
-                    Image.Resampling.LANCZOS
-                )
-            
-            # 应用倾斜
-            if self.global_text_settings['skew_x'] != 0 or self.global_text_settings['skew_y'] != 0:
-                temp_img = self._skew_image(temp_img, self.global_text_settings['skew_x'], self.global_text_settings['skew_y'])
-            
-            # 应用旋转
-            if self.global_text_settings['rotation'] != 0:
-                temp_img = temp_img.rotate(self.global_text_settings['rotation'], expand=True)
+            # 取变换后的文字图块（相同文字和设置只渲染一次）
+            temp_img = self._text_sprite(display_text, int(self.global_text_settings['font_size'] * self.zoom_factor))
             
             # 粘贴到主画布
-            self.canvas_image.paste(
-                temp_img, 
-                (int(text_x - temp_img.width / 2), int(text_y - temp_img.height / 2)),
-                temp_img
-            )
+            position = (int(text_x - temp_img.width / 2), int(text_y - temp_img.height / 2))
+            if not measure_only:
+                self.canvas_image.paste(temp_img, position, temp_img)
+            return (position[0], position[1], position[0] + temp_img.width, position[1] + temp_img.height)
             
         except Exception as e:
-            print(f"绘制文字失败: {e}")
+            if not measure_only:
+                print(f"绘制文字失败: {e}")
             # 失败时使用简单方式绘制
             try:
-                font = ImageFont.load_default()
-                self.draw.text(
-                    (text_x, text_y), 
-                    display_text, 
-                    font=font,
-                    fill=self.global_text_settings['color']
-                )
+                font = font_registry.default_font()
+                if not measure_only:
+                    self.draw.text(
+                        (text_x, text_y), 
+                        display_text, 
+                        font=font,
+                        fill=self.global_text_settings['color']
+                    )
+                return self.draw.textbbox((text_x, text_y), display_text, font=font)
             except:
-                pass
+                return None
+    
+    def _overlay_image(self):
+        """按当前全局图片设置取叠加图片（RGBA，缓存）"""
+        settings = self.global_image_settings
+        return self.image_assets.get(settings['path'], settings['scale'], settings['rotation'])
     
-    def _draw_label_image(self, label, scale):
-        """绘制标签图片"""
+    def _draw_label_image(self, label, scale, measure_only=False):
+        """绘制标签图片，返回所占矩形（没有图片时返回None）"""
         if not self.global_image_settings['path'] or not os.path.exists(self.global_image_settings['path']):
-            return
+            return None
             
         try:
-            # 打开图片
-            img = Image.open(self.global_image_settings['path']).convert("RGBA")
-            
-            # 应用缩放
-            if self.global_image_settings['scale'] != 1.0:
-                new_width = int(img.width * self.global_image_settings['scale'])
-                new_height = int(img.height * self.global_image_settings['scale'])
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # 应用旋转
-            if self.global_image_settings['rotation'] != 0:
-                img = img.rotate(self.global_image_settings['rotation'], expand=True)
+            # 取缩放、旋转后的图片（每个文件和设置只解码、变换一次）
+            img = self._overlay_image()
             
             # 计算图片位置
             img_x = (label['x'] + self.global_image_settings['x_offset']) * scale
             img_y = (label['y'] + self.global_image_settings['y_offset']) * scale
             
             # 粘贴到主画布
-            self.canvas_image.paste(
-                img, 
-                (int(img_x - img.width / 2), int(img_y - img.height / 2)),
-                img
-            )
+            position = (int(img_x - img.width / 2), int(img_y - img.height / 2))
+            if not measure_only:
+                self.canvas_image.paste(img, position, img)
+            return (position[0], position[1], position[0] + img.width, position[1] + img.height)
             
         except Exception as e:
-            print(f"绘制图片失败: {e}")
+            if not measure_only:
+                print(f"绘制图片失败: {e}")
+            return None
     
-    def _skew_image(self, image, skew_x, skew_y):
-        """倾斜图像"""
-        width, height = image.size
-        skew_x_rad = math.radians(skew_x)
-        skew_y_rad = math.radians(skew_y)
-        
-        # 计算倾斜后的新尺寸
-        new_width = int(width + abs(height * math.tan(skew_x_rad)))
-        new_height = int(height + abs(width * math.tan(skew_y_rad)))
-        
-        # 创建新图像
-        result = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 0))
-        
-        # 逐个像素应用倾斜变换
-        for y in range(height):
-            for x in range(width):
-                pixel = image.getpixel((x, y))
-                if pixel[3] > 0:  # 只处理非透明像素
-                    new_x = x + int(y * math.tan(skew_x_rad))
-                    new_y = y + int(x * math.tan(skew_y_rad))
-                    if 0 <= new_x < new_width and 0 <= new_y < new_height:
-                        result.putpixel((new_x, new_y), pixel)
-        
-        return result
-    
-    def _draw_grid(self):
+    def _draw_grid(self, draw):
         """绘制毫米网格"""
         scale = self.scale * self.zoom_factor
         for x in range(0, int(self.a4_width_mm) + 1, 10):
-            self.draw.line(
+            draw.line(
                 [x * scale, 0, x * scale, self.a4_height_mm * scale],
                 fill=(230, 230, 230), 
                 width=1
             )
             if x % 50 == 0:
-                self.draw.text(
+                draw.text(
                     (x * scale + 2, 2), 
                     f"{x}mm", 
                     fill=(150, 150, 150),
-                    font=ImageFont.load_default()
+                    font=font_registry.default_font()
                 )
         
         for y in range(0, int(self.a4_height_mm) + 1, 10):
-            self.draw.line(
+            draw.line(
                 [0, y * scale, self.a4_width_mm * scale, y * scale],
                 fill=(230, 230, 230), 
                 width=1
             )
             if y % 50 == 0:
-                self.draw.text(
+                draw.text(
                     (2, y * scale + 2), 
                     f"{y}mm", 
                     fill=(150, 150, 150),
-                    font=ImageFont.load_default()
+                    font=font_registry.default_font()
                 )
     
     def update_canvas(self):
         """更新画布显示"""
+        tk_image = getattr(self, 'tk_image', None)
+        if tk_image is not None and (tk_image.width(), tk_image.height()) == self.canvas_image.size:
+            # 尺寸不变时直接更新已有的PhotoImage，不重建画布项
+            tk_image.paste(self.canvas_image)
+            return
         self.tk_image = ImageTk.PhotoImage(image=self.canvas_image)
         self.canvas.delete("all")
         self.canvas.create_image(0, 0, image=self.tk_image, anchor=tk.NW)
@@ -666,37 +727,52 @@ class BarcodeDesigner:
             messagebox.showerror("保存失败", f"无法保存文件: {str(e)}")
             self.status_var.set("保存设计失败")
     
-    def export_as_image(self):
-        """导出为图片（仅包含文字和图片，不包含预览框和点）"""
+    def export_as_image(self, monochrome=False):
+        """导出为图片（仅包含文字和图片，不包含预览框和点）
+
+        monochrome: 在L模式下渲染并二值化，保存为1位PNG或Group-4 TIFF
+        """
         if not self.labels:
             messagebox.showwarning("无内容", "没有可导出的标签")
             return
-            
+        
+        if monochrome:
+            filetypes = [("PNG图片(1位)", "*.png"), ("TIFF图片(Group-4)", "*.tif"), ("所有文件", "*.*")]
+        else:
+            filetypes = [("PNG图片", "*.png"), ("JPG图片", "*.jpg"), ("所有文件", "*.*")]
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG图片", "*.png"), ("JPG图片", "*.jpg"), ("所有文件", "*.*")],
+            filetypes=filetypes,
             title="导出为图片"
         )
         
         if not file_path:
             return
+        
+        output_mode = "1" if monochrome else "RGB"
             
         try:
             # 创建高分辨率空白图像
-            high_res_image = Image.new('RGB', (self.a4_width_px, self.a4_height_px), 'white')
+            high_res_image = Image.new(page_output.render_mode(output_mode), (self.a4_width_px, self.a4_height_px), 'white')
             
             for label in self.labels:
                 x_px = label['x_px']
                 y_px = label['y_px']
                 
                 # 绘制文字（不绘制预览框和点）
-                self._draw_high_res_text(high_res_image, label, x_px, y_px)
+                with render_profile.phase("text"):
+                    self._draw_high_res_text(high_res_image, label, x_px, y_px)
                 
                 # 绘制图片
-                self._draw_high_res_image(high_res_image, label, x_px, y_px)
+                with render_profile.phase("image"):
+                    self._draw_high_res_image(high_res_image, label, x_px, y_px)
+            render_profile.count("labels", len(self.labels))
             
             # 保存图片并设置DPI信息
-            high_res_image.save(file_path, dpi=(self.dpi, self.dpi))
+            with render_profile.phase("encode"):
+                page_output.save_image(high_res_image, file_path, output_mode,
+                                       page_output.format_from_filename(file_path), dpi=(self.dpi, self.dpi))
+            render_profile.report("导出图片")
             self.status_var.set(f"图片已导出到 {os.path.basename(file_path)}")
             messagebox.showinfo("成功", f"图片已成功导出到:\n{file_path}")
             
@@ -717,42 +793,7 @@ class BarcodeDesigner:
             text_x = x_px + self.mm_to_px(self.global_text_settings['x_offset'])
             text_y = y_px + self.mm_to_px(self.global_text_settings['y_offset'])
             
-            # 准备字体
-            font_size = self.global_text_settings['font_size']
-            # 尝试加载指定字体，失败则使用默认字体
-            try:
-                font = ImageFont.truetype(f"{self.global_text_settings['font']}.ttf", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype(self.global_text_settings['font'], font_size)
-                except:
-                    font = ImageFont.load_default()
-            
-            # 创建临时图像
-            temp_img = Image.new('RGBA', (1000, 1000), (255, 255, 255, 0))  # 使用足够大的临时图像
-            temp_draw = ImageDraw.Draw(temp_img)
-            text_bbox = temp_draw.textbbox((0, 0), display_text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            # 重新创建合适大小的临时图像
-            temp_img = Image.new('RGBA', (text_width + 10, text_height + 10), (255, 255, 255, 0))
-            temp_draw = ImageDraw.Draw(temp_img)
-            temp_draw.text((5, 5), display_text, font=font, fill=self.global_text_settings['color'] + (255,))
-            
-            # 应用变换
-            if self.global_text_settings['scale_x'] != 1.0 or self.global_text_settings['scale_y'] != 1.0:
-                temp_img = temp_img.resize(
-                    (int(temp_img.width * self.global_text_settings['scale_x']),
-                     int(temp_img.height * self.global_text_settings['scale_y'])),
-                    Image.Resampling.LANCZOS
-                )
-            
-            if self.global_text_settings['skew_x'] != 0 or self.global_text_settings['skew_y'] != 0:
-                temp_img = self._skew_image(temp_img, self.global_text_settings['skew_x'], self.global_text_settings['skew_y'])
-            
-            if self.global_text_settings['rotation'] != 0:
-                temp_img = temp_img.rotate(self.global_text_settings['rotation'], expand=True)
+            temp_img = self._text_sprite(display_text, self.global_text_settings['font_size'])
             
             # 粘贴到主图像
             image.paste(
@@ -770,15 +811,7 @@ class BarcodeDesigner:
             return
             
         try:
-            img = Image.open(self.global_image_settings['path']).convert("RGBA")
-            
-            if self.global_image_settings['scale'] != 1.0:
-                new_width = int(img.width * self.global_image_settings['scale'])
-                new_height = int(img.height * self.global_image_settings['scale'])
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            if self.global_image_settings['rotation'] != 0:
-                img = img.rotate(self.global_image_settings['rotation'], expand=True)
+            img = self._overlay_image()
             
             img_x = x_px + self.mm_to_px(self.global_image_settings['x_offset'])
             img_y = y_px + self.mm_to_px(self.global_image_settings['y_offset'])
@@ -1,13 +1,15 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import cv2
-import numpy as np
 from PIL import Image, ImageTk
 import os
 import csv
 import threading
 from queue import Queue
 import time
+from spatial_index import SpatialIndex
+
+# 中心点空间索引的格子大小（原始图像像素）
+INDEX_CELL_SIZE = 32
 
 class GridCoordinateMarker:
     def __init__(self, root):
@@ -24,6 +26,7 @@ class GridCoordinateMarker:
         self.grid_positions = []
         self.grid_centers = []
         self.adjusted_centers = []
+        self.center_index = SpatialIndex(INDEX_CELL_SIZE)  # adjusted_centers的空间索引，点选和框选用
         self.selected_grids = set()
         self.last_selected = -1
         self.scale_factor = 1.0
@@ -34,6 +37,7 @@ class GridCoordinateMarker:
         self.dragging_image = False
         self.drag_start = (0, 0)
         self.drag_offset = (0, 0)
+        self.rubber_band = None  # Shift+拖动框选的起点（画布坐标）
         
         # 性能优化相关
         self.render_queue = Queue(maxsize=3)
@@ -44,8 +48,8 @@ class GridCoordinateMarker:
         self.min_area = 100  # 最小面积阈值（从20调大到100，过滤小区域）
         self.min_dimension = 10  # 最小宽高（从5调大到10）
         
-        # OpenCL加速初始化
-        self.use_gpu = self.init_gpu_acceleration()
+        # OpenCL加速在第一次打开图片时初始化（cv2导入耗时较长，不在启动时加载）
+        self.use_gpu = None
         
         # 创建界面
         self.create_widgets()
@@ -54,6 +58,7 @@ class GridCoordinateMarker:
     def init_gpu_acceleration(self):
         """初始化GPU加速支持"""
         try:
+            import cv2
             if cv2.ocl.haveOpenCL():
                 cv2.ocl.setUseOpenCL(True)
                 return True
@@ -101,8 +106,7 @@ class GridCoordinateMarker:
         ttk.Button(toolbar, text="→", width=2, command=lambda: self.nudge_selected(1, 0)).pack(side=tk.LEFT)
         
         # 显示GPU加速状态
-        gpu_status = "GPU加速: 启用 (核显)" if self.use_gpu else "GPU加速: 禁用"
-        self.gpu_status_label = ttk.Label(toolbar, text=gpu_status)
+        self.gpu_status_label = ttk.Label(toolbar, text="GPU加速: 未检测")
         self.gpu_status_label.pack(side=tk.RIGHT, padx=10)
         
         # 创建主框架
@@ -192,6 +196,11 @@ class GridCoordinateMarker:
         if file_path:
             self.image_path = file_path
             try:
+                import cv2
+                if self.use_gpu is None:
+                    self.use_gpu = self.init_gpu_acceleration()
+                    self.gpu_status_label.config(text="GPU加速: 启用 (核显)" if self.use_gpu else "GPU加速: 禁用")
+                
                 self.original_image = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
                 if self.original_image is None:
                     raise Exception("无法解析图像文件")
@@ -208,6 +217,7 @@ class GridCoordinateMarker:
                 self.grid_positions = []
                 self.grid_centers = []
                 self.adjusted_centers = []
+                self.center_index.clear()
                 self.selected_grids = set()
                 self.grid_listbox.delete(0, tk.END)
                 self.scale_factor = 1.0
@@ -229,6 +239,8 @@ class GridCoordinateMarker:
         
         def detect_worker():
             try:
+                import cv2
+                
                 # 提取alpha通道
                 if self.original_image_rgba.shape[-1] == 4:
                     alpha_channel = self.original_image_rgba[:, :, 3]
@@ -309,6 +321,7 @@ class GridCoordinateMarker:
         self.grid_positions = sorted_grids
         self.grid_centers = grid_centers
         self.adjusted_centers = [ (x, y) for x, y in grid_centers ]
+        self.center_index = SpatialIndex(INDEX_CELL_SIZE, ((i, (x, y, x, y)) for i, (x, y) in enumerate(grid_centers)))
         
         # 更新列表
         self.grid_listbox.delete(0, tk.END)
@@ -343,15 +356,12 @@ class GridCoordinateMarker:
         orig_x = (x - offset_x) / self.scale_factor
         orig_y = (y - offset_y) / self.scale_factor
         
-        # 尝试选择点
+        # 尝试选择点（空间索引只检查点击位置附近的点）
         selected_point = -1
         if in_image and self.adjusted_centers:
-            min_distance = float('inf')
-            for i, (center_x, center_y) in enumerate(self.adjusted_centers):
-                distance = ((center_x - orig_x) **2 + (center_y - orig_y)** 2) **0.5
-                if distance < min_distance and distance < 20 / self.scale_factor:
-                    min_distance = distance
-                    selected_point = i
+            nearest = self.center_index.nearest(orig_x, orig_y, 20 / self.scale_factor)
+            if nearest is not None:
+                selected_point = nearest
         
         if selected_point != -1:
             # 处理点选择
@@ -381,6 +391,13 @@ class GridCoordinateMarker:
             self.drag_offset = (fx - orig_x, fy - orig_y)
             self.drag_start = (x, y)
             self.request_render()
+        elif in_image and event.state & 0x1:
+            # Shift+拖动：框选
+            self.dragging = False
+            self.dragging_image = False
+            self.rubber_band = (x, y)
+            self.canvas.delete("rubber_band")
+            self.canvas.create_rectangle(x, y, x, y, outline="#0078d7", dash=(4, 2), tags="rubber_band")
         elif in_image:
             # 拖动图片
             self.dragging_image = True
@@ -402,7 +419,9 @@ class GridCoordinateMarker:
         
         x, y = event.x, event.y
         
-        if self.dragging_image:
+        if self.rubber_band is not None:
+            self.canvas.coords("rubber_band", self.rubber_band[0], self.rubber_band[1], x, y)
+        elif self.dragging_image:
             # 拖动图片
             dx = x - self.drag_start[0]
             dy = y - self.drag_start[1]
@@ -437,16 +456,43 @@ class GridCoordinateMarker:
             for i in self.selected_grids:
                 cx, cy = self.adjusted_centers[i]
                 self.adjusted_centers[i] = (cx + dx, cy + dy)
+            self.center_index.move(self.selected_grids, dx, dy)
             
             self.update_listbox_coordinates()
             self.request_render()
     
     def on_canvas_release(self, event):
         """处理鼠标释放事件"""
+        if self.rubber_band is not None:
+            self._finish_rubber_band(event)
         self.dragging = False
         self.dragging_image = False
         self.status_var.set(f"缩放: {int(self.scale_factor * 100)}% | 选中 {len(self.selected_grids)} 个点")
     
+    def _finish_rubber_band(self, event):
+        """结束框选：选中框内的点（按住Ctrl时加入已有选择）"""
+        start_x, start_y = self.rubber_band
+        self.rubber_band = None
+        self.canvas.delete("rubber_band")
+        
+        canvas_width = self.canvas.winfo_width() or 1
+        canvas_height = self.canvas.winfo_height() or 1
+        img_height, img_width = self.original_image_rgba.shape[:2]
+        offset_x = (canvas_width - img_width * self.scale_factor) / 2 + self.pan_offset[0]
+        offset_y = (canvas_height - img_height * self.scale_factor) / 2 + self.pan_offset[1]
+        
+        # 转换为原始图像坐标后查询索引
+        found = self.center_index.query_rect(
+            (start_x - offset_x) / self.scale_factor, (start_y - offset_y) / self.scale_factor,
+            (event.x - offset_x) / self.scale_factor, (event.y - offset_y) / self.scale_factor)
+        if not (event.state & 0x4):
+            self.selected_grids = set()
+        self.selected_grids.update(found)
+        if found:
+            self.last_selected = found[-1]
+        self.update_listbox_selection()
+        self.request_render()
+    
     def on_listbox_select(self, event):
         """处理列表框选择事件"""
         if not self.adjusted_centers:
@@ -520,6 +566,7 @@ class GridCoordinateMarker:
         for i in self.selected_grids:
             cx, cy = self.adjusted_centers[i]
             self.adjusted_centers[i] = (cx + dx, cy + dy)
+        self.center_index.move(self.selected_grids, dx, dy)
         
         self.update_listbox_coordinates()
         self.request_render()
@@ -554,6 +601,8 @@ class GridCoordinateMarker:
         if self.original_image_rgba is None:
             return
         
+        import cv2  # 已在打开图片时加载
+        
         # 获取图像尺寸
         img_height, img_width = self.original_image_rgba.shape[:2]
         
@@ -642,10 +691,6 @@ class GridCoordinateMarker:
                 self.status_var.set("保存坐标失败")
 
 if __name__ == "__main__":
-    # 确保中文显示正常
-    import matplotlib
-    matplotlib.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
-    
     root = tk.Tk()
     app = GridCoordinateMarker(root)
     root.mainloop()
@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont, ImageTk
+from PIL import Image, ImageDraw, ImageTk
 import os
 import json
 import math
+import label_layout
+from device_table import DeviceBatch, read_table
+import font_registry
 
 class CoordinateLabelGenerator:
     def __init__(self, root):
@@ -53,8 +55,9 @@ class CoordinateLabelGenerator:
         
         # 数据存储
         self.coordinates_df = None
-        self.devices_df = None
+        self.devices = None  # DeviceBatch：列式设备数据
         self.generated_images = []  # 存储所有生成的图像
+        self._background_cache = {}  # 页面背景缓存（网格、标度尺、点标记）
         self.current_page = 0
         self.zoom_factor = 0.5  # 默认缩放比例
         
@@ -288,7 +291,7 @@ class CoordinateLabelGenerator:
         if filename:
             self.coord_file_var.set(filename)
             try:
-                self.coordinates_df = pd.read_csv(filename)
+                self.coordinates_df = read_table(filename)
                 self.status_var.set(f"已加载坐标文件，包含 {len(self.coordinates_df)} 个点")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取坐标文件: {str(e)}")
@@ -296,37 +299,23 @@ class CoordinateLabelGenerator:
     
     def _browse_device_file(self):
         filename = filedialog.askopenfilename(
-            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")]
+            filetypes=[("设备文件", "*.csv *.xlsx *.xls *.txt"), ("CSV文件", "*.csv"), ("所有文件", "*.*")]
         )
         if filename:
             self.device_file_var.set(filename)
             try:
-                self.devices_df = pd.read_csv(filename)
-                self.status_var.set(f"已加载设备文件，包含 {len(self.devices_df)} 个设备")
+                self.devices = DeviceBatch.load(filename)
+                self.status_var.set(f"已加载设备文件，包含 {len(self.devices)} 个设备")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取设备文件: {str(e)}")
-                self.devices_df = None
+                self.devices = None
     
     def _get_font(self, size):
-        if self.selected_font:
-            try:
-                return ImageFont.truetype(self.selected_font, size)
-            except:
-                pass
-                
-        # 尝试系统字体
-        for font_name in self.system_fonts:
-            try:
-                return ImageFont.truetype(font_name, size)
-            except:
-                continue
-                
-        # 如果都失败，使用默认字体
-        return ImageFont.load_default()
+        # 选定字体优先，其次依次尝试系统字体，都失败时使用默认字体（解析结果和字体对象由注册表缓存）
+        return font_registry.load_font([self.selected_font] + self.system_fonts, size)
     
     def _calculate_positions(self, rows, columns):
-        """计算行列的平均间距位置"""
-        positions = []
+        """计算行列的平均间距位置，返回按行优先排列的(xs, ys)坐标数组"""
         
         # 计算列间距（平均分布）
         if columns > 1:
@@ -340,14 +329,9 @@ class CoordinateLabelGenerator:
         else:
             row_spacing = 0
         
-        # 计算每个点的位置
-        for row in range(rows):
-            for col in range(columns):
-                x = self.margin_left_px + col * col_spacing
-                y = self.margin_top_px + row * row_spacing
-                positions.append((x, y))
-                
-        return positions
+        # 计算每个点的位置（按行优先排列的坐标数组）
+        return label_layout.slot_positions(rows, columns, self.margin_left_px, self.margin_top_px,
+                                           col_spacing, row_spacing)
     
     def _draw_debug_elements(self, draw, width, height, include_in_export=False):
         """绘制调试元素：3毫米网格和毫米标度尺"""
@@ -405,8 +389,58 @@ class CoordinateLabelGenerator:
                     # 次刻度（每3毫米，与网格对齐）
                     draw.line([(0, y), (8, y)], fill=ruler_color, width=1)
     
+    def _page_background(self, xs, ys, font, debug_mode):
+        """返回本页背景 (RGB底图副本, 调试图层或None)
+        
+        网格、标度尺、点标记和调试坐标在同一次生成中只取决于本页的锚点坐标，
+        每种背景只绘制一次（通常是整页和末页两种），之后每页复制底图即可。
+        """
+        key = (tuple(xs), tuple(ys))
+        entry = self._background_cache.get(key)
+        if entry is None:
+            # 创建A4尺寸图像（300dpi: 2480 × 3508像素）
+            width, height = self.a4_width_px, self.a4_height_px
+            image = Image.new('RGB', (width, height), color='white')
+            draw = ImageDraw.Draw(image)
+            
+            # 创建调试图层
+            debug_layer = None
+            debug_draw = None
+            if debug_mode:
+                debug_layer = Image.new('RGBA', (width, height), (255, 255, 255, 0))
+                debug_draw = ImageDraw.Draw(debug_layer)
+                self._draw_debug_elements(debug_draw, width, height)
+            
+            # 绘制实际网格（如果需要导出）
+            if self.print_grid_var.get():
+                self._draw_debug_elements(draw, width, height, include_in_export=True)
+            
+            for x, y in zip(xs, ys):
+                # 绘制点标记（始终打印，纯黑，先于文字绘制结果相同）
+                draw.ellipse([
+                    (x - self.dot_radius_px, y - self.dot_radius_px),
+                    (x + self.dot_radius_px, y + self.dot_radius_px)
+                ], fill='black')
+                
+                # 在调试模式下显示坐标信息
+                if debug_draw:
+                    # 显示像素和毫米双坐标
+                    mm_x = round(x / self.mm_to_px, 1)
+                    mm_y = round(y / self.mm_to_px, 1)
+                    debug_draw.text((x + 10, y), f"({int(x)}px/{mm_x}mm, {int(y)}px/{mm_y}mm)", 
+                                  font=font, fill='red')
+            
+            # 只保留最近两种背景
+            if len(self._background_cache) >= 2:
+                self._background_cache.pop(next(iter(self._background_cache)))
+            entry = (image, debug_layer)
+            self._background_cache[key] = entry
+        
+        image, debug_layer = entry
+        return image.copy(), debug_layer
+    
     def _generate_all_pages(self):
-        if self.coordinates_df is None or self.devices_df is None:
+        if self.coordinates_df is None or self.devices is None:
             messagebox.showerror("错误", "请先加载坐标文件和设备文件")
             return
         
@@ -418,11 +452,11 @@ class CoordinateLabelGenerator:
             rows = self.rows_var.get()
             columns = self.columns_var.get()
             points_per_page = min(self.points_per_page_var.get(), rows * columns)
-            total_devices = len(self.devices_df)
+            total_devices = len(self.devices)
             total_pages = max(1, (total_devices + points_per_page - 1) // points_per_page)
             
             # 计算行列平均分布的位置
-            base_positions = self._calculate_positions(rows, columns)
+            slot_x, slot_y = self._calculate_positions(rows, columns)
             
             # 获取参数
             font_size = self.font_size_var.get()
@@ -433,61 +467,41 @@ class CoordinateLabelGenerator:
             y_stretch = self.y_stretch_var.get() / 100.0
             debug_mode = self.debug_mode_var.get()
             
+            # 整批设备的锚点和文字起点一次算好，循环中只按下标取值
+            font = self._get_font(font_size)
+            measure_draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+            texts1 = [f"设备码：{code}" for code in self.devices.device_codes.tolist()]
+            texts2 = [f"密钥：{password}" for password in self.devices.passwords.tolist()]
+            layout = label_layout.device_anchors(0, total_devices, slot_x, slot_y,
+                                                 points_per_page, x_offset, y_offset)
+            layout.update(label_layout.text_origins(
+                layout, 0, [measure_draw.textlength(text, font=font) for text in texts1],
+                0, [measure_draw.textlength(text, font=font) for text in texts2],
+                font_size, spacing, x_stretch, y_stretch))
+            xs, ys = layout["x"].tolist(), layout["y"].tolist()
+            text1_xs, text1_ys = layout["text1_x"].tolist(), layout["text1_y"].tolist()
+            text2_xs, text2_ys = layout["text2_x"].tolist(), layout["text2_y"].tolist()
+            
             self.generated_images = []
+            self._background_cache = {}
             
             # 为每一页生成图像
             for page in range(total_pages):
                 start_idx = page * points_per_page
                 end_idx = min((page + 1) * points_per_page, total_devices)
                 
-                # 创建A4尺寸图像（300dpi: 2480 × 3508像素）
-                width, height = self.a4_width_px, self.a4_height_px
-                image = Image.new('RGB', (width, height), color='white')
+                # 网格、标度尺、点标记和调试坐标来自缓存的页面背景
+                image, debug_layer = self._page_background(
+                    xs[start_idx:end_idx], ys[start_idx:end_idx], font, debug_mode)
                 draw = ImageDraw.Draw(image)
                 
-                # 创建调试图层
-                debug_layer = None
-                debug_draw = None
-                if debug_mode:
-                    debug_layer = Image.new('RGBA', (width, height), (255, 255, 255, 0))
-                    debug_draw = ImageDraw.Draw(debug_layer)
-                    self._draw_debug_elements(debug_draw, width, height)
-                
-                # 绘制实际网格（如果需要导出）
-                if self.print_grid_var.get():
-                    self._draw_debug_elements(draw, width, height, include_in_export=True)
-                
-                # 获取字体
-                font = self._get_font(font_size)
-                
                 # 处理当前页的每个设备
                 for i in range(start_idx, end_idx):
-                    pos_idx = i % len(base_positions)  # 循环使用计算出的位置
-                    
                     try:
-                        # 获取计算好的坐标并应用偏移
-                        base_x, base_y = base_positions[pos_idx]
-                        x = base_x + x_offset
-                        y = base_y + y_offset
-                        
-                        # 获取设备信息
-                        device_code = self.devices_df.iloc[i]['device_code']
-                        password = self.devices_df.iloc[i]['password']
-                        
-                        # 准备要显示的文本
-                        text1 = f"设备码：{device_code}"
-                        text2 = f"密钥：{password}"
-                        
-                        # 计算文本宽度
-                        text1_width = draw.textlength(text1, font=font)
-                        text2_width = draw.textlength(text2, font=font)
-                        
-                        # 计算文字位置（以坐标点为中心）
-                        text1_x = x - (text1_width * x_stretch) / 2
-                        text1_y = y - (font_size * y_stretch) - spacing
-                        
-                        text2_x = x - (text2_width * x_stretch) / 2
-                        text2_y = y + spacing
+                        # 布局数组中已算好的文字位置
+                        text1, text2 = texts1[i], texts2[i]
+                        text1_x, text1_y = text1_xs[i], text1_ys[i]
+                        text2_x, text2_y = text2_xs[i], text2_ys[i]
                         
                         # 绘制文字（支持拉伸变形）
                         if x_stretch != 1.0 or y_stretch != 1.0:
@@ -514,26 +528,12 @@ class CoordinateLabelGenerator:
                             draw.text((text1_x, text1_y), text1, font=font, fill='black')
                             draw.text((text2_x, text2_y), text2, font=font, fill='black')
                             
-                        # 绘制点标记（始终打印）
-                        draw.ellipse([
-                            (x - self.dot_radius_px, y - self.dot_radius_px),
-                            (x + self.dot_radius_px, y + self.dot_radius_px)
-                        ], fill='black')
-                            
-                        # 在调试模式下显示坐标信息
-                        if debug_mode and debug_draw:
-                            # 显示像素和毫米双坐标
-                            mm_x = round(x / self.mm_to_px, 1)
-                            mm_y = round(y / self.mm_to_px, 1)
-                            debug_draw.text((x + 10, y), f"({int(x)}px/{mm_x}mm, {int(y)}px/{mm_y}mm)", 
-                                          font=font, fill='red')
-                            
                     except Exception as e:
                         messagebox.showerror("错误", f"处理第 {i+1} 个设备时出错: {str(e)}")
                         continue
                 
                 # 将调试图层合并到主图像
-                if debug_mode and debug_layer:
+                if debug_layer is not None:
                     image = Image.alpha_composite(image.convert('RGBA'), debug_layer).convert('RGB')
                 
                 self.generated_images.append(image)
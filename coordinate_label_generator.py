@@ -1,10 +1,11 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
 import tempfile
 import math
+from device_table import DeviceBatch, read_table
+import font_registry
 
 class CoordinateLabelGenerator:
     def __init__(self, root):
@@ -19,7 +20,7 @@ class CoordinateLabelGenerator:
         
         # 数据存储
         self.coordinates_df = None
-        self.devices_df = None
+        self.devices = None  # DeviceBatch：列式设备数据
         self.preview_image = None
         
         # 创建UI
@@ -95,7 +96,7 @@ class CoordinateLabelGenerator:
         if filename:
             self.coord_file_var.set(filename)
             try:
-                self.coordinates_df = pd.read_csv(filename)
+                self.coordinates_df = read_table(filename)
                 self.status_var.set(f"已加载坐标文件，包含 {len(self.coordinates_df)} 个点")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取坐标文件: {str(e)}")
@@ -103,42 +104,29 @@ class CoordinateLabelGenerator:
     
     def _browse_device_file(self):
         filename = filedialog.askopenfilename(
-            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")]
+            filetypes=[("设备文件", "*.csv *.xlsx *.xls *.txt"), ("CSV文件", "*.csv"), ("所有文件", "*.*")]
         )
         if filename:
             self.device_file_var.set(filename)
             try:
-                self.devices_df = pd.read_csv(filename)
-                self.status_var.set(f"已加载设备文件，包含 {len(self.devices_df)} 个设备")
+                self.devices = DeviceBatch.load(filename)
+                self.status_var.set(f"已加载设备文件，包含 {len(self.devices)} 个设备")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取设备文件: {str(e)}")
-                self.devices_df = None
+                self.devices = None
     
     def _get_font(self, size):
-        if self.selected_font:
-            try:
-                return ImageFont.truetype(self.selected_font, size)
-            except:
-                pass
-                
-        # 尝试系统字体
-        for font_name in self.system_fonts:
-            try:
-                return ImageFont.truetype(font_name, size)
-            except:
-                continue
-                
-        # 如果都失败，使用默认字体
-        return ImageFont.load_default()
+        # 选定字体优先，其次依次尝试系统字体，都失败时使用默认字体（解析结果和字体对象由注册表缓存）
+        return font_registry.load_font([self.selected_font] + self.system_fonts, size)
     
     def _generate_image(self, preview=False):
-        if self.coordinates_df is None or self.devices_df is None:
+        if self.coordinates_df is None or self.devices is None:
             messagebox.showerror("错误", "请先加载坐标文件和设备文件")
             return None
         
         # 检查数据行数是否匹配
-        if len(self.coordinates_df) != len(self.devices_df):
-            messagebox.showerror("错误", f"坐标点数量 ({len(self.coordinates_df)}) 与设备数量 ({len(self.devices_df)}) 不匹配")
+        if len(self.coordinates_df) != len(self.devices):
+            messagebox.showerror("错误", f"坐标点数量 ({len(self.coordinates_df)}) 与设备数量 ({len(self.devices)}) 不匹配")
             return None
         
         # A4尺寸在300dpi下的像素: 2480 × 3508
@@ -153,16 +141,22 @@ class CoordinateLabelGenerator:
         # 获取合适的字体
         font = self._get_font(font_size)
         
+        # 按列一次取出，循环中只按下标取值
+        xs = self.coordinates_df['X坐标'].tolist()
+        ys = self.coordinates_df['Y坐标'].tolist()
+        device_codes = self.devices.device_codes.tolist()
+        passwords = self.devices.passwords.tolist()
+        
         # 处理每个点
-        for i in range(len(self.coordinates_df)):
+        for i in range(len(xs)):
             try:
                 # 获取坐标
-                x = float(self.coordinates_df.iloc[i]['X坐标'])
-                y = float(self.coordinates_df.iloc[i]['Y坐标'])
+                x = float(xs[i])
+                y = float(ys[i])
                 
                 # 获取设备信息
-                device_code = self.devices_df.iloc[i]['device_code']
-                password = self.devices_df.iloc[i]['password']
+                device_code = device_codes[i]
+                password = passwords[i]
                 
                 # 准备要显示的文本
                 text1 = f"设备码：{device_code}"
@@ -231,7 +225,7 @@ class CoordinateLabelGenerator:
             self.status_var.set("预览生成失败")
     
     def _export_image(self):
-        if self.coordinates_df is None or self.devices_df is None:
+        if self.coordinates_df is None or self.devices is None:
             messagebox.showerror("错误", "请先加载坐标文件和设备文件")
             return
         
@@ -1,9 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import csv
 import random
-import string
 import os
+import reversible_keys
 
 class ReversibleCSVGenerator:
     def __init__(self, root):
@@ -79,45 +78,11 @@ class ReversibleCSVGenerator:
     
     def device_to_password(self, device_num, seed):
         """将设备编号转换为密码"""
-        # 使用种子进行可逆转换
-        base = device_num + seed
-        # 确保结果在有效范围内
-        transformed = (base * 12345) % 99990 + 10  # 确保4位数字范围
-        
-        # 提取前4位数字
-        num_part = transformed % 10000
-        # 生成字母部分 (基于转换后的值确保可逆)
-        letter_index = (transformed // 10000) % 26
-        letter = string.ascii_letters[letter_index]
-        
-        # 格式化为4位数字加1位字母
-        return f"{num_part:04d}{letter}"
+        return reversible_keys.device_to_password(device_num, seed)
     
     def password_to_device(self, password, seed):
         """将密码转换回设备编号"""
-        if len(password) != 5:
-            return None
-        
-        num_part = password[:4]
-        letter = password[4]
-        
-        try:
-            num = int(num_part)
-        except ValueError:
-            return None
-        
-        # 找到字母对应的索引
-        try:
-            letter_index = string.ascii_letters.index(letter)
-        except ValueError:
-            return None
-        
-        # 反向转换
-        transformed = num + letter_index * 10000
-        base = (transformed * 87654) % 99990  # 12345的模逆
-        device_num = (base - seed) % 99990
-        
-        return device_num
+        return reversible_keys.password_to_device(password, seed)
     
     def generate_csv(self):
         """生成CSV文件"""
@@ -137,23 +102,14 @@ class ReversibleCSVGenerator:
             return
         
         # 生成数据
-        data = []
+        data = reversible_keys.generate_keys(count, seed)
         self.preview_text.delete(1.0, tk.END)
         self.preview_text.insert(tk.END, "password,device_code\n")
-        
-        for i in range(count):
-            device_num = i
-            device_code = f"E{i:04d}"  # 从E0000开始
-            password = self.device_to_password(device_num, seed)
-            data.append((password, device_code))
-            self.preview_text.insert(tk.END, f"{password},{device_code}\n")
+        self.preview_text.insert(tk.END, "".join(f"{password},{device_code}\n" for password, device_code in data))
         
         # 保存到CSV
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["password", "device_code"])
-                writer.writerows(data)
+            reversible_keys.write_keys_csv(file_path, data)
             
             self.status_var.set(f"成功生成 {count} 条记录到 {os.path.basename(file_path)}")
             messagebox.showinfo("成功", f"CSV文件已保存到:\n{file_path}")
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+
+
+DEVICE_COLUMNS = ("device_code", "password")
+TEXT_ENCODINGS = ("utf-8-sig", "gbk", "gb2312")
+# 纯文本按逗号、分号、制表符或连续空白分列
+TEXT_SEPARATOR = r"\s*[,;\t]\s*|\s+"
+
+
+def read_table(filename, required=None):
+    """读取CSV、Excel或纯文本表格（统一入口），所有单元格按文本读入
+
+    文本保持原样（设备码的前导零不会丢失），空单元格读为空串。
+    required: 必需的列名；文件没有这些表头且列数足够时按无表头处理，依次命名
+    """
+    import pandas as pd  # 只在读取文件时加载（pandas导入耗时较长，影响界面启动）
+
+    ext = os.path.splitext(filename)[1].lower()
+
+    def read(header):
+        if ext in ('.xlsx', '.xls'):
+            return pd.read_excel(filename, header=header, dtype=str, keep_default_na=False)
+
+        options = {"sep": ","} if ext == '.csv' else {"sep": TEXT_SEPARATOR, "engine": "python"}
+        for encoding in TEXT_ENCODINGS:
+            try:
+                return pd.read_csv(filename, header=header, dtype=str, keep_default_na=False,
+                                   encoding=encoding, **options)
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("无法解析文件编码，请尝试UTF-8格式")
+
+    df = read(0)
+    if required:
+        missing = [c for c in required if c not in df.columns]
+        if len(missing) == len(required) and len(df.columns) >= len(required):
+            # 没有表头：前几列依次作为必需列
+            df = read(None)
+            df.columns = list(required) + [f"column_{i}" for i in range(len(required), len(df.columns))]
+        elif missing:
+            raise ValueError(f"文件缺少必要列：{', '.join(missing)}")
+    return df
+
+
+class DeviceBatch:
+    """列式设备数据：设备码和密钥各一个预先转成字符串的紧凑数组
+
+    只在加载时规范化一次，渲染循环按下标（或整页切片）直接取值，
+    不再逐个标签构造 DataFrame 行。
+    """
+
+    def __init__(self, device_codes, passwords):
+        self.device_codes = np.asarray(device_codes, dtype=str)
+        self.passwords = np.asarray(passwords, dtype=str)
+        if len(self.device_codes) != len(self.passwords):
+            raise ValueError("设备码与密钥数量不一致")
+
+    @classmethod
+    def from_frame(cls, df):
+        """从DataFrame的device_code/password两列构建（空值为空串，去掉首尾空白）"""
+        columns = [df[name].fillna("").astype(str).str.strip().to_numpy() for name in DEVICE_COLUMNS]
+        return cls(*columns)
+
+    @classmethod
+    def load(cls, filename):
+        """从CSV、Excel或纯文本文件加载设备数据"""
+        return cls.from_frame(read_table(filename, DEVICE_COLUMNS))
+
+    def __len__(self):
+        return len(self.device_codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DeviceBatch(self.device_codes[index], self.passwords[index])
+        return str(self.device_codes[index]), str(self.passwords[index])
+
+    def non_empty(self):
+        """去掉设备码和密钥都为空的行"""
+        keep = (np.char.str_len(self.device_codes) > 0) | (np.char.str_len(self.passwords) > 0)
+        return DeviceBatch(self.device_codes[keep], self.passwords[keep])
+
+    def pairs(self):
+        """[(设备码, 密钥), ...]"""
+        return list(zip(self.device_codes.tolist(), self.passwords.tolist()))
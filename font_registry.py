@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from PIL import ImageFont
+
+import render_profile
+
+
+# ----------------------------------------------------------------------
+# 共享字体注册表（线程安全）
+#
+# ImageFont.truetype每次都要打开并解析字体文件；各生成器逐个标签、逐个字号
+# 调用时这部分开销很可观。这里按 (路径, 字号, 索引) 缓存FreeTypeFont对象，
+# 最近最少使用的先淘汰；候选字体列表只解析一次（记住第一个可用的路径），
+# 不可用的路径也记下来，不再反复抛异常。
+# 字体对象只读，可在工作线程间共享（渲染时持有GIL）。
+# ----------------------------------------------------------------------
+
+MAX_FONTS = 128
+
+_lock = threading.Lock()
+_fonts = OrderedDict()   # (路径, 字号, 索引) -> FreeTypeFont
+_missing = set()         # 加载失败的 (路径, 索引)
+_resolved = {}           # 候选列表 -> 第一个可用路径或None
+_default = None
+
+
+def get_font(path, size, index=0):
+    """等价于ImageFont.truetype(path, size, index)，结果缓存；无法加载时抛出OSError"""
+    key = (path, size, index)
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _fonts.move_to_end(key)
+            return font
+        if (path, index) in _missing:
+            raise OSError(f"无法加载字体：{path}")
+
+    try:
+        with render_profile.phase("font_load"):
+            font = ImageFont.truetype(path, size, index)
+    except OSError:
+        # 文件不存在或无法解析：记下，之后不再尝试
+        with _lock:
+            _missing.add((path, index))
+        raise OSError(f"无法加载字体：{path}")
+    except Exception as e:
+        # 字号无效等，只影响这一次
+        raise OSError(f"无法加载字体：{path}（{e}）")
+
+    with _lock:
+        _fonts[key] = font
+        while len(_fonts) > MAX_FONTS:
+            _fonts.popitem(last=False)
+    return font
+
+
+def default_font():
+    """ImageFont.load_default()的共享实例"""
+    global _default
+    if _default is None:
+        _default = ImageFont.load_default()
+    return _default
+
+
+def find_font(candidates):
+    """返回候选路径中第一个可以加载的（跳过None和空串），都不可用时返回None；结果缓存"""
+    candidates = tuple(path for path in candidates if path)
+    with _lock:
+        if candidates in _resolved:
+            return _resolved[candidates]
+
+    found = None
+    for path in candidates:
+        try:
+            get_font(path, 12)
+        except OSError:
+            continue
+        found = path
+        break
+
+    with _lock:
+        _resolved[candidates] = found
+    return found
+
+
+def load_font(candidates, size):
+    """按候选路径顺序取第一个可用字体的size字号，都不可用时返回默认字体"""
+    path = find_font(candidates)
+    if path is not None:
+        try:
+            return get_font(path, size)
+        except OSError:
+            pass
+    return default_font()
+
+
+def clear():
+    """清空缓存（字体文件变化后调用）"""
+    global _default
+    with _lock:
+        _fonts.clear()
+        _missing.clear()
+        _resolved.clear()
+        _default = None
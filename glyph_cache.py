@@ -0,0 +1,180 @@
+import math
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+class GlyphCache:
+    """字形（及短字符串）缓存：按 (字体, 字号, 字符, 亚像素起点) 缓存栅格化后的蒙版和字宽
+
+    标签字符集很小（数字、少量字母、固定前缀"设备码："/"密钥："），
+    每个字形只需用FreeType栅格化一次，之后用 draw.bitmap 贴蒙版即可，
+    结果与逐字符 draw.text 逐字节一致。
+    """
+
+    # FreeType笔位置按 round((整数边界 + 起点小数) * 64) 以float32计算，
+    # 边界取值范围内舍入结果一致时才能安全复用蒙版
+    _BOUND_RANGE = np.arange(-512, 513, dtype=np.float32)
+
+    def __init__(self):
+        self._advances = {}   # (字体键, 文字) -> 宽度
+        self._masks = {}      # (字体键, 文字, x亚像素, y亚像素) -> (蒙版, x偏移, y偏移)
+        self._subpixel = {}   # (小数, 方向) -> 1/64像素起点 或 None
+        self._fonts = {}      # 保持字体对象引用，避免id被复用
+        self.hits = 0
+        self.misses = 0
+
+    def font_key(self, font, mode):
+        path = getattr(font, "path", None)
+        if not isinstance(path, str):
+            self._fonts[id(font)] = font
+            path = id(font)
+        return (path, getattr(font, "size", None), getattr(font, "index", 0), mode)
+
+    def advance(self, draw, text, font):
+        """等价于 draw.textlength(text, font=font)，结果缓存"""
+        key = (self.font_key(font, draw.fontmode), text)
+        width = self._advances.get(key)
+        if width is None:
+            width = draw.textlength(text, font=font)
+            self._advances[key] = width
+        return width
+
+    def text_width(self, draw, text, font, spacing=0):
+        """逐字符宽度之和加字符间距（与 _draw_text_with_spacing 的排版一致）"""
+        if not text:
+            return 0
+        return sum(self.advance(draw, c, font) for c in text) + (len(text) - 1) * spacing
+
+    def _subpixel_start(self, fraction, sign):
+        """返回FreeType实际使用的1/64像素起点（0~64），无法确定时返回None"""
+        key = (fraction, sign)
+        if key in self._subpixel:
+            return self._subpixel[key]
+
+        start = np.float32(fraction)
+        pen = ((self._BOUND_RANGE + np.float32(sign) * start) * np.float32(64)).astype(np.float64)
+        # C语言round：四舍五入，远离0
+        pen = np.sign(pen) * np.floor(np.abs(pen) + 0.5)
+        steps = np.unique(pen - self._BOUND_RANGE * 64)
+        result = None
+        if len(steps) == 1:
+            step = int(steps[0]) * sign
+            if 0 <= step < 64 and start >= 0:
+                result = step
+        self._subpixel[key] = result
+        return result
+
+    @staticmethod
+    def _canonical_start(step, fraction):
+        # 与原起点舍入到同一1/64像素，且正负（影响蒙版尺寸）一致
+        if step == 0:
+            return 1 / 256 if fraction > 0 else 0.0
+        return step / 64
+
+    def _get_mask(self, draw, text, font, x_step, y_step, x_start, y_start):
+        key = (self.font_key(font, draw.fontmode), text, x_step, y_step, x_start > 0, y_start > 0)
+        entry = self._masks.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        cx = self._canonical_start(x_step, x_start)
+        cy = self._canonical_start(y_step, y_start)
+        mask_mode = "1" if draw.fontmode == "1" else "L"
+        _, (offset_x, offset_y) = font.getmask2(text, mask_mode, start=(cx, cy))
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        pad = max(0, -offset_x, -offset_y, -left, -top) + 2
+        tile = Image.new("L", (pad + max(right, 1) + 2, pad + max(bottom, 1) + 2), 0)
+        tile_draw = ImageDraw.Draw(tile)
+        tile_draw.fontmode = draw.fontmode
+        tile_draw.text((pad + cx, pad + cy), text, font=font, fill=255)
+        mask = tile.crop((pad + offset_x, pad + offset_y, tile.width, tile.height))
+        entry = (mask, offset_x, offset_y)
+        self._masks[key] = entry
+        return entry
+
+    def draw_text(self, draw, xy, text, font, fill='black'):
+        """等价于 draw.text(xy, text, font=font, fill=fill)，蒙版缓存复用"""
+        x, y = xy
+        if not isinstance(font, ImageFont.FreeTypeFont) or "\n" in text or x < 0 or y < 0:
+            draw.text(xy, text, font=font, fill=fill)
+            return
+
+        x_start = math.modf(x)[0]
+        y_start = math.modf(y)[0]
+        x_step = self._subpixel_start(x_start, 1)
+        y_step = self._subpixel_start(y_start, -1)
+        if x_step is None or y_step is None:
+            draw.text(xy, text, font=font, fill=fill)
+            return
+
+        mask, offset_x, offset_y = self._get_mask(draw, text, font, x_step, y_step, x_start, y_start)
+        draw.bitmap((int(x) + offset_x, int(y) + offset_y), mask, fill=fill)
+
+    def draw_text_with_spacing(self, draw, text, x, y, font, spacing=0, fill='black'):
+        """在指定位置绘制带有字符间距的文本，返回总宽度"""
+        current_x = x
+        for char in text:
+            self.draw_text(draw, (current_x, y), char, font, fill)
+            current_x += self.advance(draw, char, font) + spacing
+        return current_x - x
+
+    def clear(self):
+        self._advances.clear()
+        self._masks.clear()
+        self._subpixel.clear()
+        self._fonts.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class StretchedTextCache:
+    """拉伸文字精灵缓存
+
+    x/y拉伸不为100%时，固定前缀（"设备码："/"密钥："）在整批中不变，
+    按 (字体, 字号, 文字, 拉伸比例) 只渲染并LANCZOS缩放一次，之后每个标签直接贴图，
+    只对变化的值部分做缩放。
+    """
+
+    def __init__(self, glyph_cache):
+        self.glyph_cache = glyph_cache
+        self._sprites = {}
+        self._draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))  # 仅用于测量字宽
+
+    def render(self, text, font, font_size, x_stretch, y_stretch, spacing=None):
+        """把文字画到透明临时图上并按比例拉伸，返回RGBA精灵
+
+        spacing不为None时逐字符绘制并加字符间距。
+        """
+        glyphs = self.glyph_cache
+        if spacing is None:
+            width = glyphs.advance(self._draw, text, font)
+        else:
+            width = glyphs.text_width(self._draw, text, font, spacing)
+
+        # 宽度和高度各留约20%余量，避免字形超出字宽的部分被裁掉
+        temp_width = int(width) + max(2, int(font_size * 0.2))
+        temp_height = int(font_size * 1.2)
+        temp_img = Image.new('RGBA', (temp_width, temp_height), (255, 255, 255, 0))
+        temp_draw = ImageDraw.Draw(temp_img)
+        if spacing is None:
+            glyphs.draw_text(temp_draw, (0, 0), text, font)
+        else:
+            glyphs.draw_text_with_spacing(temp_draw, text, 0, 0, font, spacing)
+
+        new_width = max(1, int(temp_width * x_stretch))
+        new_height = max(1, int(temp_height * y_stretch))
+        return temp_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    def get(self, text, font, font_size, x_stretch, y_stretch):
+        """获取固定文字的拉伸精灵（缓存）"""
+        key = (self.glyph_cache.font_key(font, 'L'), text, font_size, x_stretch, y_stretch)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self.render(text, font, font_size, x_stretch, y_stretch)
+            self._sprites[key] = sprite
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
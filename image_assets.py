@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+import render_profile
+
+
+# ----------------------------------------------------------------------
+# 叠加图片缓存（解码一次，变换一次）
+#
+# 条码设计器给每个标签叠加同一张图片（logo等），原来每个标签、每次重绘和导出
+# 都要重新解码、LANCZOS缩放和旋转。这里按 (路径, 修改时间, 文件大小, 缩放, 旋转)
+# 缓存变换后的RGBA图像，预览和300dpi导出共用；文件被修改后修改时间变化，
+# 旧条目在下次取用时丢弃。按占用内存做LRU淘汰。
+# ----------------------------------------------------------------------
+
+MAX_BYTES = 128 * 1024 * 1024
+
+
+class ImageAssetCache:
+    """按内存上限做LRU淘汰的叠加图片缓存（线程安全）"""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._images = OrderedDict()   # (路径, 修改时间, 大小, 缩放, 旋转) -> RGBA图像
+        self._versions = {}            # 路径 -> (修改时间, 大小)
+        self._lock = threading.Lock()
+
+    def get(self, path, scale=1.0, rotation=0):
+        """返回path缩放scale倍、旋转rotation度后的RGBA图像；文件不存在或无法解码时抛出OSError"""
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = (path,) + version + (scale, rotation)
+        with self._lock:
+            if self._versions.get(path, version) != version:
+                self._discard(path)
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                render_profile.count("asset_hits")
+                return img
+
+        with render_profile.phase("asset_decode"):
+            with Image.open(path) as source:
+                img = source.convert("RGBA")
+            if scale != 1.0:
+                img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+            if rotation != 0:
+                img = img.rotate(rotation, expand=True)
+        nbytes = img.width * img.height * 4
+
+        with self._lock:
+            self._versions[path] = version
+            if key not in self._images and nbytes <= self.max_bytes:
+                self._images[key] = img
+                self.size += nbytes
+                while self.size > self.max_bytes:
+                    _, old = self._images.popitem(last=False)
+                    self.size -= old.width * old.height * 4
+        return img
+
+    def _discard(self, path):
+        """丢弃path的所有旧版本（调用时已持有锁）"""
+        for key in [key for key in self._images if key[0] == path]:
+            old = self._images.pop(key)
+            self.size -= old.width * old.height * 4
+        del self._versions[path]
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._versions.clear()
+            self.size = 0
@@ -1,26 +1,13 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import pandas as pd
+import functools
 import os
-import threading
-from queue import Queue
-import math
-import cv2
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageTk
-import platform
-
-# 常量定义 - 单位：mm
-A4_WIDTH = 210  # A4宽度
-A4_HEIGHT = 297  # A4高度
-
-# 图片参数（300dpi保证打印清晰度）
-DPI = 300
-MM_TO_PIXEL = DPI / 25.4  # 毫米到像素的转换因子（1mm ≈ 11.811像素）
-
-# A4尺寸（像素）
-A4_WIDTH_PX = int(A4_WIDTH * MM_TO_PIXEL)
-A4_HEIGHT_PX = int(A4_HEIGHT * MM_TO_PIXEL)
+from PIL import Image, ImageFont, ImageTk
+from device_table import DeviceBatch
+import sticker_core
+import render_profile
+import font_registry
+from page_scheduler import PageScheduler
 
 class ImageBasedStickerGeneratorApp:
     def __init__(self, root):
@@ -55,7 +42,13 @@ class ImageBasedStickerGeneratorApp:
         self.file_path = tk.StringVar()
         self.progress_var = tk.DoubleVar()
         self.status_var = tk.StringVar(value="就绪")
-        self.generating = False
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        self.scheduler = None  # 当前的页面调度器（生成中时非None）
+        
+        # 输出设置：合并为单个多页PDF（页面以1位图像嵌入）
+        self.pdf_output_var = tk.BooleanVar(value=False)
+        self.output_pdf = False
+        self.sink = None  # 本次生成的页面保存器
         
         # 字体相关
         self.fonts = {}
@@ -63,23 +56,11 @@ class ImageBasedStickerGeneratorApp:
         
         # 创建UI
         self.create_widgets()
-        
-        # 线程队列
-        self.queue = Queue()
-        self.max_threads = 2
     
     def load_fonts(self):
         """加载中文字体，确保绘图时可用"""
-        system = platform.system()
         try:
-            if system == "Windows":
-                self.fonts["simhei"] = "C:/Windows/Fonts/simhei.ttf"
-                self.fonts["msyh"] = "C:/Windows/Fonts/msyh.ttc"
-            elif system == "Darwin":  # macOS
-                self.fonts["simhei"] = "/Library/Fonts/SimHei.ttf"
-                self.fonts["msyh"] = "/Library/Fonts/Microsoft YaHei.ttc"
-            else:  # Linux
-                self.fonts["simhei"] = "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"
+            self.fonts.update(sticker_core.system_fonts())
             
             # 测试字体是否可用
             test_font = ImageFont.truetype(self.fonts["simhei"], 12)
@@ -116,7 +97,12 @@ class ImageBasedStickerGeneratorApp:
         btn_frame.pack(side=tk.RIGHT, padx=5)
         
         ttk.Button(btn_frame, text="检测标签", command=self.detect_stickers).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(btn_frame, text="合并为单色PDF", variable=self.pdf_output_var).pack(side=tk.LEFT, padx=5)
+        ttk.Label(btn_frame, text="进程数:").pack(side=tk.LEFT)
+        ttk.Spinbox(btn_frame, textvariable=self.workers_var, from_=1, to=os.cpu_count() or 1,
+                    width=3).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="生成图片", command=self.start_generation).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="取消", command=self.cancel_generation).pack(side=tk.LEFT, padx=5)
         
         # 参数调节区域
         param_frame = ttk.LabelFrame(main_frame, text="检测参数", padding="10")
@@ -193,7 +179,7 @@ class ImageBasedStickerGeneratorApp:
     
     def browse_data_file(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("数据文件", "*.xlsx;*.xls;*.csv")],
+            filetypes=[("数据文件", "*.xlsx;*.xls;*.csv;*.txt")],
             title="选择包含device_code和password的文件"
         )
         if file_path:
@@ -213,7 +199,8 @@ class ImageBasedStickerGeneratorApp:
     def load_and_display_image(self):
         """加载并显示图像"""
         try:
-            # 使用OpenCV加载图像
+            # 使用OpenCV加载图像（cv2在第一次加载图像时才导入，加快启动）
+            import cv2
             self.sticker_image = cv2.imread(self.sticker_image_path)
             if self.sticker_image is None:
                 raise Exception("无法加载图像文件")
@@ -308,44 +295,12 @@ class ImageBasedStickerGeneratorApp:
         try:
             self.status_var.set("正在检测标签...")
             
-            # 创建原始图像的副本用于绘制结果
-            processed_img = self.sticker_image.copy()
-            
-            # 转换为HSV颜色空间，便于颜色检测
-            hsv = cv2.cvtColor(processed_img, cv2.COLOR_BGR2HSV)
-            
-            # 定义白色的HSV范围（标签颜色）
-            lower_white = np.array([0, 0, 255 - self.color_tolerance.get()])
-            upper_white = np.array([180, self.color_tolerance.get(), 255])
-            
-            # 创建掩码
-            mask = cv2.inRange(hsv, lower_white, upper_white)
-            
-            # 形态学操作，去除噪声
-            kernel = np.ones((5, 5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            
-            # 查找轮廓
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # 筛选轮廓（基于面积）
-            self.detected_contours = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if self.min_area.get() < area < self.max_area.get():
-                    # 获取最小外接矩形
-                    x, y, w, h = cv2.boundingRect(contour)
-                    self.detected_contours.append((x, y, w, h))
-                    
-                    # 在图像上绘制边界框
-                    cv2.rectangle(processed_img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    
-                    # 标记序号
-                    cv2.putText(processed_img, f"{len(self.detected_contours)}", 
-                               (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+            # 按颜色和面积检测标签区域，并在副本上标出序号
+            self.detected_contours, processed_img = sticker_core.detect_stickers(
+                self.sticker_image, self.color_tolerance.get(), self.min_area.get(), self.max_area.get())
             
             # 转换为RGB格式以便在Tkinter中显示
+            import cv2
             rgb_processed = cv2.cvtColor(processed_img, cv2.COLOR_BGR2RGB)
             self.processed_image = Image.fromarray(rgb_processed)
             
@@ -354,9 +309,8 @@ class ImageBasedStickerGeneratorApp:
             
             # 处理数据分页
             if self.raw_data:
-                self.total_pages = max(1, math.ceil(len(self.raw_data) / len(self.detected_contours)))
-                self.paged_data = [self.raw_data[i*len(self.detected_contours):(i+1)*len(self.detected_contours)] 
-                                  for i in range(self.total_pages)]
+                self.paged_data = sticker_core.paginate(self.raw_data, len(self.detected_contours))
+                self.total_pages = len(self.paged_data)
                 self.current_page = 0
                 self.update_page_label()
             
@@ -369,39 +323,13 @@ class ImageBasedStickerGeneratorApp:
     def load_data(self, file_path):
         """加载并过滤数据"""
         try:
-            if file_path.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_path)
-            else:  # CSV
-                encodings = ['utf-8', 'gbk', 'gb2312']
-                for encoding in encodings:
-                    try:
-                        df = pd.read_csv(file_path, encoding=encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                else:
-                    raise ValueError("无法解析CSV编码，请尝试UTF-8格式")
-            
-            # 验证必要列
-            required = ['device_code', 'password']
-            missing = [c for c in required if c not in df.columns]
-            if missing:
-                raise ValueError(f"文件缺少必要列：{', '.join(missing)}")
-            
-            # 过滤空行
-            self.raw_data = []
-            for _, row in df.iterrows():
-                dev = str(row['device_code']).strip() if pd.notna(row['device_code']) else ""
-                pwd = str(row['password']).strip() if pd.notna(row['password']) else ""
-                if dev or pwd:
-                    self.raw_data.append((dev, pwd))
+            # CSV/Excel/纯文本统一加载为列式数据，过滤空行
+            self.raw_data = DeviceBatch.load(file_path).non_empty().pairs()
             
             # 分页处理（如果已有检测到的标签）
             if self.detected_contours:
-                items_per_page = len(self.detected_contours)
-                self.total_pages = max(1, math.ceil(len(self.raw_data) / items_per_page))
-                self.paged_data = [self.raw_data[i*items_per_page:(i+1)*items_per_page] 
-                                  for i in range(self.total_pages)]
+                self.paged_data = sticker_core.paginate(self.raw_data, len(self.detected_contours))
+                self.total_pages = len(self.paged_data)
             else:
                 self.total_pages = 0
                 self.paged_data = []
@@ -428,6 +356,9 @@ class ImageBasedStickerGeneratorApp:
         self.page_label.config(text=f"第 {self.current_page + 1}/{self.total_pages} 页")
     
     def start_generation(self):
+        if self.scheduler is not None:
+            messagebox.showwarning("警告", "正在生成，请等待完成或取消")
+            return
         if not self.paged_data or not self.detected_contours:
             messagebox.showwarning("警告", "请先加载数据并检测标签")
             return
@@ -436,165 +367,74 @@ class ImageBasedStickerGeneratorApp:
         if not output_dir:
             return
             
-        self.generating = True
+        # PDF选项在主线程读取，工作进程只拿到这个值
+        self.output_pdf = self.pdf_output_var.get()
         self.progress_var.set(0)
         self.status_var.set(f"开始生成 {self.total_pages} 张图片...")
         
-        threading.Thread(target=self.generate_all_pages, args=(output_dir,), daemon=True).start()
+        self.generate_all_pages(output_dir)
+    
+    def cancel_generation(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+            self.status_var.set("正在取消...")
     
     def generate_all_pages(self, output_dir):
-        """生成所有页图片"""
-        for page_num in range(self.total_pages):
-            if not self.generating:
-                break
-            self.queue.put((page_num + 1, self.paged_data[page_num], output_dir))
-        
-        # 启动工作线程
-        threads = [threading.Thread(target=self.image_worker) 
-                  for _ in range(min(self.max_threads, self.total_pages))]
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
-        
-        self.generating = False
+        """在进程池中生成所有页图片，进度和结果由调度器在主线程回调"""
+        try:
+            workers = self.workers_var.get()
+        except tk.TclError:
+            workers = 1
+        
+        # 合并为PDF：子进程编码好1位页面，主进程按页序写入同一个文件
+        if self.output_pdf:
+            self.sink = sticker_core.PageSink(output_dir, "1", "pdf")
+        else:
+            self.sink = sticker_core.PageSink(output_dir)
+        
+        # 页面与原始图像大小相同（单色PDF在L模式下渲染）
+        img_height, img_width = self.sticker_image.shape[:2]
+        render = functools.partial(sticker_core.render_contour_page, contours=list(self.detected_contours),
+                                   size=(img_width, img_height), font_path=self.default_font,
+                                   output_mode=self.sink.output_mode)
+        pages = [(page_num + 1, data) for page_num, data in enumerate(self.paged_data)]
+        
+        self.scheduler = PageScheduler(self.root, workers, on_progress=self.on_page_done,
+                                       on_error=self.on_page_error, on_done=self.on_generation_done)
+        self.scheduler.start(pages, render, self.sink.encoder(), self.sink.commit)
+    
+    def on_page_done(self, done, total, page_num):
+        self.progress_var.set(done / total * 100)
+        self.status_var.set(f"已生成：第 {page_num} 页（{done}/{total}）")
+    
+    def on_page_error(self, page_num, message):
+        print(f"错误：第 {page_num} 页：{message}")
+        self.status_var.set(f"第 {page_num} 页生成失败：{message}")
+    
+    def on_generation_done(self, completed, failed, cancelled):
+        self.scheduler = None
+        self.sink.close()
+        render_profile.report("生成所有页面")
+        
+        if cancelled:
+            self.status_var.set(f"已取消：生成了 {completed}/{self.total_pages} 张图片")
+            return
+        if failed:
+            pages = "、".join(str(page_num) for page_num, _ in failed[:10])
+            self.status_var.set(f"完成 {completed} 张，{len(failed)} 页失败")
+            messagebox.showerror("部分页面失败",
+                                 f"已生成 {completed} 张图片，以下页面失败：{pages}"
+                                 f"{' 等' if len(failed) > 10 else ''}\n\n{failed[0][1]}")
+            return
         self.progress_var.set(100)
-        self.status_var.set(f"生成完成：{self.total_pages}张图片保存至 {output_dir}")
+        self.status_var.set(f"生成完成：{self.total_pages}张图片保存至 {self.sink.path}")
         messagebox.showinfo("完成", f"已生成 {self.total_pages} 张图片")
     
     def get_font(self, size):
         """获取指定大小的字体"""
-        try:
-            if self.default_font:
-                return ImageFont.truetype(self.default_font, size)
-            return ImageFont.load_default()
-        except:
-            return ImageFont.load_default()
-    
-    def fit_text_to_box(self, draw, text, box_width, box_height, font_path, min_size=5, max_size=30):
-        """调整文字大小以适应方框"""
-        # 尝试调整字体大小
-        for size in range(max_size, min_size - 1, -1):
-            font = ImageFont.truetype(font_path, size) if font_path else ImageFont.load_default()
-            bbox = font.getbbox(text)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            if text_width <= box_width and text_height <= box_height:
-                return (font, None)  # 无需变形
-        
-        # 如果最大字体仍超出宽度，创建文字图像并轻微变形
-        font = ImageFont.truetype(font_path, max_size) if font_path else ImageFont.load_default()
-        text_img = Image.new('L', (int(box_width * 1.2), int(box_height * 1.2)), 0)
-        text_draw = ImageDraw.Draw(text_img)
-        text_draw.text((0, 0), text, font=font, fill=255)
-        
-        # 计算缩放比例
-        bbox = text_img.getbbox()
-        if not bbox:
-            return (font, None)
-            
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        scale_x = min(box_width / text_width, 1.2)
-        scale_y = min(box_height / text_height, 1.2)
-        
-        # 缩放文字图像
-        scaled_img = text_img.resize(
-            (int(text_width * scale_x), int(text_height * scale_y)),
-            Image.Resampling.LANCZOS
-        )
-        
-        return (None, scaled_img)
-    
-    def image_worker(self):
-        """图片生成工作线程"""
-        while not self.queue.empty() and self.generating:
-            try:
-                page_num, data, output_dir = self.queue.get(timeout=1)
-                img_path = os.path.join(output_dir, f"page_{page_num}.png")
-                
-                # 创建与原始图像大小相同的图像
-                img_height, img_width = self.sticker_image.shape[:2]
-                img = Image.new('RGB', (img_width, img_height), color='white')
-                draw = ImageDraw.Draw(img)
-                
-                # 绘制每个标签内容
-                for idx, (device_code, password) in enumerate(data):
-                    if idx >= len(self.detected_contours):
-                        break  # 防止数据超出检测到的标签数量
-                        
-                    x, y, w, h = self.detected_contours[idx]
-                    
-                    # 计算上下区域高度（各占一半）
-                    upper_height = h / 2
-                    lower_height = h / 2
-                    
-                    # 绘制设备码（顶部）
-                    if device_code:
-                        text = f"设备码：{device_code}"
-                        # 适配文字到上半区域
-                        font, text_img = self.fit_text_to_box(
-                            draw, text, 
-                            w - 10, upper_height - 10,  # 留一点边距
-                            self.default_font
-                        )
-                        
-                        if text_img:
-                            # 绘制变形文字
-                            img.paste(
-                                ImageOps.colorize(text_img, (255,255,255), (0,0,0)),
-                                (x + 5, y + 5),
-                                text_img
-                            )
-                        else:
-                            # 绘制正常文字
-                            draw.text(
-                                (x + 5, y + 5),
-                                text,
-                                font=font,
-                                fill='black'
-                            )
-                    
-                    # 绘制密码（底部）
-                    if password:
-                        text = f"密钥：{password}"
-                        # 适配文字到下半区域
-                        font, text_img = self.fit_text_to_box(
-                            draw, text, 
-                            w - 10, lower_height - 10,  # 留一点边距
-                            self.default_font
-                        )
-                        
-                        if text_img:
-                            # 绘制变形文字
-                            img.paste(
-                                ImageOps.colorize(text_img, (255,255,255), (0,0,0)),
-                                (x + 5, y + int(upper_height) + 5),
-                                text_img
-                            )
-                        else:
-                            # 绘制正常文字
-                            draw.text(
-                                (x + 5, y + int(upper_height) + 5),
-                                text,
-                                font=font,
-                                fill='black'
-                            )
-                
-                # 保存图片
-                img.save(img_path, dpi=(DPI, DPI))
-                
-                # 更新进度
-                progress = (page_num / self.total_pages) * 100
-                self.progress_var.set(progress)
-                self.status_var.set(f"已生成：第 {page_num} 页")
-                
-            except Exception as e:
-                self.status_var.set(f"生成失败：{str(e)}")
-                print(f"错误：{e}")
-            finally:
-                self.queue.task_done()
+        if self.default_font:
+            return font_registry.load_font([self.default_font], size)
+        return font_registry.default_font()
 
 if __name__ == "__main__":
     root = tk.Tk()
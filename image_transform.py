@@ -0,0 +1,43 @@
+import math
+from PIL import Image
+
+
+# ----------------------------------------------------------------------
+# 文字块的倾斜变换（barcode_designer、label_editor共用）
+#
+# 原来逐像素getpixel/putpixel正向映射，几百像素见方的文字块要几十毫秒，且正向映射
+# 会在目标图像中留下空洞。这里用仿射逆映射一次完成（Image.transform），
+# 每个目标像素都从源图像采样，没有空洞。
+# ----------------------------------------------------------------------
+
+TRANSPARENT = (255, 255, 255, 0)
+
+
+def skew_image(image, skew_x, skew_y, resample=Image.Resampling.BICUBIC):
+    """倾斜图像：x' = x + y·tan(skew_x)，y' = y + x·tan(skew_y)（角度为度），返回RGBA图像
+
+    结果尺寸为 宽 + |高·tan(skew_x)| × 高 + |宽·tan(skew_y)|，负角度时整体平移，内容不会被裁掉。
+    """
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    width, height = image.size
+    tan_x = math.tan(math.radians(skew_x))
+    tan_y = math.tan(math.radians(skew_y))
+
+    # 正向矩阵 [[1, tan_x], [tan_y, 1]]；两个方向同时倾斜45°时不可逆，改为先X后Y依次错切
+    a, b, c, d = 1.0, tan_x, tan_y, 1.0
+    if abs(a * d - b * c) < 1e-3:
+        d = 1.0 + tan_x * tan_y
+    det = a * d - b * c
+
+    corners = [(a * x + b * y, c * x + d * y) for x, y in ((0, 0), (width, 0), (0, height), (width, height))]
+    left = min(x for x, _ in corners)
+    top = min(y for _, y in corners)
+    new_width = max(1, int(max(x for x, _ in corners) - left))
+    new_height = max(1, int(max(y for _, y in corners) - top))
+
+    # Image.transform需要逆映射：源坐标 = M⁻¹ · (目标坐标 + 平移)
+    inverse = (d / det, -b / det, (d * left - b * top) / det,
+               -c / det, a / det, (a * top - c * left) / det)
+    return image.transform((new_width, new_height), Image.Transform.AFFINE, inverse,
+                           resample=resample, fillcolor=TRANSPARENT)
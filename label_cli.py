@@ -0,0 +1,268 @@
+"""标签生成命令行工具（不依赖tkinter，可在无显示的打印服务器或定时任务中运行）
+
+    python label_cli.py coordinate --config label_generator_config.json --devices devices.csv --output out
+    python label_cli.py sticker --devices devices.xlsx --output out --format pdf --mode 1
+    python label_cli.py image-sticker --image sheet.png --devices devices.csv --output out --pdf
+    python label_cli.py keys --count 1000 --seed 123456 --output keys.csv
+
+coordinate的--config为坐标标签生成器的配置文件；其他子命令的--config为JSON，
+键与命令行参数同名（如{"format": "pdf", "mode": "1", "font": "simhei.ttf"}），命令行参数优先。
+完成后输出页数、标签数和吞吐量（页/秒、标签/秒）；--profile另外输出分阶段耗时，
+--trace 文件名 同时保存Chrome trace。
+"""
+import argparse
+import json
+import os
+import functools
+import sys
+import time
+
+import page_output
+import render_profile
+import vector_output
+
+
+OUTPUT_FORMATS = page_output.IMAGE_FORMATS + ("pdf",) + vector_output.VECTOR_FORMATS
+
+
+def report(pages, labels, elapsed, output):
+    """打印吞吐量统计"""
+    elapsed = max(elapsed, 1e-9)
+    print(f"{pages} 页, {labels} 个标签, 用时 {elapsed:.2f} 秒 "
+          f"({pages / elapsed:.2f} 页/秒, {labels / elapsed:.1f} 标签/秒)")
+    print(f"输出：{output}")
+
+
+def progress(page, total_pages):
+    print(f"\r已完成 {page}/{total_pages} 页", end="", file=sys.stderr, flush=True)
+    if page == total_pages:
+        print(file=sys.stderr)
+
+
+# ----------------------------------------------------------------------
+# 子命令
+# ----------------------------------------------------------------------
+def run_coordinate(args):
+    """坐标标签：与打印条码/1.py相同的渲染核心"""
+    from label_generator_core import LabelGeneratorCore, PDF_FILENAME
+
+    core = LabelGeneratorCore()
+    if args.config and not core.load_config(args.config):
+        raise SystemExit(f"无法加载配置文件 {args.config}：{core.last_error or '文件不存在'}")
+    if args.font:
+        core.selected_font = args.font
+    if args.mode:
+        core.config["output_mode"] = args.mode
+    # 高度与默认A4相同时保持__init__中的3508像素（update_paper_size按毫米换算会得到3507）
+    height_mm = core.config.get("custom_height_mm")
+    if height_mm and height_mm != core.a4_height_mm:
+        core.update_paper_size(height_mm)
+
+    if args.coordinates:
+        core.load_coordinates(args.coordinates)
+    core.load_devices(args.devices)
+
+    start = time.perf_counter()
+    total_pages = core.prepare_pages(core.params_from_config())
+    success, total_pages = core.export_all_pages(
+        args.output, crop_margin_mm=args.crop_mm, progress_callback=progress,
+        error_callback=lambda index, error: print(f"\n设备 {index} 渲染失败：{error}", file=sys.stderr),
+        workers=args.workers, compress_level=args.compress_level,
+        skip_unchanged=args.skip_unchanged, image_format=args.format)
+    if not success:
+        raise SystemExit(f"导出失败：{core.last_error}")
+
+    output = args.output
+    if args.format in ("pdf", "pdf-vector"):
+        output = os.path.join(args.output, PDF_FILENAME)
+    report(total_pages, len(core.devices), time.perf_counter() - start, output)
+    if core.export_skipped:
+        print(f"{core.export_skipped} 页内容未变，已跳过")
+
+
+def _schedule_pages(paged_data, render, sink, workers):
+    """用页面调度器（多进程）渲染贴纸页面并写入sink，返回标签总数
+
+    render(data)要传给子进程，必须是模块级函数的functools.partial。
+    """
+    from page_scheduler import PageScheduler
+
+    pages = list(enumerate(paged_data, 1))
+    scheduler = PageScheduler(None, workers, on_progress=lambda done, total, page_num: progress(done, total))
+    try:
+        completed, failed, _ = scheduler.run(pages, render, sink.encoder(), sink.commit)
+    finally:
+        sink.close()
+
+    for page_num, message in failed:
+        print(f"第 {page_num} 页生成失败：{message}", file=sys.stderr)
+    if failed:
+        raise SystemExit(1)
+    return sum(len(data) for data in paged_data)
+
+
+def _load_pairs(filename):
+    from device_table import DeviceBatch
+    return DeviceBatch.load(filename).non_empty().pairs()
+
+
+def _sticker_font(font_path, vector):
+    import sticker_core
+
+    font = sticker_core.find_font(font_path)
+    if font is None and vector:
+        raise SystemExit("矢量输出需要TrueType字体，请用--font指定")
+    return font
+
+
+def run_sticker(args):
+    """网格贴纸：与sticker_generator.py相同的渲染"""
+    import sticker_core
+
+    vector = vector_output.is_vector_format(args.format)
+    font = _sticker_font(args.font, vector)
+    paged_data = sticker_core.paginate(_load_pairs(args.devices), sticker_core.COLUMNS * sticker_core.ROWS)
+
+    start = time.perf_counter()
+    sink = sticker_core.PageSink(args.output, args.mode, args.format)
+    render = functools.partial(sticker_core.render_grid_page, font_path=font, output_mode=args.mode, vector=vector)
+    labels = _schedule_pages(paged_data, render, sink, args.threads)
+    report(len(paged_data), labels, time.perf_counter() - start, sink.path)
+
+
+def run_image_sticker(args):
+    """按贴纸图像检测标签位置：与image_based_sticker_generator.py相同的检测和渲染"""
+    import cv2
+    import sticker_core
+
+    image = cv2.imread(args.image)
+    if image is None:
+        raise SystemExit(f"无法读取图像文件 {args.image}")
+    contours, _ = sticker_core.detect_stickers(image, args.tolerance, args.min_area, args.max_area)
+    if not contours:
+        raise SystemExit("未检测到标签，请调整--tolerance/--min-area/--max-area")
+    print(f"检测到 {len(contours)} 个标签")
+
+    font = _sticker_font(args.font, False)
+    paged_data = sticker_core.paginate(_load_pairs(args.devices), len(contours))
+    size = (image.shape[1], image.shape[0])
+
+    start = time.perf_counter()
+    if args.pdf:
+        sink = sticker_core.PageSink(args.output, "1", "pdf")
+    else:
+        sink = sticker_core.PageSink(args.output)
+    render = functools.partial(sticker_core.render_contour_page, contours=contours, size=size, font_path=font,
+                               output_mode=sink.output_mode)
+    labels = _schedule_pages(paged_data, render, sink, args.threads)
+    report(len(paged_data), labels, time.perf_counter() - start, sink.path)
+
+
+def run_keys(args):
+    """可逆密码CSV：与csv_generator.py相同的算法"""
+    import reversible_keys
+
+    start = time.perf_counter()
+    rows = reversible_keys.generate_keys(args.count, args.seed)
+    reversible_keys.write_keys_csv(args.output, rows)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{len(rows)} 条记录, 用时 {elapsed:.2f} 秒 ({len(rows) / elapsed:.0f} 条/秒)")
+    print(f"输出：{args.output}")
+
+
+# ----------------------------------------------------------------------
+# 参数解析
+# ----------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="标签批量生成（命令行）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # 各子命令共用的分阶段计时选项
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", action="store_true", help="输出分阶段耗时汇总")
+    common.add_argument("--trace", help="分阶段耗时另存为Chrome trace JSON（同时打开--profile）")
+
+    p = subparsers.add_parser("coordinate", parents=[common], help="坐标标签（打印条码/1.py）")
+    p.add_argument("--config", help="坐标标签生成器的配置文件（JSON）")
+    p.add_argument("--coordinates", help="坐标文件（可选）")
+    p.add_argument("--devices", required=True, help="设备文件（CSV、Excel或纯文本）")
+    p.add_argument("--output", required=True, help="输出目录")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="png")
+    p.add_argument("--mode", choices=page_output.OUTPUT_MODES, help="页面模式，默认取配置文件中的output_mode")
+    p.add_argument("--font", help="字体文件")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    p.add_argument("--crop-mm", type=float, default=0, help="四边裁切宽度（毫米）")
+    p.add_argument("--compress-level", type=int, default=6, choices=range(10), metavar="0-9")
+    p.add_argument("--skip-unchanged", action="store_true",
+                   help="输出目录中已有内容相同的页面时跳过写入（按文件中记录的内容哈希判断）")
+    p.set_defaults(func=run_coordinate)
+
+    p = subparsers.add_parser("sticker", parents=[common], help="网格贴纸（sticker_generator.py）")
+    p.add_argument("--config", help="JSON配置，键与参数同名")
+    p.add_argument("--devices", required=True, help="设备文件（CSV、Excel或纯文本）")
+    p.add_argument("--output", required=True, help="输出目录")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="png")
+    p.add_argument("--mode", choices=page_output.OUTPUT_MODES, default="RGB")
+    p.add_argument("--font", help="字体文件，默认查找系统中文字体")
+    p.add_argument("--threads", "--workers", dest="threads", type=int, default=os.cpu_count() or 1,
+                   help="渲染进程数（1为在当前进程中串行渲染）")
+    p.set_defaults(func=run_sticker)
+
+    p = subparsers.add_parser("image-sticker", parents=[common], help="按贴纸图像检测位置（image_based_sticker_generator.py）")
+    p.add_argument("--config", help="JSON配置，键与参数同名")
+    p.add_argument("--image", required=True, help="贴纸图像")
+    p.add_argument("--devices", required=True, help="设备文件（CSV、Excel或纯文本）")
+    p.add_argument("--output", required=True, help="输出目录")
+    p.add_argument("--tolerance", type=int, default=30, help="颜色容差")
+    p.add_argument("--min-area", type=int, default=500)
+    p.add_argument("--max-area", type=int, default=50000)
+    p.add_argument("--pdf", action="store_true", help="合并为单色PDF")
+    p.add_argument("--font", help="字体文件，默认查找系统中文字体")
+    p.add_argument("--threads", "--workers", dest="threads", type=int, default=os.cpu_count() or 1,
+                   help="渲染进程数（1为在当前进程中串行渲染）")
+    p.set_defaults(func=run_image_sticker)
+
+    p = subparsers.add_parser("keys", parents=[common], help="可逆密码CSV（csv_generator.py）")
+    p.add_argument("--config", help="JSON配置，键与参数同名")
+    p.add_argument("--count", type=int, required=True)
+    p.add_argument("--seed", type=int, required=True)
+    p.add_argument("--output", required=True, help="CSV文件")
+    p.set_defaults(func=run_keys)
+
+    return parser, subparsers
+
+
+def parse_args(argv=None):
+    """解析参数；非coordinate子命令的--config作为默认值，命令行显式给出的参数优先"""
+    parser, subparsers = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # 先只取子命令和--config，把配置写入子命令的默认值后再完整解析（此时必填项可由配置提供）
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("command", nargs="?")
+    pre.add_argument("--config")
+    known, _ = pre.parse_known_args(argv)
+    if known.command in subparsers.choices and known.command != "coordinate" and known.config:
+        with open(known.config, "r", encoding="utf-8") as f:
+            defaults = {key.replace("-", "_"): value for key, value in json.load(f).items()}
+        sub = subparsers.choices[known.command]
+        for action in sub._actions:
+            if action.dest in defaults:
+                action.required = False
+        sub.set_defaults(**defaults)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = args.output if args.command != "keys" else os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    if args.profile or args.trace:
+        render_profile.enable(args.trace)
+    args.func(args)
+    render_profile.report()
+
+
+if __name__ == "__main__":
+    main()
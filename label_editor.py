@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, colorchooser, filedialog, messagebox, scrolledtext
 import os
-import math
 from PIL import Image, ImageTk, ImageDraw, ImageFont
+import image_transform
 
 class TextLabelEditor:
     def __init__(self, root, main_app):
@@ -423,7 +423,7 @@ class TextLabelEditor:
                 )
             
             if self.skew_x_var.get() != 0 or self.skew_y_var.get() != 0:
-                temp_img = self._skew_image(temp_img, self.skew_x_var.get(), self.skew_y_var.get())
+                temp_img = image_transform.skew_image(temp_img, self.skew_x_var.get(), self.skew_y_var.get())
             
             if self.rotation_var.get() != 0:
                 temp_img = temp_img.rotate(self.rotation_var.get(), expand=True)
@@ -495,31 +495,6 @@ class TextLabelEditor:
                 fill="red"
             )
     
-    def _skew_image(self, image, skew_x, skew_y):
-        """倾斜图像"""
-        width, height = image.size
-        skew_x_rad = math.radians(skew_x)
-        skew_y_rad = math.radians(skew_y)
-        
-        # 计算倾斜后的新尺寸
-        new_width = int(width + abs(height * math.tan(skew_x_rad)))
-        new_height = int(height + abs(width * math.tan(skew_y_rad)))
-        
-        # 创建新图像
-        result = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 0))
-        
-        # 逐个像素应用倾斜变换
-        for y in range(height):
-            for x in range(width):
-                pixel = image.getpixel((x, y))
-                if pixel[3] > 0:  # 只处理非透明像素
-                    new_x = x + int(y * math.tan(skew_x_rad))
-                    new_y = y + int(x * math.tan(skew_y_rad))
-                    if 0 <= new_x < new_width and 0 <= new_y < new_height:
-                        result.putpixel((new_x, new_y), pixel)
-        
-        return result
-    
     def apply_settings(self):
         """应用设置到主程序"""
         try:
@@ -534,7 +509,6 @@ class TextLabelEditor:
                 'color': rgb,
                 'x_offset': self.x_offset_var.get(),
                 'y_offset': self.y_offset_var.get(),
-                'rotation': self.rotation
                 'rotation': self.rotation_var.get(),
                 'scale_x': self.scale_x_var.get(),
                 'scale_y': self.scale_y_var.get(),
@@ -0,0 +1,888 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from PIL import Image, ImageDraw
+from glyph_cache import GlyphCache, StretchedTextCache
+from device_table import DeviceBatch, read_table
+import label_layout
+import page_output
+import pdf_output
+import vector_output
+import render_profile
+import font_registry
+
+PAGE_DIGEST_PREFIX = "label-page-digest:"
+PDF_FILENAME = "label_pages.pdf"
+
+
+class LabelGeneratorCore:
+    """坐标标签生成器的渲染核心（不依赖tkinter，可在无显示环境下运行）
+
+    参数字典 + 坐标 + 设备表 输入，A4页面图像输出。
+    Tk界面、命令行和测试脚本共用同一套渲染逻辑，保证输出逐字节一致。
+    """
+
+    def __init__(self, config_file="label_generator_config.json"):
+        # 配置文件路径
+        self.config_file = config_file
+
+        # A4纸张尺寸（毫米）和对应像素（300dpi）
+        self.a4_width_mm = 210
+        self.a4_height_mm = 297
+        self.a4_width_px = 2480  # 300dpi下A4宽度像素
+        self.a4_height_px = 3508  # 300dpi下A4高度像素
+        self.mm_to_px = self.a4_width_px / self.a4_width_mm  # 毫米到像素的转换因子（约11.811像素/毫米）
+
+        # 网格设置 - 统一为3毫米
+        self.grid_size_mm = 3  # 网格尺寸（毫米）
+        self.grid_size_px = int(round(self.grid_size_mm * self.mm_to_px))  # 转换为像素
+
+        # 边距设置（毫米）
+        self.margin_left_mm = 10
+        self.margin_right_mm = 10
+        self.margin_top_mm = 10
+        self.margin_bottom_mm = 10
+
+        # 转换为像素
+        self.margin_left_px = int(round(self.margin_left_mm * self.mm_to_px))
+        self.margin_right_px = int(round(self.margin_right_mm * self.mm_to_px))
+        self.margin_top_px = int(round(self.margin_top_mm * self.mm_to_px))
+        self.margin_bottom_px = int(round(self.margin_bottom_mm * self.mm_to_px))
+
+        # 有效打印区域
+        self.print_width_px = self.a4_width_px - self.margin_left_px - self.margin_right_px
+        self.print_height_px = self.a4_height_px - self.margin_top_px - self.margin_bottom_px
+
+        # 设置中文字体支持
+        self.system_fonts = ["simhei.ttf", "microsoftyahei.ttf", "simsun.ttc", "simkai.ttf",
+                             "msyh.ttc", "msyhbd.ttc", "simfang.ttf"]
+        self.selected_font = None
+
+        # 页面背景缓存（网格、标度尺、点标记），键为布局参数
+        self._backgrounds = OrderedDict()
+        self.background_cache_size = 2
+
+        # 字形缓存：每个字符只栅格化一次
+        self.glyph_cache = GlyphCache()
+        # 拉伸模式下固定前缀的精灵缓存
+        self.stretch_cache = StretchedTextCache(self.glyph_cache)
+
+        # 点标记设置
+        self.dot_radius_px = 2  # 点标记半径（像素）
+
+        # 默认参数（6排14行），拉伸为百分比，与配置文件格式一致
+        self.default_params = {
+            "points_per_page": 84,  # 6×14=84
+            "rows": 14,
+            "columns": 6,
+            "x_spacing": 90,       # 列间距百分比
+            "y_spacing": 57,       # 行间距百分比
+            "font_size": 30,
+            "spacing": 4,
+            "number_spacing": 2,   # 数字间隔（仅设备码和密码）
+            "x_offset": 20,
+            "y_offset": 36,
+            "x_stretch": 100,
+            "y_stretch": 100,
+            "debug_mode": True,
+            "print_grid": False,
+            "print_dot": True,     # 点标记始终打印
+            "prefix_sprites": True,  # 拉伸时前缀只缩放一次；False则整行缩放（与旧版逐字节一致）
+            "output_mode": "RGB",    # 页面模式：RGB彩色 / L灰度 / 1单色（见page_output）
+            "column_pitches": None,  # 相邻列间距（像素）列表，设置后替代平均分布和x_spacing
+            "row_pitches": None,     # 相邻行间距（像素）列表，设置后替代平均分布和y_spacing
+            "custom_height_mm": 297
+        }
+        self.config = dict(self.default_params)
+
+        # 数据存储
+        self.coordinates_df = None
+        self.devices = None         # DeviceBatch：列式设备数据
+        self.generated_images = []  # 存储所有生成的图像（非流式模式）
+        self.page_params = None     # 最近一次生成使用的参数，流式模式按需渲染
+        self.layout = None          # 整批设备的布局数组（label_layout）
+        self.total_pages = 0
+        self._cached_page = (None, None)  # 流式模式下仅缓存当前预览页
+        self.export_skipped = 0     # 最近一次导出中内容未变而跳过的页数
+        self.last_error = None
+
+    # ------------------------------------------------------------------
+    # 配置
+    # ------------------------------------------------------------------
+    def load_config(self, config_file=None):
+        """从配置文件加载参数，缺失的键使用默认值；成功返回True"""
+        config_file = config_file or self.config_file
+        if not os.path.exists(config_file):
+            return False
+
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+        self.config = dict(self.default_params)
+        self.config.update(loaded)
+        self.config_file = config_file
+        return True
+
+    def save_config(self, config, config_file=None):
+        """保存参数到配置文件；成功返回True"""
+        config_file = config_file or self.config_file
+        try:
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+        self.config = dict(config)
+        return True
+
+    def load_default_config(self):
+        self.config = dict(self.default_params)
+
+    def params_from_config(self, config=None):
+        """把配置（拉伸为百分比）转换为渲染参数（拉伸为比例）"""
+        config = dict(self.default_params, **(config if config is not None else self.config))
+        params = {key: config[key] for key in (
+            "rows", "columns", "points_per_page", "x_spacing", "y_spacing",
+            "font_size", "spacing", "number_spacing", "x_offset", "y_offset",
+            "debug_mode", "print_grid", "print_dot", "prefix_sprites", "output_mode",
+            "column_pitches", "row_pitches")}
+        params["x_stretch"] = config["x_stretch"] / 100.0
+        params["y_stretch"] = config["y_stretch"] / 100.0
+        return params
+
+    def update_paper_size(self, height_mm):
+        """修改纸张高度（宽度固定为A4的210mm）"""
+        self.a4_height_mm = height_mm
+        self.a4_height_px = int(round(height_mm * self.mm_to_px))
+        self.print_height_px = self.a4_height_px - self.margin_top_px - self.margin_bottom_px
+
+    # ------------------------------------------------------------------
+    # 数据加载
+    # ------------------------------------------------------------------
+    def load_coordinates(self, filename):
+        self.coordinates_df = read_table(filename)
+        return self.coordinates_df
+
+    def load_devices(self, filename):
+        """加载设备文件（CSV、Excel或纯文本），规范化为列式DeviceBatch"""
+        self.devices = DeviceBatch.load(filename)
+        return self.devices
+
+    # ------------------------------------------------------------------
+    # 绘制
+    # ------------------------------------------------------------------
+    def get_font(self, size):
+        """选定字体优先，其次依次尝试系统字体，都失败时使用默认字体（字体对象由注册表共享）"""
+        return font_registry.load_font([self.selected_font] + self.system_fonts, size)
+
+    def calculate_positions(self, rows, columns, x_spacing, y_spacing, column_pitches=None, row_pitches=None):
+        """计算行列的平均间距位置（x_spacing/y_spacing为百分比），返回[(x, y), ...]"""
+        xs, ys = self.calculate_slot_positions(rows, columns, x_spacing, y_spacing, column_pitches, row_pitches)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def calculate_slot_positions(self, rows, columns, x_spacing, y_spacing, column_pitches=None, row_pitches=None):
+        """一页内各槽位的中心坐标数组(xs, ys)，按行优先排列
+
+        column_pitches/row_pitches为相邻列/行的间距（像素）列表，可以不均匀；
+        不设置时按有效打印区域平均分布并乘以百分比。
+        """
+        # 计算列间距（平均分布）
+        if column_pitches is not None:
+            col_spacing = column_pitches
+        elif columns > 1:
+            col_spacing = self.print_width_px / (columns - 1) * (x_spacing / 100.0)
+        else:
+            col_spacing = 0
+
+        # 计算行间距（平均分布）
+        if row_pitches is not None:
+            row_spacing = row_pitches
+        elif rows > 1:
+            row_spacing = self.print_height_px / (rows - 1) * (y_spacing / 100.0)
+        else:
+            row_spacing = 0
+
+        return label_layout.slot_positions(rows, columns, self.margin_left_px, self.margin_top_px,
+                                           col_spacing, row_spacing)
+
+    def params_positions(self, params):
+        """按渲染参数计算槽位坐标，返回N×2数组"""
+        xs, ys = self.calculate_slot_positions(params["rows"], params["columns"],
+                                               params["x_spacing"], params["y_spacing"],
+                                               params.get("column_pitches"), params.get("row_pitches"))
+        return np.column_stack((xs, ys))
+
+    def draw_text_with_spacing(self, draw, text, x, y, font, spacing=0):
+        """在指定位置绘制带有字符间距的文本（贴缓存的字形蒙版），返回总宽度"""
+        return self.glyph_cache.draw_text_with_spacing(draw, text, x, y, font, spacing)
+
+    def draw_debug_elements(self, draw, width, height, debug_mode, include_in_export=False, monochrome=False):
+        """绘制调试元素：3毫米网格和毫米标度尺
+
+        monochrome: 在L模式的单色页面上绘制，灰色在二值化后会消失，改用黑色
+        """
+        # 只有在调试模式或设置了导出包含网格时才绘制
+        if not (debug_mode or include_in_export):
+            return
+
+        # 绘制3毫米网格（基于精确的毫米到像素转换）
+        if monochrome:
+            grid_color = 0
+        else:
+            grid_color = (200, 200, 200, 100) if debug_mode else (200, 200, 200)
+
+        # 横向网格线（Y方向）
+        for y in range(0, height, self.grid_size_px):
+            draw.line([(0, y), (width, y)], fill=grid_color, width=1)
+
+        # 纵向网格线（X方向）
+        for x in range(0, width, self.grid_size_px):
+            draw.line([(x, 0), (x, height)], fill=grid_color, width=1)
+
+        # 绘制毫米标度尺（边缘刻度）- 仅在调试模式显示
+        if debug_mode:
+            ruler_color = 0 if monochrome else (100, 100, 100)
+            font = self.get_font(10)
+            mm_major_interval = 10  # 主刻度间隔（毫米）
+
+            # 次刻度间隔等于网格尺寸
+            px_minor_interval = self.grid_size_px
+
+            # 顶部标度尺
+            draw.line([(0, 0), (width, 0)], fill=ruler_color, width=2)
+            for x in range(0, width + 1, px_minor_interval):
+                # 计算对应的毫米值
+                mm_value = int(round(x / self.mm_to_px))
+
+                # 主刻度（每10毫米）
+                if mm_value % mm_major_interval == 0:
+                    draw.line([(x, 0), (x, 15)], fill=ruler_color, width=2)
+                    draw.text((x - 10, 15), f"{mm_value}mm", font=font, fill=ruler_color)
+                else:
+                    # 次刻度（每3毫米，与网格对齐）
+                    draw.line([(x, 0), (x, 8)], fill=ruler_color, width=1)
+
+            # 左侧标度尺
+            draw.line([(0, 0), (0, height)], fill=ruler_color, width=2)
+            for y in range(0, height + 1, px_minor_interval):
+                # 计算对应的毫米值
+                mm_value = int(round(y / self.mm_to_px))
+
+                # 主刻度（每10毫米）
+                if mm_value % mm_major_interval == 0:
+                    draw.line([(0, y), (15, y)], fill=ruler_color, width=2)
+                    draw.text((15, y - 5), f"{mm_value}mm", font=font, fill=ruler_color)
+                else:
+                    # 次刻度（每3毫米，与网格对齐）
+                    draw.line([(0, y), (8, y)], fill=ruler_color, width=1)
+
+    def _draw_label(self, image, draw, params, font, value1, value2, origins):
+        """绘制一个设备标签的文字：上行设备码，下行密钥（中心点标记在页面背景中）
+
+        origins为label_layout算好的 (text1_x, text1_y, text2_x, text2_y, total1_width, total2_width)
+        """
+        font_size = params["font_size"]
+        number_spacing = params["number_spacing"]
+        x_stretch = params["x_stretch"]
+        y_stretch = params["y_stretch"]
+        text1_x, text1_y, text2_x, text2_y, total1_width, total2_width = origins
+
+        label1 = "设备码："
+        label2 = "密钥："
+        glyphs = self.glyph_cache
+        label1_width = glyphs.advance(draw, label1, font)
+        label2_width = glyphs.advance(draw, label2, font)
+
+        # 绘制文字（支持拉伸变形）
+        if (x_stretch != 1.0 or y_stretch != 1.0) and params.get("prefix_sprites", True):
+            # 前缀贴缓存的拉伸精灵，只缩放值部分
+            self._paste_stretched_line(image, label1, value1, label1_width, text1_x, text1_y, font, params)
+            self._paste_stretched_line(image, label2, value2, label2_width, text2_x, text2_y, font, params)
+
+        elif x_stretch != 1.0 or y_stretch != 1.0:
+            # 处理第一行文字：标签 + 带间隔的设备码
+            temp_width = int(total1_width * 1.2)
+            temp_height = int(font_size * 1.2)
+            temp_img = Image.new('RGBA', (temp_width, temp_height), (255, 255, 255, 0))
+            temp_draw = ImageDraw.Draw(temp_img)
+
+            # 绘制标签（无间隔）
+            glyphs.draw_text(temp_draw, (0, 0), label1, font)
+            # 绘制设备码（有间隔）
+            self.draw_text_with_spacing(temp_draw, value1, label1_width, 0, font, number_spacing)
+
+            # 应用拉伸变形
+            new_width = int(temp_width * x_stretch)
+            new_height = int(temp_height * y_stretch)
+            transformed_img = temp_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            image.paste(transformed_img, (int(text1_x), int(text1_y)), transformed_img)
+
+            # 处理第二行文字：标签 + 带间隔的密码
+            temp_width2 = int(total2_width * 1.2)
+            temp_height2 = int(font_size * 1.2)
+            temp_img2 = Image.new('RGBA', (temp_width2, temp_height2), (255, 255, 255, 0))
+            temp_draw2 = ImageDraw.Draw(temp_img2)
+
+            # 绘制标签（无间隔）
+            glyphs.draw_text(temp_draw2, (0, 0), label2, font)
+            # 绘制密码（有间隔）
+            self.draw_text_with_spacing(temp_draw2, value2, label2_width, 0, font, number_spacing)
+
+            # 应用拉伸变形
+            new_width2 = int(temp_width2 * x_stretch)
+            new_height2 = int(temp_height2 * y_stretch)
+            transformed_img2 = temp_img2.resize((new_width2, new_height2), Image.Resampling.LANCZOS)
+            image.paste(transformed_img2, (int(text2_x), int(text2_y)), transformed_img2)
+
+        else:
+            # 正常绘制，不拉伸
+            # 绘制标签（无间隔）
+            glyphs.draw_text(draw, (text1_x, text1_y), label1, font)
+            # 绘制设备码（有间隔）
+            self.draw_text_with_spacing(draw, value1, text1_x + label1_width, text1_y, font, number_spacing)
+
+            # 绘制标签（无间隔）
+            glyphs.draw_text(draw, (text2_x, text2_y), label2, font)
+            # 绘制密码（有间隔）
+            self.draw_text_with_spacing(draw, value2, text2_x + label2_width, text2_y, font, number_spacing)
+
+    def _draw_slot_marks(self, draw, debug_draw, params, font, x, y):
+        """绘制(x, y)处的点标记，调试模式下在调试图层标出坐标"""
+        # 绘制点标记
+        if params.get("print_dot", True):
+            draw.ellipse([
+                (x - self.dot_radius_px, y - self.dot_radius_px),
+                (x + self.dot_radius_px, y + self.dot_radius_px)
+            ], fill='black')
+
+        # 在调试模式下显示坐标信息
+        if debug_draw:
+            # 显示像素和毫米双坐标
+            mm_x = round(x / self.mm_to_px, 1)
+            mm_y = round(y / self.mm_to_px, 1)
+            debug_draw.text((x + 10, y), f"({int(x)}px/{mm_x}mm, {int(y)}px/{mm_y}mm)",
+                            font=font, fill='red')
+
+    def _paste_stretched_line(self, image, label, value, label_width, x, y, font, params):
+        """拉伸模式下绘制一行：前缀精灵 + 单独缩放的值"""
+        font_size = params["font_size"]
+        x_stretch = params["x_stretch"]
+        y_stretch = params["y_stretch"]
+
+        with render_profile.phase("stretch"):
+            prefix = self.stretch_cache.get(label, font, font_size, x_stretch, y_stretch)
+            image.paste(prefix, (int(x), int(y)), prefix)
+
+            if value:
+                value_img = self.stretch_cache.render(value, font, font_size, x_stretch, y_stretch,
+                                                      spacing=params["number_spacing"])
+                image.paste(value_img, (int(x + label_width * x_stretch), int(y)), value_img)
+
+    # ------------------------------------------------------------------
+    # 分页渲染
+    # ------------------------------------------------------------------
+    def get_points_per_page(self, params):
+        return min(params["points_per_page"], params["rows"] * params["columns"])
+
+    def get_total_pages(self, params, devices=None):
+        """总页数；devices可以是DeviceBatch或布局数组等任意有长度的序列"""
+        devices = self.devices if devices is None else devices
+        points_per_page = self.get_points_per_page(params)
+        return max(1, (len(devices) + points_per_page - 1) // points_per_page)
+
+    def get_page_range(self, params, page, total_devices):
+        """返回第page页的设备序号范围[start, end)"""
+        points_per_page = self.get_points_per_page(params)
+        start_idx = page * points_per_page
+        end_idx = min((page + 1) * points_per_page, total_devices)
+        return start_idx, end_idx
+
+    def compute_layout(self, params, devices=None, positions=None, start_idx=0):
+        """一次性计算一批设备的布局数组（见label_layout），渲染和预览都按下标取值
+
+        devices为整批DeviceBatch或其中一段，start_idx为该段第一个设备在整批中的序号；
+        positions: 标签中心坐标（N×2），默认按参数计算
+        """
+        devices = self.devices if devices is None else devices
+        if positions is None:
+            positions = self.params_positions(params)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+
+        layout = label_layout.device_anchors(start_idx, len(devices), positions[:, 0], positions[:, 1],
+                                             self.get_points_per_page(params),
+                                             params["x_offset"], params["y_offset"])
+        layout["value1"] = devices.device_codes
+        layout["value2"] = devices.passwords
+
+        # 字宽来自字形缓存，每个不同字符只测量一次
+        font = self.get_font(params["font_size"])
+        draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+        glyphs = self.glyph_cache
+
+        def advance(char):
+            return glyphs.advance(draw, char, font)
+
+        number_spacing = params["number_spacing"]
+        with render_profile.phase("text_measure"):
+            layout.update(label_layout.text_origins(
+                layout,
+                glyphs.advance(draw, "设备码：", font),
+                label_layout.spaced_text_widths(layout["value1"], advance, number_spacing),
+                glyphs.advance(draw, "密钥：", font),
+                label_layout.spaced_text_widths(layout["value2"], advance, number_spacing),
+                params["font_size"], params["spacing"], params["x_stretch"], params["y_stretch"]))
+        return layout
+
+    def render_page(self, params, page, devices=None, positions=None, error_callback=None, layout=None):
+        """渲染第page页（从0开始），返回RGB图像
+
+        layout: compute_layout算好的整批布局，不传则只计算这一页
+        error_callback(index, exc): 单个设备出错时回调，出错设备跳过
+        """
+        if layout is not None:
+            start_idx, end_idx = self.get_page_range(params, page, len(layout["index"]))
+            return self.render_devices(params, label_layout.slice_layout(layout, start_idx, end_idx),
+                                       error_callback)
+
+        devices = self.devices if devices is None else devices
+        start_idx, end_idx = self.get_page_range(params, page, len(devices))
+        layout = self.compute_layout(params, devices[start_idx:end_idx], positions, start_idx)
+        return self.render_devices(params, layout, error_callback)
+
+    def page_background(self, params, layout):
+        """返回该页的背景 (底图副本, 调试图层或None)
+
+        网格、标度尺、点标记和调试坐标只取决于布局参数和本页用到的槽位坐标，
+        按这些参数缓存，每页只需复制一次底图；只保留最近几种背景（整页和末页）。
+        灰度/单色输出时底图为L模式，且不叠加彩色调试图层。
+        """
+        output_mode = params.get("output_mode", "RGB")
+        monochrome = page_output.is_monochrome(output_mode)
+        debug_mode = params["debug_mode"]
+        xs = layout["x"].tolist()
+        ys = layout["y"].tolist()
+        key = (self.a4_width_px, self.a4_height_px, output_mode, debug_mode, params["print_grid"],
+               params.get("print_dot", True), params["font_size"], self.dot_radius_px,
+               tuple(xs), tuple(ys))
+
+        entry = self._backgrounds.get(key)
+        if entry is None:
+            # 创建A4尺寸图像（300dpi: 2480 × 3508像素）
+            width, height = self.a4_width_px, self.a4_height_px
+            image = Image.new(page_output.render_mode(output_mode), (width, height), color='white')
+            draw = ImageDraw.Draw(image)
+
+            # 创建调试图层
+            debug_layer = None
+            debug_draw = None
+            if debug_mode and not monochrome:
+                debug_layer = Image.new('RGBA', (width, height), (255, 255, 255, 0))
+                debug_draw = ImageDraw.Draw(debug_layer)
+                self.draw_debug_elements(debug_draw, width, height, debug_mode)
+
+            # 绘制实际网格（如果需要导出）
+            if params["print_grid"]:
+                self.draw_debug_elements(draw, width, height, debug_mode, include_in_export=True,
+                                         monochrome=monochrome)
+
+            # 点标记和调试坐标（点为纯黑，先画后画文字结果相同）
+            font = self.get_font(params["font_size"])
+            for x, y in zip(xs, ys):
+                self._draw_slot_marks(draw, debug_draw, params, font, x, y)
+
+            entry = (image, debug_layer)
+            self._backgrounds[key] = entry
+            while len(self._backgrounds) > self.background_cache_size:
+                self._backgrounds.popitem(last=False)
+        else:
+            self._backgrounds.move_to_end(key)
+
+        image, debug_layer = entry
+        return image.copy(), debug_layer
+
+    def render_devices(self, params, layout, error_callback=None):
+        """按布局数组渲染一页（layout为该页设备的切片）"""
+        # 网格、标度尺、点标记来自缓存的页面背景
+        with render_profile.phase("background"):
+            image, debug_layer = self.page_background(params, layout)
+        draw = ImageDraw.Draw(image)
+
+        # 获取字体
+        font = self.get_font(params["font_size"])
+
+        # 坐标和文字起点已由布局数组算好，逐个设备只做绘制
+        columns = [layout[key].tolist() for key in (
+            "index", "value1", "value2",
+            "text1_x", "text1_y", "text2_x", "text2_y", "total1_width", "total2_width")]
+        with render_profile.phase("text_draw"):
+            for i, value1, value2, *origins in zip(*columns):
+                try:
+                    self._draw_label(image, draw, params, font, value1, value2, origins)
+                except Exception as e:
+                    if error_callback:
+                        error_callback(i, e)
+                    continue
+        render_profile.count("labels", len(columns[0]))
+
+        # 将调试图层合并到主图像
+        if debug_layer is not None:
+            with render_profile.phase("debug_composite"):
+                image = Image.alpha_composite(image.convert('RGBA'), debug_layer).convert('RGB')
+
+        # 单色输出在这里二值化，预览与打印结果一致
+        with render_profile.phase("finalize"):
+            return page_output.finalize(image, params.get("output_mode", "RGB"))
+
+    def render_vector_page(self, params, page, layout=None):
+        """第page页的矢量版本（vector_output.VectorPage），与render_page使用同一布局
+
+        文字为定位好的字形串，字符间距和x/y拉伸作为文字变换；点标记为矢量圆。
+        网格、标度尺和调试图层只用于栅格页面。
+        """
+        layout = self.layout if layout is None else layout
+        start_idx, end_idx = self.get_page_range(params, page, len(layout["index"]))
+        layout = label_layout.slice_layout(layout, start_idx, end_idx)
+
+        vector_page = vector_output.VectorPage(self.a4_width_px, self.a4_height_px)
+        if params.get("print_dot", True):
+            for x, y in zip(layout["x"].tolist(), layout["y"].tolist()):
+                vector_page.add_dot(x, y, self.dot_radius_px)
+
+        font = self.get_font(params["font_size"])
+        draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+        glyphs = self.glyph_cache
+        number_spacing = params["number_spacing"]
+        x_stretch = params["x_stretch"]
+        y_stretch = params["y_stretch"]
+
+        def advance(char):
+            return glyphs.advance(draw, char, font)
+
+        lines = []
+        for label in ("设备码：", "密钥："):
+            # 前缀整串绘制：各字符位置取前缀的累计宽度
+            label_offsets = [glyphs.advance(draw, label[:i], font) for i in range(len(label))]
+            lines.append((label, label_offsets, glyphs.advance(draw, label, font)))
+
+        columns = [layout[key].tolist() for key in ("value1", "value2", "text1_x", "text1_y", "text2_x", "text2_y")]
+        for value1, value2, text1_x, text1_y, text2_x, text2_y in zip(*columns):
+            for (label, label_offsets, label_width), value, x, y in (
+                    (lines[0], value1, text1_x, text1_y), (lines[1], value2, text2_x, text2_y)):
+                offsets = label_offsets + vector_output.spaced_offsets(value, advance, number_spacing, label_width)
+                vector_page.add_text(x, y, label + value, font, offsets, x_stretch, y_stretch)
+        return vector_page
+
+    def _export_vector(self, output_dir, image_format, progress_callback=None):
+        """矢量导出：pdf-vector写入一个多页PDF，svg每页一个文件；返回(是否成功, 总页数)"""
+        params = self.page_params
+        total_pages = self.get_total_pages(params, self.layout["index"])
+        # 找不到字体文件时get_font退回Pillow默认字体，它没有可嵌入的字体文件路径
+        if not isinstance(getattr(self.get_font(params["font_size"]), "path", None), str):
+            self.last_error = "矢量输出需要TrueType字体，请选择字体文件"
+            return False, 0
+        try:
+            if image_format == "svg":
+                for page in range(total_pages):
+                    with render_profile.phase("vector_page"):
+                        vector_output.save_svg(self.render_vector_page(params, page),
+                                               os.path.join(output_dir, f"label_page_{page+1}.svg"))
+                    if progress_callback:
+                        progress_callback(page + 1, total_pages)
+            else:
+                with vector_output.VectorPdfWriter(os.path.join(output_dir, PDF_FILENAME),
+                                                   title="label_pages") as writer:
+                    for page in range(total_pages):
+                        with render_profile.phase("vector_page"):
+                            writer.add_page(self.render_vector_page(params, page))
+                        if progress_callback:
+                            progress_callback(page + 1, total_pages)
+        except Exception as e:
+            self.last_error = str(e)
+            return False, 0
+        return True, total_pages
+
+    def iter_pages(self, params, devices=None, positions=None, error_callback=None, workers=1, layout=None):
+        """逐页生成图像（生成器），按页序返回
+
+        整批布局只计算一次；workers > 1 时使用进程池，每个进程渲染整页。
+        """
+        if layout is None:
+            layout = self.compute_layout(params, devices, positions)
+
+        total_pages = self.get_total_pages(params, layout["index"])
+        if workers > 1 and total_pages > 1:
+            for image in self._iter_parallel(params, layout, error_callback, workers):
+                yield image
+            return
+
+        for page in range(total_pages):
+            yield self.render_page(params, page, error_callback=error_callback, layout=layout)
+
+    def _iter_parallel(self, params, layout, error_callback, workers, output_dir=None, save_options=None):
+        """进程池渲染，按页序返回结果
+
+        每个任务只携带该页的布局切片；同时在途的任务数限制为进程数的2倍，
+        避免页面在主进程中堆积。指定output_dir时由子进程按save_options直接编码写盘，
+        返回(文件名, 是否写盘)；PDF导出时子进程返回编码好的页面图像数据。
+        """
+        total_devices = len(layout["index"])
+        total_pages = self.get_total_pages(params, layout["index"])
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(self._worker_state(),)) as executor:
+            pending = []
+            next_page = 0
+            for page in range(total_pages):
+                while len(pending) < workers * 2 and next_page < total_pages:
+                    start_idx, end_idx = self.get_page_range(params, next_page, total_devices)
+                    filename = None
+                    image_format = (save_options or {}).get("image_format", "png")
+                    if output_dir is not None and image_format != "pdf":
+                        extension = page_output.extension(image_format)
+                        filename = os.path.join(output_dir, f"label_page_{next_page+1}{extension}")
+                    pending.append(executor.submit(
+                        _render_page_task, params, label_layout.slice_layout(layout, start_idx, end_idx),
+                        filename, save_options))
+                    next_page += 1
+
+                result, errors = pending.pop(0).result()
+                if error_callback:
+                    for index, message in errors:
+                        error_callback(index, Exception(message))
+                yield result
+
+    def _worker_state(self):
+        """传给子进程的布局设置（不含设备数据和已生成页面）"""
+        skip = ("coordinates_df", "devices", "generated_images", "_cached_page", "layout",
+                "glyph_cache", "stretch_cache", "_backgrounds")
+        return {key: value for key, value in self.__dict__.items() if key not in skip}
+
+    def generate_all_pages(self, params, progress_callback=None, error_callback=None, workers=1):
+        """生成所有页面到generated_images，返回(是否成功, 总页数)
+
+        progress_callback(page, total_pages): 每生成一页回调一次（page从1开始）
+        workers: 渲染进程数，1为在当前进程中串行渲染
+        """
+        if self.devices is None:
+            self.last_error = "请先加载设备文件"
+            return False, 0
+
+        try:
+            self.prepare_pages(params)
+            pages = self.iter_pages(params, error_callback=error_callback, workers=workers, layout=self.layout)
+            for page, image in enumerate(pages):
+                self.generated_images.append(image)
+                if progress_callback:
+                    progress_callback(page + 1, self.total_pages)
+        except Exception as e:
+            self.last_error = str(e)
+            return False, 0
+
+        return True, self.total_pages
+
+    def prepare_pages(self, params):
+        """流式模式：只记录参数和总页数，不在内存中保留页面，返回总页数
+
+        预览通过get_page按需渲染当前页，导出时逐页渲染、保存、释放。
+        """
+        self.page_params = dict(params)
+        self.layout = self.compute_layout(params)
+        self.total_pages = self.get_total_pages(params)
+        self.generated_images = []
+        self._cached_page = (None, None)
+        return self.total_pages
+
+    def page_count(self):
+        if self.generated_images:
+            return len(self.generated_images)
+        return self.total_pages if self.page_params is not None else 0
+
+    def get_page(self, page, error_callback=None):
+        """获取第page页图像：已生成则直接返回，否则按需渲染（只缓存这一页）"""
+        if self.generated_images:
+            return self.generated_images[page]
+
+        cached_page, cached_image = self._cached_page
+        if cached_page != page:
+            cached_image = self.render_page(self.page_params, page, error_callback=error_callback,
+                                            layout=self.layout)
+            self._cached_page = (page, cached_image)
+        return cached_image
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+    def resize_image(self, image, width, height):
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+
+    def save_page(self, image, filename, crop_margin_mm=0, compress_level=6, optimize=False,
+                  skip_unchanged=False, image_format="png"):
+        """保存单页（300dpi），crop_margin_mm为四边裁切宽度（毫米）；返回是否实际写盘
+
+        文件中记录页面内容的哈希，skip_unchanged时已有文件内容相同则跳过编码。
+        image_format: "png"，或"tiff"（单色页面为Group-4压缩）
+        """
+        crop_px = int(round(crop_margin_mm * self.mm_to_px))
+        if crop_px > 0:
+            image = image.crop((crop_px, crop_px, image.width - crop_px, image.height - crop_px))
+
+        with render_profile.phase("digest"):
+            digest = page_digest(image)
+            if skip_unchanged and saved_page_digest(filename) == digest:
+                render_profile.count("pages_skipped")
+                return False
+
+        with render_profile.phase("encode"):
+            page_output.save_image(image, filename, image.mode, image_format, description=digest,
+                                   compress_level=compress_level, optimize=optimize)
+        return True
+
+    def encode_pdf_page(self, image, crop_margin_mm=0, compress_level=6, **_):
+        """裁切并编码单页，返回可写入PDF的图像数据（1位页面为Group-4压缩）"""
+        crop_px = int(round(crop_margin_mm * self.mm_to_px))
+        if crop_px > 0:
+            image = image.crop((crop_px, crop_px, image.width - crop_px, image.height - crop_px))
+        with render_profile.phase("encode"):
+            return pdf_output.encode_image(image, compress_level)
+
+    def export_all_pages(self, output_dir, crop_margin_mm=0, progress_callback=None, error_callback=None,
+                         workers=1, compress_level=6, optimize=False, skip_unchanged=False, image_format="png"):
+        """导出所有页面，返回(是否成功, 总页数)
+
+        已生成的页面直接保存；流式模式下逐页渲染后立即编码写盘并释放，
+        内存占用与设备数量无关。workers > 1 时流式模式由进程池渲染并编码，
+        否则在当前线程渲染、由workers个线程并发编码（zlib压缩时释放GIL）。
+        compress_level: PNG/PDF压缩级别0~9（越小越快、文件越大）
+        skip_unchanged: 已有文件内容哈希一致时跳过（默认关闭，总是写盘），未写盘的页数记在export_skipped
+        image_format: "png"、"tiff"或"pdf"，页面模式由生成参数output_mode决定；
+            "pdf"时所有页面按页序逐页写入output_dir下的同一个多页PDF（PDF_FILENAME）；
+            "pdf-vector"/"svg"为矢量输出（见render_vector_page），不栅格化
+        progress_callback(page, total_pages)按页序回调，在调用本方法的线程中执行。
+        """
+        total_pages = self.page_count()
+        if not total_pages:
+            self.last_error = "请先生成页面"
+            return False, 0
+
+        if vector_output.is_vector_format(image_format):
+            self.export_skipped = 0
+            return self._export_vector(output_dir, image_format, progress_callback)
+
+        save_options = {"crop_margin_mm": crop_margin_mm, "compress_level": compress_level,
+                        "optimize": optimize, "skip_unchanged": skip_unchanged, "image_format": image_format}
+        self.export_skipped = 0
+
+        pdf = None
+
+        def page_done(page, result):
+            if pdf is not None:
+                pdf.add_image_page(result, index=page)
+            else:
+                self.export_skipped += not result
+            if progress_callback:
+                progress_callback(page + 1, total_pages)
+
+        try:
+            if image_format == "pdf":
+                pdf = pdf_output.PdfWriter(os.path.join(output_dir, PDF_FILENAME), title="label_pages")
+
+            if not self.generated_images and workers > 1 and total_pages > 1:
+                results = self._iter_parallel(self.page_params, self.layout, error_callback,
+                                              workers, output_dir, save_options)
+                for page, result in enumerate(results):
+                    page_done(page, result if pdf is not None else result[1])
+                return True, total_pages
+
+            if self.generated_images:
+                pages = iter(self.generated_images)
+            else:
+                pages = self.iter_pages(self.page_params, error_callback=error_callback, layout=self.layout)
+
+            # 渲染与编码流水线：在途页数限制为线程数的2倍，按页序写入和回调进度
+            threads = max(1, workers)
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                pending = deque()
+                done = 0
+                for page, image in enumerate(pages):
+                    if pdf is not None:
+                        pending.append(executor.submit(self.encode_pdf_page, image, **save_options))
+                    else:
+                        filename = os.path.join(output_dir, f"label_page_{page+1}{page_output.extension(image_format)}")
+                        pending.append(executor.submit(self.save_page, image, filename, **save_options))
+                    del image
+                    while len(pending) >= threads * 2 or (pending and pending[0].done()):
+                        page_done(done, pending.popleft().result())
+                        done += 1
+                while pending:
+                    page_done(done, pending.popleft().result())
+                    done += 1
+        except Exception as e:
+            self.last_error = str(e)
+            return False, 0
+        finally:
+            if pdf is not None:
+                pdf.close()
+
+        return True, total_pages
+
+
+def page_digest(image):
+    """页面像素内容的哈希（含模式和尺寸），写入导出文件的描述中"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return PAGE_DIGEST_PREFIX + digest.hexdigest()
+
+
+def saved_page_digest(filename):
+    """读取已导出页面中记录的内容哈希，没有则返回None"""
+    if not os.path.exists(filename):
+        return None
+    description = page_output.saved_description(filename)
+    if description and description.startswith(PAGE_DIGEST_PREFIX):
+        return description
+    return None
+
+
+# ----------------------------------------------------------------------
+# 进程池渲染（子进程入口必须为模块级函数，才能被pickle）
+# ----------------------------------------------------------------------
+_worker_core = None
+
+
+def _init_render_worker(state):
+    """子进程初始化：用主进程的布局设置重建渲染核心"""
+    global _worker_core
+    _worker_core = LabelGeneratorCore.__new__(LabelGeneratorCore)
+    _worker_core.__dict__.update(state)
+    _worker_core.coordinates_df = None
+    _worker_core.devices = None
+    _worker_core.generated_images = []
+    _worker_core._cached_page = (None, None)
+    _worker_core.layout = None
+    _worker_core._backgrounds = OrderedDict()
+    _worker_core.glyph_cache = GlyphCache()
+    _worker_core.stretch_cache = StretchedTextCache(_worker_core.glyph_cache)
+
+
+def _render_page_task(params, layout, filename=None, save_options=None):
+    """在子进程中按布局切片渲染一整页
+
+    指定filename时直接写盘并返回(文件名, 是否写盘)；PDF导出时返回编码好的页面图像数据；否则返回图像。
+    """
+    errors = []
+    image = _worker_core.render_devices(params, layout, lambda index, e: errors.append((index, str(e))))
+    if save_options and save_options.get("image_format") == "pdf":
+        return _worker_core.encode_pdf_page(image, **save_options), errors
+    if filename is None:
+        return image, errors
+
+    written = _worker_core.save_page(image, filename, **(save_options or {}))
+    return (filename, written), errors
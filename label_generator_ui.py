@@ -3,6 +3,7 @@ from tkinter import filedialog, messagebox, ttk
 import os
 import json
 from PIL import ImageTk
+import render_profile
 
 class LabelGeneratorUI:
     def __init__(self, root, core):
@@ -269,12 +270,12 @@ class LabelGeneratorUI:
     
     def _browse_device_file(self):
         filename = filedialog.askopenfilename(
-            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")]
+            filetypes=[("设备文件", "*.csv *.xlsx *.xls *.txt"), ("CSV文件", "*.csv"), ("所有文件", "*.*")]
         )
         if filename:
             self.device_file_var.set(filename)
             self.core.load_devices(filename)
-            self.status_var.set(f"已加载设备文件，包含 {len(self.core.devices_df)} 个设备")
+            self.status_var.set(f"已加载设备文件，包含 {len(self.core.devices)} 个设备")
     
     def _browse_config_file(self):
         filename = filedialog.askopenfilename(
@@ -359,7 +360,7 @@ class LabelGeneratorUI:
             messagebox.showerror("错误", str(e))
     
     def _generate_all_pages(self):
-        if not self.core.coordinates_df or not self.core.devices_df:
+        if not self.core.coordinates_df or not self.core.devices:
             messagebox.showerror("错误", "请先加载坐标文件和设备文件")
             return
         
@@ -386,7 +387,9 @@ class LabelGeneratorUI:
         }
         
         # 生成页面
-        success, total_pages = self.core.generate_all_pages(params)
+        with render_profile.phase("generate_all_pages"):
+            success, total_pages = self.core.generate_all_pages(params)
+        render_profile.report("生成所有页面")
         if success:
             self.current_page = 0
             self._update_preview()
@@ -463,7 +466,9 @@ class LabelGeneratorUI:
         crop_margin_mm = self.crop_margin_var.get()
         
         # 导出页面（带裁切）
-        success, total_pages = self.core.export_all_pages(output_dir, crop_margin_mm)
+        with render_profile.phase("export_all_pages"):
+            success, total_pages = self.core.export_all_pages(output_dir, crop_margin_mm)
+        render_profile.report("导出所有页面")
         if success:
             self.status_var.set(f"所有 {total_pages} 页已成功导出")
             messagebox.showinfo("成功", f"所有 {total_pages} 页已导出至:\n{output_dir}")
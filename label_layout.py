@@ -0,0 +1,91 @@
+import numpy as np
+
+
+# ----------------------------------------------------------------------
+# 向量化标签布局
+#
+# 整批设备的页码、槽位、锚点坐标以及两行文字的起点一次性用数组算出，
+# 渲染和预览只按下标取值，不再逐点做Python算术。
+# 运算顺序与原逐点公式相同（float64），坐标逐位一致。
+# ----------------------------------------------------------------------
+
+def pitch_offsets(count, pitch):
+    """每行/列相对第一行/列的偏移
+
+    pitch为标量时等间距（col * pitch）；为序列时是相邻两行/列之间的间距，
+    长度必须为count-1，可以不均匀。
+    """
+    if np.ndim(pitch) == 0:
+        return np.arange(count) * pitch
+
+    pitches = np.asarray(pitch, dtype=np.float64)
+    if len(pitches) != max(count - 1, 0):
+        raise ValueError(f"间距列表长度应为{max(count - 1, 0)}，实际为{len(pitches)}")
+    return np.concatenate(([0.0], np.cumsum(pitches)))[:count]
+
+
+def slot_positions(rows, columns, origin_x, origin_y, col_pitch, row_pitch):
+    """一页内各槽位的中心坐标，按行优先排列，返回(xs, ys)两个数组"""
+    xs = origin_x + pitch_offsets(columns, col_pitch)
+    ys = origin_y + pitch_offsets(rows, row_pitch)
+    return np.tile(xs, rows), np.repeat(ys, columns)
+
+
+def device_anchors(start_idx, count, slot_x, slot_y, points_per_page, x_offset, y_offset):
+    """序号为[start_idx, start_idx+count)的设备的页码、槽位和锚点坐标
+
+    槽位按序号循环使用（与逐点版本 i % len(positions) 一致）。
+    """
+    index = np.arange(start_idx, start_idx + count)
+    slot = index % len(slot_x)
+    return {
+        "index": index,
+        "page": index // points_per_page,
+        "slot": slot,
+        "x": slot_x[slot] + x_offset,
+        "y": slot_y[slot] + y_offset,
+    }
+
+
+def slice_layout(layout, start, end):
+    """取布局中序号在[start, end)范围内（相对本批）的部分"""
+    return {key: values[start:end] for key, values in layout.items()}
+
+
+def spaced_text_widths(texts, advance, spacing=0):
+    """每个字符串的逐字符宽度之和加字符间距
+
+    advance(char)返回单个字符的宽度；所有字符串中的不同字符只查询一次。
+    FreeType字宽均为1/64像素的整数倍，求和顺序不影响结果。
+    """
+    texts = np.asarray(texts, dtype=str)
+    if texts.size == 0:
+        return np.zeros(0)
+
+    lengths = np.char.str_len(texts)
+    max_len = texts.dtype.itemsize // 4
+    if max_len == 0:
+        return np.zeros(len(texts))
+
+    codes = texts.view(np.uint32).reshape(len(texts), max_len)
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    table = np.array([advance(chr(code)) if code else 0.0 for code in unique_codes], dtype=np.float64)
+    widths = table[inverse.reshape(codes.shape)].sum(axis=1)
+    return np.where(lengths > 0, widths + (lengths - 1) * spacing, 0.0)
+
+
+def text_origins(anchors, label1_width, value1_widths, label2_width, value2_widths,
+                 font_size, spacing, x_stretch, y_stretch):
+    """两行文字（以锚点为中心，上行在点上方、下行在点下方）的起点坐标"""
+    x = anchors["x"]
+    y = anchors["y"]
+    total1_width = (label1_width + np.asarray(value1_widths, dtype=np.float64)) * x_stretch
+    total2_width = (label2_width + np.asarray(value2_widths, dtype=np.float64)) * x_stretch
+    return {
+        "total1_width": total1_width,
+        "total2_width": total2_width,
+        "text1_x": x - total1_width / 2,
+        "text1_y": y - (font_size * y_stretch) - spacing,
+        "text2_x": x - total2_width / 2,
+        "text2_y": y + spacing,
+    }
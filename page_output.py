@@ -0,0 +1,95 @@
+from PIL import Image, PngImagePlugin
+
+
+# ----------------------------------------------------------------------
+# 页面输出模式
+#
+# 标签页面只有黑色文字和点，打印时不需要24位RGB：
+#   "RGB" 彩色（默认，与原输出一致）
+#   "L"   8位灰度
+#   "1"   1位单色，在L模式下渲染后按阈值二值化（不抖动，文字边缘干净）
+# 单色页面可保存为1位PNG或Group-4压缩的TIFF，文件比RGB小得多。
+# ----------------------------------------------------------------------
+
+OUTPUT_MODES = ("RGB", "L", "1")
+IMAGE_FORMATS = ("png", "tiff")
+MONO_THRESHOLD = 128
+
+
+def render_mode(output_mode):
+    """渲染用的图像模式：彩色用RGB，灰度和单色都先在L模式下渲染（保留抗锯齿）"""
+    return "RGB" if output_mode == "RGB" else "L"
+
+
+def is_monochrome(output_mode):
+    return output_mode in ("L", "1")
+
+
+def finalize(image, output_mode):
+    """把渲染结果转换为输出模式"""
+    if output_mode == "1":
+        if image.mode != "L":
+            image = image.convert("L")
+        return image.point(lambda v: 255 if v >= MONO_THRESHOLD else 0, "1")
+    if output_mode == "L" and image.mode != "L":
+        return image.convert("L")
+    return image
+
+
+def extension(image_format):
+    return ".tif" if image_format == "tiff" else ".png"
+
+
+def format_from_filename(filename):
+    """按扩展名判断保存格式（tiff/jpeg/png），其他扩展名返回None，由PIL按扩展名处理"""
+    name = filename.lower()
+    if name.endswith((".tif", ".tiff")):
+        return "tiff"
+    if name.endswith((".jpg", ".jpeg")):
+        return "jpeg"
+    if name.endswith(".png"):
+        return "png"
+    return None
+
+
+def save_image(image, filename, output_mode="RGB", image_format="png", dpi=(300, 300), description=None,
+               **png_options):
+    """按输出模式转换并保存
+
+    TIFF：1位图像用Group-4压缩，其他模式用LZW；PNG：1位图像自动按1位深度编码；
+    JPEG不支持1位，单色页面按灰度保存。
+    description写入PNG文本块/TIFF图像描述（用于记录内容哈希等）。
+    """
+    image = finalize(image, output_mode)
+    if image_format is None:
+        image.save(filename, dpi=dpi)
+        return
+
+    if image_format == "tiff":
+        compression = "group4" if image.mode == "1" else "tiff_lzw"
+        options = {"description": description} if description else {}
+        image.save(filename, format="TIFF", compression=compression, dpi=dpi, **options)
+        return
+
+    if image_format == "jpeg":
+        if image.mode == "1":
+            image = image.convert("L")
+        image.save(filename, format="JPEG", dpi=dpi)
+        return
+
+    if description:
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Description", description)
+        png_options["pnginfo"] = info
+    image.save(filename, format="PNG", dpi=dpi, **png_options)
+
+
+def saved_description(filename):
+    """读取已保存图像中的描述（只解析文件头，不解码像素），没有则返回None"""
+    try:
+        with Image.open(filename) as image:
+            if image.format == "TIFF":
+                return image.tag_v2.get(270)
+            return image.info.get("Description")
+    except Exception:
+        return None
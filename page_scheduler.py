@@ -0,0 +1,135 @@
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import render_profile
+from progress_channel import ProgressChannel
+
+
+# ----------------------------------------------------------------------
+# 贴纸页面调度器（sticker_generator、image_based_sticker_generator共用）
+#
+# 页面在进程池中渲染和编码（不受GIL限制），同时在途的任务数限制为进程数的2倍；
+# 结果在调度线程中按页序取回，写入PDF等需要顺序的部分在主进程完成。
+# 进度、单页失败和结束事件经ProgressChannel交给Tk主线程回调（进度按批合并），
+# 回调里可以直接更新界面。每页的失败单独报告，不影响其它页面。
+#
+#     scheduler = PageScheduler(root, workers=4, on_progress=..., on_error=..., on_done=...)
+#     scheduler.start(pages, render, sink.encoder(), sink.commit)
+#     scheduler.cancel()
+#
+# render(data)和encoder(page_num, page)要传给子进程，必须是模块级函数或其functools.partial。
+# root为None时不做定时投递，由调用方用run()阻塞执行（命令行、测试）。
+# ----------------------------------------------------------------------
+
+
+def _page_task(render, encoder, page_num, data):
+    """子进程中执行：渲染并编码一页，返回(页码, 编码结果, 错误信息或None)"""
+    try:
+        with render_profile.phase("page"):
+            return page_num, encoder(page_num, render(data)), None
+    except Exception as e:
+        traceback.print_exc()
+        return page_num, None, f"{type(e).__name__}: {e}"
+
+
+class PageScheduler:
+    """按页序回调的多进程页面生成
+
+    回调（都在Tk主线程中按页序调用）：
+        on_progress(done, total, page_num)   完成页面（成功或失败）后，同一批中只回调最新的一次
+        on_error(page_num, message)          单页失败
+        on_done(completed, failed, cancelled) 全部结束、取消或出错后调用一次，
+                                              failed为[(页码, 错误信息), ...]
+    """
+
+    def __init__(self, root, workers=1, on_progress=None, on_error=None, on_done=None):
+        self.root = root
+        self.workers = max(1, int(workers))
+        self._events = ProgressChannel(root, {"progress": on_progress, "error": on_error, "done": on_done})
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, pages, render, encoder, commit):
+        """在后台开始生成：pages为[(页码, 数据), ...]，commit(page_num, encoded)在调度线程中按页序调用"""
+        if self.running:
+            raise RuntimeError("页面正在生成中")
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._drive, args=(list(pages), render, encoder, commit),
+                                        daemon=True)
+        self._thread.start()
+        self._events.start(self._thread)
+
+    def run(self, pages, render, encoder, commit):
+        """阻塞执行（不依赖Tk），回调在当前线程中调用，返回(完成页数, 失败列表, 是否取消)"""
+        self._cancel.clear()
+        self._drive(list(pages), render, encoder, commit)
+        result = None
+        while result is None:
+            result = self._events.drain()
+        return result
+
+    def cancel(self):
+        """停止提交新页面；已在渲染的页面完成后结束，不再写入"""
+        self._cancel.set()
+
+    def _drive(self, pages, render, encoder, commit):
+        total = len(pages)
+        completed = 0
+        failed = []
+        try:
+            if self.workers == 1 or total <= 1:
+                results = (_page_task(render, encoder, page_num, data) for page_num, data in pages)
+                for done, result in enumerate(results, 1):
+                    completed += self._finish(result, done, total, commit, failed)
+                    if self._cancel.is_set():
+                        break
+                return
+
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                pending = deque()
+                next_index = 0
+                done = 0
+                try:
+                    while True:
+                        while (not self._cancel.is_set() and len(pending) < self.workers * 2
+                               and next_index < total):
+                            page_num, data = pages[next_index]
+                            pending.append(executor.submit(_page_task, render, encoder, page_num, data))
+                            next_index += 1
+                        if not pending or self._cancel.is_set():
+                            break
+                        done += 1
+                        completed += self._finish(pending.popleft().result(), done, total, commit, failed)
+                finally:
+                    for future in pending:
+                        future.cancel()
+        except Exception as e:
+            # 进程池本身失败（子进程崩溃、任务无法序列化等）
+            traceback.print_exc()
+            self._events.post("error", 0, f"{type(e).__name__}: {e}")
+            failed.append((0, f"{type(e).__name__}: {e}"))
+        finally:
+            self._events.post("done", completed, failed, self._cancel.is_set())
+
+    def _finish(self, result, done, total, commit, failed):
+        """写入一页的结果并投递进度事件，成功返回1"""
+        page_num, encoded, error = result
+        if error is None:
+            try:
+                commit(page_num, encoded)
+            except Exception as e:
+                traceback.print_exc()
+                error = f"{type(e).__name__}: {e}"
+        if error is None:
+            render_profile.count("pages")
+        else:
+            failed.append((page_num, error))
+            self._events.post("error", page_num, error)
+        self._events.post("progress", done, total, page_num)
+        return 1 if error is None else 0
@@ -0,0 +1,211 @@
+import threading
+import zlib
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import features
+
+
+# ----------------------------------------------------------------------
+# 逐页写出的多页PDF
+#
+# 每加入一页就把该页的图像、内容流和页面对象写入文件并刷新，
+# 内存中只保留各对象的偏移量和页面引用；关闭时写页面树、交叉引用表和尾部。
+# 页面可以乱序加入（index指定页序），页面树按页序排列。
+# ----------------------------------------------------------------------
+
+PDF_DPI = 300
+POINTS_PER_INCH = 72.0
+
+# 已编码的页面图像，可在其他线程或子进程中生成后交给写入器
+PdfImage = namedtuple("PdfImage", "width height color_space bits filter decode_parms data")
+
+
+class Ref(int):
+    """间接对象引用"""
+
+
+class Name(str):
+    """PDF名称对象"""
+
+
+def format_number(value):
+    """PDF数值：最多4位小数，去掉末尾的0"""
+    return (b"%.4f" % value).rstrip(b"0").rstrip(b".")
+
+
+def _serialize(value):
+    if isinstance(value, Ref):
+        return b"%d 0 R" % value
+    if isinstance(value, Name):
+        return b"/" + value.encode("ascii")
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int):
+        return b"%d" % value
+    if isinstance(value, float):
+        return format_number(value)
+    if isinstance(value, str):
+        # 文本字符串统一用UTF-16BE十六进制，支持中文
+        return b"<FEFF" + value.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+    if isinstance(value, bytes):
+        return b"<" + value.hex().upper().encode("ascii") + b">"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b" ".join(_serialize(item) for item in value) + b"]"
+    if isinstance(value, dict):
+        items = b" ".join(b"/" + key.encode("ascii") + b" " + _serialize(item)
+                          for key, item in value.items() if item is not None)
+        return b"<< " + items + b" >>"
+    raise TypeError(f"不支持的PDF对象类型：{type(value).__name__}")
+
+
+def encode_image(image, compress_level=6):
+    """把页面图像编码为PDF图像对象的数据
+
+    1位图像用CCITT Group-4压缩（Pillow未带libtiff时改用Flate），灰度和RGB用Flate无损压缩。
+    """
+    width, height = image.size
+    if image.mode == "1":
+        if features.check("libtiff"):
+            # 与Pillow自带PDF插件相同：单条带Group-4 TIFF去掉8字节文件头即为CCITT数据
+            buffer = BytesIO()
+            image.save(buffer, "TIFF", compression="group4", strip_size=(width + 7) // 8 * height)
+            parms = {"K": -1, "BlackIs1": True, "Columns": width, "Rows": height}
+            return PdfImage(width, height, "DeviceGray", 1, "CCITTFaxDecode", parms, buffer.getvalue()[8:])
+        # '1'模式按行打包，1为白色，与DeviceGray的1位取值一致
+        return PdfImage(width, height, "DeviceGray", 1, "FlateDecode", None,
+                        zlib.compress(image.tobytes(), compress_level))
+
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    color_space = "DeviceGray" if image.mode == "L" else "DeviceRGB"
+    return PdfImage(width, height, color_space, 8, "FlateDecode", None,
+                    zlib.compress(image.tobytes(), compress_level))
+
+
+class PdfWriter:
+    """多页PDF写入器（线程安全），用法：
+
+        with PdfWriter(filename) as writer:
+            for image in pages:
+                writer.add_image_page(image)
+    """
+
+    def __init__(self, filename, title=None):
+        self.filename = filename
+        self.title = title
+        self._file = open(filename, "wb")
+        self._offsets = {}
+        self._next_id = 1
+        self._pages = {}
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._catalog = self._reserve()
+        self._page_tree = self._reserve()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def _reserve(self):
+        ref = Ref(self._next_id)
+        self._next_id += 1
+        return ref
+
+    def _write_object(self, ref, dictionary, stream=None):
+        self._offsets[ref] = self._file.tell()
+        self._file.write(b"%d 0 obj\n" % ref)
+        if stream is None:
+            self._file.write(_serialize(dictionary))
+        else:
+            dictionary = dict(dictionary, Length=len(stream))
+            self._file.write(_serialize(dictionary) + b"\nstream\n" + stream + b"\nendstream")
+        self._file.write(b"\nendobj\n")
+
+    def _add_object(self, dictionary, stream=None):
+        ref = self._reserve()
+        self._write_object(ref, dictionary, stream)
+        return ref
+
+    def add_page(self, width, height, content, resources, index=None):
+        """写入一页：width/height为点（1/72英寸），content为内容流，resources为资源字典
+        （其中的对象需已通过add_object写入）；index为页序（从0开始），默认接在最后"""
+        with self._lock:
+            if index is None:
+                index = self._next_index
+            self._next_index = max(self._next_index, index + 1)
+
+            contents = self._add_object({"Filter": Name("FlateDecode")}, zlib.compress(content))
+            self._pages[index] = self._add_object({
+                "Type": Name("Page"),
+                "Parent": self._page_tree,
+                "MediaBox": [0, 0, float(width), float(height)],
+                "Resources": resources,
+                "Contents": contents,
+            })
+            self._file.flush()
+
+    def add_object(self, dictionary, stream=None):
+        """写入一个独立对象（字体、图像等），返回引用"""
+        with self._lock:
+            return self._add_object(dictionary, stream)
+
+    def reserve_object(self):
+        """预留一个对象编号，内容稍后用write_reserved写入（如关闭前才确定的字体子集）"""
+        with self._lock:
+            return self._reserve()
+
+    def write_reserved(self, ref, dictionary, stream=None):
+        with self._lock:
+            self._write_object(ref, dictionary, stream)
+
+    def add_image_page(self, image, index=None, dpi=PDF_DPI, compress_level=6):
+        """把整页图像（PIL图像或encode_image的结果）作为一页，页面尺寸按dpi换算"""
+        encoded = image if isinstance(image, PdfImage) else encode_image(image, compress_level)
+        xobject = self.add_object({
+            "Type": Name("XObject"),
+            "Subtype": Name("Image"),
+            "Width": encoded.width,
+            "Height": encoded.height,
+            "ColorSpace": Name(encoded.color_space),
+            "BitsPerComponent": encoded.bits,
+            "Filter": Name(encoded.filter),
+            "DecodeParms": encoded.decode_parms,
+        }, encoded.data)
+
+        width = encoded.width * POINTS_PER_INCH / dpi
+        height = encoded.height * POINTS_PER_INCH / dpi
+        content = b"q %s 0 0 %s 0 0 cm /Page Do Q\n" % (format_number(width), format_number(height))
+        self.add_page(width, height, content, {"XObject": {"Page": xobject}}, index)
+
+    def close(self):
+        """写页面树、目录、交叉引用表和尾部并关闭文件（缺失的页序直接跳过）"""
+        if self.closed:
+            return
+        with self._lock:
+            kids = [self._pages[index] for index in sorted(self._pages)]
+            self._write_object(self._page_tree, {"Type": Name("Pages"), "Kids": kids, "Count": len(kids)})
+            self._write_object(self._catalog, {"Type": Name("Catalog"), "Pages": self._page_tree})
+            info = self._add_object({"Title": self.title, "Producer": "label-printer"})
+
+            xref = self._file.tell()
+            count = self._next_id
+            lines = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+            lines += [b"%010d 00000 n \n" % self._offsets[Ref(i)] for i in range(1, count)]
+            self._file.write(b"".join(lines))
+            self._file.write(b"trailer\n" + _serialize({"Size": count, "Root": self._catalog, "Info": info}))
+            self._file.write(b"\nstartxref\n%d\n%%%%EOF\n" % xref)
+            self._file.close()
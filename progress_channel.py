@@ -0,0 +1,96 @@
+import queue
+
+
+# ----------------------------------------------------------------------
+# 工作线程 -> Tk主线程的进度事件通道
+#
+# Tk不是线程安全的：工作线程里调用StringVar.set、messagebox等会卡住甚至崩溃。
+# 工作线程只调用post()把事件放进队列，主线程用after定时批量取出并调用处理函数。
+# 节流：同一批里可合并的事件（进度、状态文字）只处理最后一个，
+# 界面每个间隔最多刷新一次，生成上千页时不会被重绘淹没。
+#
+#     channel = ProgressChannel(root, {"progress": on_progress, "error": on_error, "done": on_done})
+#     channel.start(worker_thread)
+#     channel.post("progress", page, total)   # 任意线程
+#     channel.post("done", ...)               # 结束事件处理后停止轮询
+#
+# 生产者应在finally中投递"done"（出错时也要投递），否则结束处理函数不会被调用。
+# start()传入生产者线程时，线程已退出且队列已空也会停止轮询，不会留下空转的after循环。
+# root为None时不定时轮询，调用方自己调用drain()（命令行、测试）。
+# ----------------------------------------------------------------------
+
+POLL_INTERVAL = 100   # 毫秒
+MAX_BATCH = 1000      # 每次最多处理的事件数，避免一次取太多阻塞界面
+COALESCE = ("progress", "status")
+DONE = "done"
+
+
+class ProgressChannel:
+    """线程安全的事件队列，在主线程中按批次分发
+
+    handlers: {事件名: 处理函数(*参数)}，没有处理函数的事件直接丢弃
+    coalesce: 可合并的事件名，同一批中只分发最后一个
+    """
+
+    def __init__(self, root, handlers, interval=POLL_INTERVAL, coalesce=COALESCE):
+        self.root = root
+        self.handlers = handlers
+        self.interval = interval
+        self.coalesce = frozenset(coalesce)
+        self.finished = False
+        self._events = queue.Queue()
+        self._producer = None
+
+    def post(self, kind, *args):
+        """放入一个事件（任意线程可调用）"""
+        self._events.put((kind, args))
+
+    def start(self, producer=None):
+        """开始在Tk主线程中定时分发；producer为投递事件的线程（可选），它退出后不再等待结束事件"""
+        self._producer = producer
+        if self.root is not None:
+            self.root.after(self.interval, self._poll)
+
+    def drain(self):
+        """分发当前队列中的事件（最多MAX_BATCH个），遇到结束事件时返回其参数，否则返回None"""
+        latest = {}
+        for _ in range(MAX_BATCH):
+            try:
+                kind, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind in self.coalesce:
+                latest.pop(kind, None)
+                latest[kind] = args
+                continue
+            if kind == DONE:
+                self._dispatch_latest(latest)
+                self.finished = True
+                self._dispatch(kind, args)
+                return args
+            self._dispatch(kind, args)
+        self._dispatch_latest(latest)
+        return None
+
+    def _dispatch_latest(self, latest):
+        for kind, args in latest.items():
+            self._dispatch(kind, args)
+        latest.clear()
+
+    def _dispatch(self, kind, args):
+        handler = self.handlers.get(kind)
+        if handler is not None:
+            handler(*args)
+
+    def _poll(self):
+        # 先看生产者是否还在：它退出前投递的事件都已在队列中
+        alive = self._producer is None or self._producer.is_alive()
+        try:
+            self.drain()
+        finally:
+            if not self.finished and not alive and self._events.empty():
+                # 生产者没有投递结束事件就退出了，不再轮询
+                self.finished = True
+            # 处理函数出错也继续轮询，否则后面的事件（包括结束事件）都收不到
+            if not self.finished:
+                self.root.after(self.interval, self._poll)
@@ -1,11 +1,44 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox, simpledialog
-import pandas as pd
 import re
 import os
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+import page_output
+import font_registry
 import math
 
+def render_text_page(text_items, size, mm_to_px, output_mode="RGB", font_path="simhei.ttf", font_missing=None):
+    """按绝对坐标把文本项画到A4页面上（只有文字，不含方框），返回图像（单色未二值化）
+
+    font_missing(item): 找不到字体、改用默认字体时回调
+    """
+    # 创建A4尺寸的空白图片（白色背景）
+    image = Image.new(page_output.render_mode(output_mode), size, color="white")
+    draw = ImageDraw.Draw(image)
+    
+    # 遍历所有文本项，按绝对坐标绘制
+    for item in text_items:
+        if not item['text']:
+            continue
+        
+        # 计算实际像素位置（考虑偏移量）
+        x_px = item['x_mm'] * mm_to_px + item['offset_x']
+        y_px = item['y_mm'] * mm_to_px + item['offset_y']
+        
+        # 加载字体（确保支持中文）
+        try:
+            font = font_registry.get_font(font_path, item['font_size'])
+        except OSError:
+            #  fallback字体
+            font = font_registry.default_font()
+            if font_missing:
+                font_missing(item)
+        
+        # 绘制文字（左上角对齐）
+        draw.text((x_px, y_px), item['text'], font=font, fill="black")
+    
+    return image
+
 class A4CoordinateEditor:
     def __init__(self, root):
         self.root = root
@@ -56,6 +89,10 @@ class A4CoordinateEditor:
         # 导出按钮
         ttk.Button(control_frame, text="导出A4图片", command=self.export_a4_image).pack(side=tk.RIGHT, padx=5)
         
+        # 单色导出：1位PNG，或保存为.tif时用Group-4压缩
+        self.mono_export_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="单色(1位)", variable=self.mono_export_var).pack(side=tk.RIGHT, padx=5)
+        
         # 预览区域
         preview_frame = ttk.Frame(self.root)
         preview_frame.pack(fill=tk.BOTH, expand=True)
@@ -75,6 +112,7 @@ class A4CoordinateEditor:
             return
             
         try:
+            import pandas as pd  # 导入CSV时才加载pandas，加快启动
             self.position_data = pd.read_csv(file_path)
             required_cols = ['编号', 'X坐标', 'Y坐标']
             for col in required_cols:
@@ -108,6 +146,7 @@ class A4CoordinateEditor:
             return
             
         try:
+            import pandas as pd
             df = pd.read_csv(file_path)
             # 假设以"编号"作为关联键
             if "编号" not in df.columns:
@@ -126,6 +165,8 @@ class A4CoordinateEditor:
             messagebox.showwarning("提示", "请先导入位置CSV")
             return
             
+        import pandas as pd
+
         template = self.text_template.get()
         # 收集所有可用数据列（位置数据+所有参数数据）
         all_data = self.position_data.copy()
@@ -228,38 +269,22 @@ class A4CoordinateEditor:
             
         save_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG图片", "*.png"), ("JPG图片", "*.jpg")]
+            filetypes=[("PNG图片", "*.png"), ("JPG图片", "*.jpg"), ("TIFF单色(Group-4)", "*.tif")]
         )
         if not save_path:
             return
         
+        # 单色模式在L模式下渲染，保存时二值化；TIFF总是单色
+        image_format = page_output.format_from_filename(save_path)
+        output_mode = "1" if self.mono_export_var.get() or image_format == "tiff" else "RGB"
+        
         try:
-            # 创建A4尺寸的空白图片（白色背景）
-            image = Image.new("RGB", (self.a4_width_px, self.a4_height_px), color="white")
-            draw = ImageDraw.Draw(image)
-            
-            # 遍历所有文本项，按绝对坐标绘制
-            for item in self.text_items:
-                if not item['text']:
-                    continue
-                
-                # 计算实际像素位置（考虑偏移量）
-                x_px = item['x_mm'] * self.mm_to_px + item['offset_x']
-                y_px = item['y_mm'] * self.mm_to_px + item['offset_y']
-                
-                # 加载字体（确保支持中文）
-                try:
-                    font = ImageFont.truetype("simhei.ttf", item['font_size'])
-                except:
-                    #  fallback字体
-                    font = ImageFont.load_default()
-                    messagebox.showwarning("提示", f"编号{item['id']}：未找到黑体字体，使用默认字体")
-                
-                # 绘制文字（左上角对齐）
-                draw.text((x_px, y_px), item['text'], font=font, fill="black")
+            image = render_text_page(
+                self.text_items, (self.a4_width_px, self.a4_height_px), self.mm_to_px, output_mode,
+                font_missing=lambda item: messagebox.showwarning("提示", f"编号{item['id']}：未找到黑体字体，使用默认字体"))
             
             # 保存图片
-            image.save(save_path, dpi=(self.dpi, self.dpi))
+            page_output.save_image(image, save_path, output_mode, image_format, dpi=(self.dpi, self.dpi))
             messagebox.showinfo("成功", f"已导出A4图片到：\n{save_path}")
         except Exception as e:
             messagebox.showerror("错误", f"导出失败：{str(e)}")
@@ -0,0 +1,341 @@
+"""页面渲染吞吐量基准
+
+用合成设备表（默认1k/10k/100k行）在无界面模式下运行各生成器的页面渲染：
+    coordinate     打印条码/1.py（LabelGeneratorCore）
+    sticker        sticker_generator.py（网格贴纸）
+    image-sticker  image_based_sticker_generator.py（按检测到的标签位置，使用合成的6×14标签矩形）
+    rect           rect_editor.py（按绝对坐标排列的文本页）
+
+每个用例在独立子进程中运行，记录：
+    labels/s、pages/s（渲染+编码）、峰值内存（RSS）
+    分阶段耗时：load（读设备表）、layout（整表布局/分页）、composite（页面底图）、
+                text（文字绘制 = 渲染总时间 - 底图）、encode（PNG编码写盘）
+布局按整表计算，渲染只取前--max-pages页（大表渲染全部页面太慢，吞吐量按实际渲染的页计算）。
+
+    python render_benchmark.py --font simhei.ttf --json before.json
+    python render_benchmark.py --font simhei.ttf --json after.json --compare before.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GENERATORS = ("coordinate", "sticker", "image-sticker", "rect")
+DEFAULT_SIZES = (1000, 10000, 100000)
+PHASES = ("load", "layout", "composite", "text", "encode")
+
+
+# ----------------------------------------------------------------------
+# 合成数据
+# ----------------------------------------------------------------------
+def write_device_table(filename, rows, seed=0):
+    """写入合成设备表（device_code, password），密钥长度不一以覆盖文字适配和拉伸"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["device_code", "password"])
+        for i in range(rows):
+            writer.writerow([f"E{i:06d}", "".join(rng.choices(alphabet, k=rng.randint(4, 16)))])
+
+
+def peak_rss_mb():
+    """本进程的峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class Timer:
+    """累计各阶段耗时"""
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def measure(self, phase, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.phases[phase] += time.perf_counter() - start
+        return result
+
+
+# ----------------------------------------------------------------------
+# 各生成器的用例（在子进程中运行）
+# ----------------------------------------------------------------------
+def bench_coordinate(table, output_dir, font, max_pages, timer):
+    import label_layout
+    from label_generator_core import LabelGeneratorCore
+
+    core = LabelGeneratorCore()
+    core.selected_font = font
+    timer.measure("load", core.load_devices, table)
+    params = core.params_from_config()
+    total_pages = timer.measure("layout", core.prepare_pages, params)
+
+    labels = 0
+    for page in range(min(max_pages, total_pages)):
+        start_idx, end_idx = core.get_page_range(params, page, len(core.devices))
+        # 底图单独计时；之后render_page中命中缓存，只多一次复制，不再从文字阶段扣除
+        timer.measure("composite", core.page_background, params,
+                      label_layout.slice_layout(core.layout, start_idx, end_idx))
+        start = time.perf_counter()
+        image = core.render_page(params, page, layout=core.layout)
+        timer.phases["text"] += time.perf_counter() - start
+        timer.measure("encode", core.save_page, image, os.path.join(output_dir, f"label_page_{page+1}.png"))
+        labels += end_idx - start_idx
+    return min(max_pages, total_pages), labels
+
+
+def _sticker_pages(table, per_page, timer):
+    import sticker_core
+    from device_table import DeviceBatch
+
+    pairs = timer.measure("load", lambda: DeviceBatch.load(table).non_empty().pairs())
+    return timer.measure("layout", sticker_core.paginate, pairs, per_page)
+
+
+def _render_sticker_pages(paged_data, render, blank, output_dir, max_pages, timer):
+    import sticker_core
+
+    labels = 0
+    pages = paged_data[:max_pages]
+    with sticker_core.PageSink(output_dir) as sink:
+        for page_num, data in enumerate(pages, 1):
+            timer.measure("composite", blank)
+            start = time.perf_counter()
+            page = render(data)
+            timer.phases["text"] += time.perf_counter() - start
+            timer.measure("encode", sink.write, page_num, page)
+            labels += len(data)
+    # 渲染时间中包含同样的底图创建，从文字阶段扣除
+    timer.phases["text"] = max(0.0, timer.phases["text"] - timer.phases["composite"])
+    return len(pages), labels
+
+
+def bench_sticker(table, output_dir, font, max_pages, timer):
+    import sticker_core
+    from PIL import Image
+
+    paged_data = _sticker_pages(table, sticker_core.COLUMNS * sticker_core.ROWS, timer)
+    return _render_sticker_pages(
+        paged_data, lambda data: sticker_core.render_grid_page(data, font),
+        lambda: Image.new("RGB", (sticker_core.A4_WIDTH_PX, sticker_core.A4_HEIGHT_PX), "white"),
+        output_dir, max_pages, timer)
+
+
+def synthetic_contours():
+    """合成的标签矩形：与网格贴纸相同的6×14排列（像素）"""
+    import sticker_core
+
+    contours = []
+    for index in range(sticker_core.COLUMNS * sticker_core.ROWS):
+        x, y, _, _ = sticker_core.sticker_position(index)
+        contours.append((int(x * sticker_core.MM_TO_PIXEL) + 30, int(y * sticker_core.MM_TO_PIXEL) + 30,
+                         int(sticker_core.STICKER_WIDTH * sticker_core.MM_TO_PIXEL),
+                         int(sticker_core.STICKER_HEIGHT * sticker_core.MM_TO_PIXEL)))
+    return contours
+
+
+def bench_image_sticker(table, output_dir, font, max_pages, timer):
+    import sticker_core
+    from PIL import Image
+
+    contours = synthetic_contours()
+    size = (sticker_core.A4_WIDTH_PX, sticker_core.A4_HEIGHT_PX)
+    paged_data = _sticker_pages(table, len(contours), timer)
+    return _render_sticker_pages(
+        paged_data, lambda data: sticker_core.render_contour_page(data, contours, size, font),
+        lambda: Image.new("RGB", size, "white"), output_dir, max_pages, timer)
+
+
+def bench_rect(table, output_dir, font, max_pages, timer):
+    import sticker_core
+    import page_output
+    from PIL import Image
+    from rect_editor import render_text_page
+
+    mm_to_px = sticker_core.MM_TO_PIXEL
+    size = (sticker_core.A4_WIDTH_PX, sticker_core.A4_HEIGHT_PX)
+    per_page = sticker_core.COLUMNS * sticker_core.ROWS
+    paged_data = _sticker_pages(table, per_page, timer)
+
+    def text_items(data):
+        items = []
+        for index, (device_code, password) in enumerate(data):
+            x, y, _, _ = sticker_core.sticker_position(index)
+            items.append({"x_mm": x + 1, "y_mm": y + 1, "text": f"{device_code} {password}",
+                          "font_size": 24, "offset_x": 0, "offset_y": 0})
+        return items
+
+    pages = timer.measure("layout", lambda: [text_items(data) for data in paged_data[:max_pages]])
+    labels = 0
+    for page_num, items in enumerate(pages, 1):
+        timer.measure("composite", Image.new, "RGB", size, "white")
+        start = time.perf_counter()
+        image = render_text_page(items, size, mm_to_px, font_path=font or "simhei.ttf")
+        timer.phases["text"] += time.perf_counter() - start
+        timer.measure("encode", page_output.save_image, image, os.path.join(output_dir, f"page_{page_num}.png"))
+        labels += len(items)
+    timer.phases["text"] = max(0.0, timer.phases["text"] - timer.phases["composite"])
+    return len(pages), labels
+
+
+BENCHMARKS = {
+    "coordinate": bench_coordinate,
+    "sticker": bench_sticker,
+    "image-sticker": bench_image_sticker,
+    "rect": bench_rect,
+}
+
+
+def run_case(generator, rows, font, max_pages, profile=False):
+    """运行一个用例，返回结果字典（在子进程中调用）
+
+    profile: 打开render_profile，结果中附带渲染循环内部的分阶段统计
+    """
+    import render_profile
+
+    if profile:
+        render_profile.enable()
+    timer = Timer()
+    with tempfile.TemporaryDirectory() as work_dir:
+        table = os.path.join(work_dir, "devices.csv")
+        write_device_table(table, rows)
+        output_dir = os.path.join(work_dir, "out")
+        os.makedirs(output_dir)
+        pages, labels = BENCHMARKS[generator](table, output_dir, font, max_pages, timer)
+
+    phases = timer.phases
+    render_time = max(phases["composite"] + phases["text"] + phases["encode"], 1e-9)
+    result = {
+        "generator": generator,
+        "rows": rows,
+        "pages": pages,
+        "labels": labels,
+        "labels_per_s": labels / render_time,
+        "pages_per_s": pages / render_time,
+        "peak_rss_mb": peak_rss_mb(),
+        "phases": phases,
+    }
+    if profile:
+        result["profile"] = render_profile.stats()
+    return result
+
+
+# ----------------------------------------------------------------------
+# 汇总
+# ----------------------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_in_subprocess(generator, rows, font, max_pages, profile=False):
+    command = [sys.executable, os.path.abspath(__file__), "--case", f"{generator}:{rows}",
+               "--max-pages", str(max_pages)]
+    if font:
+        command += ["--font", font]
+    if profile:
+        command.append("--profile")
+    completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"generator": generator, "rows": rows, "error": lines[-1] if lines else "失败"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_table(results, baseline=None):
+    previous = {(r["generator"], r["rows"]): r for r in (baseline or []) if "error" not in r}
+    header = f"{'生成器':<14}{'行数':>8}{'页':>5}{'标签/秒':>10}{'页/秒':>8}{'峰值MB':>8}"
+    header += "".join(f"{phase:>10}" for phase in PHASES)
+    print(header + ("  对比" if previous else ""))
+    for r in results:
+        if "error" in r:
+            print(f"{r['generator']:<14}{r['rows']:>8}  失败：{r['error']}")
+            continue
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        line = (f"{r['generator']:<14}{r['rows']:>8}{r['pages']:>5}{r['labels_per_s']:>10.1f}"
+                f"{r['pages_per_s']:>8.2f}{rss:>8}")
+        line += "".join(f"{r['phases'][phase] * 1000:>8.0f}ms" for phase in PHASES)
+        old = previous.get((r["generator"], r["rows"]))
+        if old:
+            line += f"  {r['labels_per_s'] / old['labels_per_s']:.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="页面渲染吞吐量基准")
+    parser.add_argument("--generators", nargs="+", choices=GENERATORS, default=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="设备表行数")
+    parser.add_argument("--max-pages", type=int, default=10, help="每个用例最多渲染的页数")
+    parser.add_argument("--repeat", type=int, default=1, help="重复次数，取labels/s的中位数")
+    parser.add_argument("--font", help="字体文件，默认查找系统中文字体")
+    parser.add_argument("--json", help="把结果保存为JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果对比")
+    parser.add_argument("--profile", action="store_true", help="附带渲染循环内部的分阶段统计（见render_profile）")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    if args.case:
+        generator, rows = args.case.split(":")
+        print(json.dumps(run_case(generator, int(rows), args.font, args.max_pages, args.profile)))
+        return
+
+    import sticker_core
+    font = sticker_core.find_font(args.font)
+
+    results = []
+    for generator in args.generators:
+        for rows in args.sizes:
+            runs = [run_in_subprocess(generator, rows, font, args.max_pages, args.profile)
+                    for _ in range(args.repeat)]
+            runs = [r for r in runs if "error" not in r] or runs[:1]
+            result = sorted(runs, key=lambda r: r.get("labels_per_s", 0))[len(runs) // 2]
+            results.append(result)
+            print(f"{generator} {rows}: " + (f"{result['labels_per_s']:.1f} 标签/秒" if "error" not in result
+                                             else f"失败 {result['error']}"), file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "font": font,
+            "max_pages": args.max_pages,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
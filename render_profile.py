@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+import threading
+import time
+
+
+# ----------------------------------------------------------------------
+# 渲染分阶段计时
+#
+# 渲染循环中用命名计时器和计数器标出各阶段：
+#     with render_profile.phase("encode"):
+#         ...
+#     render_profile.count("labels", n)
+# 默认关闭，此时phase返回共享的空上下文、count直接返回，不记录任何数据。
+# 设置环境变量 LABEL_PROFILE=1 打开（界面程序），LABEL_PROFILE_TRACE=文件名
+# 另外输出Chrome trace（chrome://tracing 或 Perfetto 打开）；命令行工具用 --profile/--trace。
+# 多进程导出时只统计主进程，需要完整数据请用单进程。
+# ----------------------------------------------------------------------
+
+enabled = os.environ.get("LABEL_PROFILE", "") not in ("", "0")
+trace_file = os.environ.get("LABEL_PROFILE_TRACE") or None
+
+_lock = threading.Lock()
+_timers = {}    # 名称 -> [次数, 总耗时, 最长耗时]
+_counters = {}  # 名称 -> 累计值
+_events = []    # Chrome trace事件
+_origin = time.perf_counter()
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter()
+        elapsed = end - self.start
+        with _lock:
+            timer = _timers.get(self.name)
+            if timer is None:
+                _timers[self.name] = [1, elapsed, elapsed]
+            else:
+                timer[0] += 1
+                timer[1] += elapsed
+                if elapsed > timer[2]:
+                    timer[2] = elapsed
+            if trace_file:
+                _events.append({"name": self.name, "ph": "X", "pid": os.getpid(),
+                                "tid": threading.get_ident(),
+                                "ts": (self.start - _origin) * 1e6, "dur": elapsed * 1e6})
+        return False
+
+
+def phase(name):
+    """命名计时器（上下文管理器），关闭时不计时"""
+    if not enabled:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def count(name, value=1):
+    """累加计数器（标签数、页数、缓存命中等）"""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def enable(trace=None):
+    """打开计时，trace为Chrome trace输出文件（可选）"""
+    global enabled, trace_file
+    enabled = True
+    if trace:
+        trace_file = trace
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global _origin
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        del _events[:]
+        _origin = time.perf_counter()
+
+
+def stats():
+    """当前统计：{"timers": {名称: {"count", "total", "max"}}, "counters": {名称: 值}}"""
+    with _lock:
+        timers = {name: {"count": n, "total": total, "max": longest}
+                  for name, (n, total, longest) in _timers.items()}
+        return {"timers": timers, "counters": dict(_counters)}
+
+
+def summary():
+    """汇总表：各阶段按总耗时排序（阶段可以嵌套，总耗时包含子阶段）"""
+    data = stats()
+    lines = [f"{'阶段':<20}{'次数':>8}{'总计(ms)':>12}{'平均(ms)':>10}{'最长(ms)':>10}"]
+    for name, timer in sorted(data["timers"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{name:<20}{timer['count']:>8}{timer['total'] * 1000:>12.1f}"
+                     f"{timer['total'] * 1000 / timer['count']:>10.2f}{timer['max'] * 1000:>10.2f}")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name:<20}{value:>8}")
+    return "\n".join(lines)
+
+
+def write_trace(filename):
+    """把记录的阶段写成Chrome trace JSON"""
+    with _lock:
+        events = list(_events)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def report(title=None, stream=None):
+    """打开计时时：打印汇总表，配置了trace文件则写出，然后清空统计以便下一次运行"""
+    if not enabled:
+        return
+    stream = stream or sys.stdout
+    if title:
+        print(f"[{title}]", file=stream)
+    print(summary(), file=stream)
+    if trace_file:
+        write_trace(trace_file)
+        print(f"Chrome trace：{trace_file}", file=stream)
+    reset()
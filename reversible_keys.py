@@ -0,0 +1,72 @@
+import csv
+import string
+
+
+# ----------------------------------------------------------------------
+# 可逆密码：设备编号 <-> 4位数字加1位字母的密码
+#
+# 不依赖tkinter，供csv_generator.py和命令行工具共用。
+# ----------------------------------------------------------------------
+
+CSV_HEADER = ["password", "device_code"]
+
+
+def device_to_password(device_num, seed):
+    """将设备编号转换为密码"""
+    # 使用种子进行可逆转换
+    base = device_num + seed
+    # 确保结果在有效范围内
+    transformed = (base * 12345) % 99990 + 10  # 确保4位数字范围
+
+    # 提取前4位数字
+    num_part = transformed % 10000
+    # 生成字母部分 (基于转换后的值确保可逆)
+    letter_index = (transformed // 10000) % 26
+    letter = string.ascii_letters[letter_index]
+
+    # 格式化为4位数字加1位字母
+    return f"{num_part:04d}{letter}"
+
+
+def password_to_device(password, seed):
+    """将密码转换回设备编号"""
+    if len(password) != 5:
+        return None
+
+    num_part = password[:4]
+    letter = password[4]
+
+    try:
+        num = int(num_part)
+    except ValueError:
+        return None
+
+    # 找到字母对应的索引
+    try:
+        letter_index = string.ascii_letters.index(letter)
+    except ValueError:
+        return None
+
+    # 反向转换
+    transformed = num + letter_index * 10000
+    base = (transformed * 87654) % 99990  # 12345的模逆
+    device_num = (base - seed) % 99990
+
+    return device_num
+
+
+def device_code(device_num):
+    return f"E{device_num:04d}"  # 从E0000开始
+
+
+def generate_keys(count, seed):
+    """生成count条(密码, 设备编号)记录"""
+    return [(device_to_password(i, seed), device_code(i)) for i in range(count)]
+
+
+def write_keys_csv(file_path, rows):
+    """把记录保存为UTF-8的CSV文件"""
+    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
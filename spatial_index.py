@@ -0,0 +1,114 @@
+import math
+
+
+# ----------------------------------------------------------------------
+# 均匀网格空间索引（条码设计器的标签矩形、网格标记器的中心点共用）
+#
+# 平面按cell_size划分成格子，每个对象登记在它的矩形覆盖的格子里；
+# 点查询、矩形查询和最近点查询只检查相关的格子，不再逐个扫描所有对象。
+# 点视为零大小的矩形。对象移动后调用update（或move）保持索引同步。
+# ----------------------------------------------------------------------
+
+
+class SpatialIndex:
+    """键 -> 矩形(x0, y0, x1, y1) 的均匀网格索引"""
+
+    def __init__(self, cell_size, items=None):
+        self.cell_size = float(cell_size)
+        self._rects = {}
+        self._cells = {}
+        for key, rect in (items or ()):
+            self.insert(key, rect)
+
+    def __len__(self):
+        return len(self._rects)
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (range(math.floor(rect[0] / size), math.floor(rect[2] / size) + 1),
+                range(math.floor(rect[1] / size), math.floor(rect[3] / size) + 1))
+
+    def insert(self, key, rect):
+        if key in self._rects:
+            self.remove(key)
+        rect = (min(rect[0], rect[2]), min(rect[1], rect[3]), max(rect[0], rect[2]), max(rect[1], rect[3]))
+        self._rects[key] = rect
+        columns, rows = self._cell_range(rect)
+        for cx in columns:
+            for cy in rows:
+                self._cells.setdefault((cx, cy), set()).add(key)
+
+    def insert_point(self, key, x, y):
+        self.insert(key, (x, y, x, y))
+
+    def remove(self, key):
+        rect = self._rects.pop(key, None)
+        if rect is None:
+            return
+        columns, rows = self._cell_range(rect)
+        for cx in columns:
+            for cy in rows:
+                cell = self._cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(key)
+                    if not cell:
+                        del self._cells[(cx, cy)]
+
+    update = insert
+
+    def move(self, keys, dx, dy):
+        """把keys中的对象整体平移(dx, dy)"""
+        for key in keys:
+            x0, y0, x1, y1 = self._rects[key]
+            self.insert(key, (x0 + dx, y0 + dy, x1 + dx, y1 + dy))
+
+    def clear(self):
+        self._rects.clear()
+        self._cells.clear()
+
+    def rect(self, key):
+        return self._rects[key]
+
+    def query_point(self, x, y):
+        """包含点(x, y)的对象（含边界），按键排序"""
+        size = self.cell_size
+        cell = self._cells.get((math.floor(x / size), math.floor(y / size)), ())
+        return sorted(key for key in cell if _contains(self._rects[key], x, y))
+
+    def query_rect(self, x0, y0, x1, y1):
+        """与矩形相交（含边界）的对象，按键排序"""
+        box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        columns, rows = self._cell_range(box)
+        found = set()
+        if len(columns) * len(rows) > len(self._cells):
+            # 查询范围比已占用的格子还多时，直接遍历格子更快
+            candidates = (key for cell in self._cells.values() for key in cell)
+        else:
+            candidates = (key for cx in columns for cy in rows for key in self._cells.get((cx, cy), ()))
+        for key in candidates:
+            if key not in found and _overlaps(self._rects[key], box):
+                found.add(key)
+        return sorted(found)
+
+    def nearest(self, x, y, max_distance):
+        """距离点(x, y)严格小于max_distance的最近对象（距离为到矩形的距离），没有时返回None
+
+        距离相同时返回键最小的，与按顺序线性扫描的结果一致。
+        """
+        best = None
+        for key in self.query_rect(x - max_distance, y - max_distance, x + max_distance, y + max_distance):
+            x0, y0, x1, y1 = self._rects[key]
+            dx = max(x0 - x, 0, x - x1)
+            dy = max(y0 - y, 0, y - y1)
+            distance = (dx ** 2 + dy ** 2) ** 0.5
+            if distance < max_distance and (best is None or distance < best[0]):
+                best = (distance, key)
+        return None if best is None else best[1]
+
+
+def _contains(rect, x, y):
+    return rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3]
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
@@ -0,0 +1,125 @@
+"""界面启动耗时基准
+
+每个工具在独立的子进程中冷启动（python -X importtime 之外的真实计时）：
+    导入  = 导入脚本模块（含其依赖）的时间
+    窗口  = 创建Tk根窗口、构建界面并处理完首轮事件（窗口出现）的时间
+同时列出启动后已加载的重型模块（pandas、cv2、matplotlib），这些模块应在用到时才导入。
+
+    python startup_benchmark.py            # 所有工具，各启动3次取中位数
+    python startup_benchmark.py -n 5 sticker_generator.py
+    python startup_benchmark.py --json startup.json
+
+没有显示环境时只测导入时间。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 脚本 -> 界面类
+APPS = {
+    "打印条码/1.py": "CoordinateLabelGenerator",
+    "coordinate_label_generator.py": "CoordinateLabelGenerator",
+    "sticker_generator.py": "StickerGeneratorApp",
+    "image_based_sticker_generator.py": "ImageBasedStickerGeneratorApp",
+    "barcode_label_designer.py": "GridCoordinateMarker",
+    "barcode_designer.py": "BarcodeDesigner",
+    "rect_editor.py": "A4CoordinateEditor",
+    "csv_generator.py": "ReversibleCSVGenerator",
+}
+
+HEAVY_MODULES = ("pandas", "cv2", "matplotlib")
+
+# 子进程中执行：导入脚本、构建窗口，输出JSON结果
+PROBE = r"""
+import importlib.util, json, os, sys, time
+start = time.perf_counter()
+path, class_name = sys.argv[1], sys.argv[2]
+sys.path.insert(0, os.path.dirname(path))
+spec = importlib.util.spec_from_file_location("app_under_test", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+
+result = {"import": imported - start, "window": None}
+try:
+    root = module.tk.Tk()
+except Exception as e:
+    result["error"] = str(e)
+else:
+    root.withdraw()
+    getattr(module, class_name)(root)
+    root.deiconify()
+    root.update()
+    result["window"] = time.perf_counter() - start
+    root.destroy()
+result["heavy"] = [name for name in json.loads(sys.argv[3]) if name in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def probe(script, class_name):
+    """冷启动一次，返回{"import": 秒, "window": 秒或None, "heavy": [...]}"""
+    path = os.path.join(ROOT, script)
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, path, class_name, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"failed": lines[-1] if lines else f"退出码 {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(script, class_name, repeat):
+    runs = [probe(script, class_name) for _ in range(repeat)]
+    failed = [run["failed"] for run in runs if "failed" in run]
+    if failed:
+        return {"script": script, "failed": failed[0]}
+
+    windows = [run["window"] for run in runs if run["window"] is not None]
+    return {
+        "script": script,
+        "import": statistics.median(run["import"] for run in runs),
+        "window": statistics.median(windows) if windows else None,
+        "heavy": sorted(set(name for run in runs for name in run["heavy"])),
+        "error": runs[-1].get("error"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="界面启动耗时基准")
+    parser.add_argument("scripts", nargs="*", help="要测试的脚本（默认全部）")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="每个脚本冷启动次数，取中位数")
+    parser.add_argument("--json", help="把结果保存为JSON文件")
+    args = parser.parse_args(argv)
+
+    scripts = args.scripts or list(APPS)
+    results = []
+    print(f"{'脚本':<36}{'导入(ms)':>10}{'窗口(ms)':>10}  启动时已加载的重型模块")
+    for script in scripts:
+        script = os.path.relpath(os.path.join(ROOT, script), ROOT).replace(os.sep, "/")
+        if script not in APPS:
+            print(f"{script:<36}未知脚本，可选：{', '.join(APPS)}")
+            continue
+        result = measure(script, APPS[script], args.repeat)
+        results.append(result)
+        if "failed" in result:
+            print(f"{script:<36}启动失败：{result['failed']}")
+            continue
+        window = f"{result['window'] * 1000:.0f}" if result["window"] is not None else "-"
+        print(f"{script:<36}{result['import'] * 1000:>10.0f}{window:>10}  {', '.join(result['heavy']) or '无'}")
+
+    if any(result.get("error") for result in results):
+        print("\n无法创建窗口（没有显示环境？），只测量了导入时间")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
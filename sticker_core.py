@@ -0,0 +1,454 @@
+import functools
+import os
+import platform
+import string
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageOps
+import page_output
+import pdf_output
+import vector_output
+import render_profile
+import font_registry
+
+
+# ----------------------------------------------------------------------
+# 贴纸生成的渲染核心（不依赖tkinter，界面和命令行共用）
+#
+# 网格贴纸（sticker_generator）和按图像识别位置的贴纸（image_based_sticker_generator）
+# 使用同一套文字适配和保存逻辑，输出与界面生成的逐字节一致。
+# ----------------------------------------------------------------------
+
+# 常量定义 - 单位：mm
+A4_WIDTH = 210  # A4宽度
+A4_HEIGHT = 297  # A4高度
+
+# 贴纸区域总尺寸（用户指定）
+STICKER_SHEET_WIDTH = 198  # 横向总宽度19.8cm
+STICKER_SHEET_HEIGHT = 165  # 竖向总高度16.5cm
+
+# 贴纸网格参数
+COLUMNS = 6  # 横向6列
+ROWS = 14    # 竖向14行
+
+# 贴纸区域内部边缘和间隔（用户指定）
+HORIZONTAL_EDGE = 2  # 横向两边边缘（左/右各2mm）
+VERTICAL_EDGE = 1    # 竖向两边边缘（上/下各1mm）
+COLUMN_GAP = 1       # 列之间间隔1mm
+ROW_GAP = 1          # 行之间间隔1mm
+
+# 精确计算单张贴纸尺寸
+STICKER_WIDTH = (STICKER_SHEET_WIDTH - HORIZONTAL_EDGE*2 - COLUMN_GAP*(COLUMNS-1)) / COLUMNS  # 31.5mm
+STICKER_HEIGHT = (STICKER_SHEET_HEIGHT - VERTICAL_EDGE*2 - ROW_GAP*(ROWS-1)) / ROWS  # ~10.714mm
+
+# 贴纸区域在A4上的位置（整体左移2mm，下移0.5mm）
+SHEET_ORIGIN_X = -2   # 左移2mm
+SHEET_ORIGIN_Y = 0.5  # 下移0.5mm（按最新要求调整）
+
+# 图片参数（300dpi保证打印清晰度）
+DPI = 300
+MM_TO_PIXEL = DPI / 25.4  # 毫米到像素的转换因子（1mm ≈ 11.811像素）
+PDF_FILENAME = "stickers.pdf"  # PDF格式时所有页面写入保存目录下的这个文件
+
+# A4尺寸（像素）
+A4_WIDTH_PX = int(A4_WIDTH * MM_TO_PIXEL)
+A4_HEIGHT_PX = int(A4_HEIGHT * MM_TO_PIXEL)
+
+# 文字适配的字号范围
+MIN_FONT_SIZE = 5
+MAX_FONT_SIZE = 30
+
+
+def system_fonts():
+    """各平台的中文字体路径 {名称: 路径}"""
+    system = platform.system()
+    if system == "Windows":
+        return {"simhei": "C:/Windows/Fonts/simhei.ttf", "msyh": "C:/Windows/Fonts/msyh.ttc"}
+    if system == "Darwin":  # macOS
+        return {"simhei": "/Library/Fonts/SimHei.ttf", "msyh": "/Library/Fonts/Microsoft YaHei.ttc"}
+    return {"simhei": "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"}
+
+
+def find_font(font_path=None):
+    """返回可用的字体路径：优先font_path，其次系统黑体；都不可用时返回None"""
+    return font_registry.find_font((font_path, system_fonts()["simhei"]))
+
+
+def paginate(items, per_page):
+    """按每页数量分页（至少一页）"""
+    total_pages = max(1, (len(items) + per_page - 1) // per_page)
+    return [items[i*per_page:(i+1)*per_page] for i in range(total_pages)]
+
+
+def sticker_position(index):
+    """计算网格中第index张贴纸的绝对坐标（mm），返回(x, y, 行, 列)"""
+    row = index // COLUMNS
+    col = index % COLUMNS
+
+    x = round(SHEET_ORIGIN_X + HORIZONTAL_EDGE + col * (STICKER_WIDTH + COLUMN_GAP), 4)
+    y = round(SHEET_ORIGIN_Y + VERTICAL_EDGE + row * (STICKER_HEIGHT + ROW_GAP), 4)
+
+    return (x, y, row, col)
+
+
+def _truetype(font_path, size):
+    return font_registry.get_font(font_path, size) if font_path else font_registry.default_font()
+
+
+# 文字适配的记忆：(字体, 文字长度, 方框宽高, 字号范围) -> 上次选中的字号（没有合适字号时为min_size - 1）
+# 同一列的设备码/密钥长度相同，下一次从这个字号开始验证，通常两次测量即可确定
+_fit_hints = OrderedDict()
+# 字宽表：字体 -> {字符: MAX_FONT_SIZE字号下的字宽}，预先填入数字和字母，用于没有记忆时估计起始字号
+_width_tables = OrderedDict()
+FIT_ALPHABET = string.digits + string.ascii_letters
+# 两个记忆都按最近最少使用淘汰，界面长时间运行、生成很多批次时不会无限增长
+MAX_FIT_HINTS = 1024
+MAX_WIDTH_TABLES = 16
+_fit_lock = threading.Lock()
+
+
+def _lru_get(cache, key):
+    with _fit_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _lru_put(cache, key, value, limit):
+    with _fit_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+
+def _text_fits(text, box_width, box_height, font_path, size):
+    bbox = _truetype(font_path, size).getbbox(text)
+    return bbox[2] - bbox[0] <= box_width and bbox[3] - bbox[1] <= box_height
+
+
+def _estimate_size(text, box_width, font_path, min_size, max_size):
+    """按字宽表估计能放下的最大字号（只作为二分查找的起点）"""
+    table = _lru_get(_width_tables, font_path)
+    if table is None:
+        font = _truetype(font_path, MAX_FONT_SIZE)
+        table = {char: font.getlength(char) for char in FIT_ALPHABET}
+    missing = set(text) - table.keys()
+    if missing:
+        font = _truetype(font_path, MAX_FONT_SIZE)
+        table = dict(table)
+        table.update((char, font.getlength(char)) for char in missing)
+    _lru_put(_width_tables, font_path, table, MAX_WIDTH_TABLES)
+    width = sum(table[char] for char in text)
+    if width <= 0:
+        return max_size
+    return max(min_size, min(max_size, int(box_width * MAX_FONT_SIZE / width)))
+
+
+def fit_font_size(text, box_width, box_height, font_path, min_size=MIN_FONT_SIZE, max_size=MAX_FONT_SIZE):
+    """min_size~max_size中能放下text的最大字号，都放不下时返回None
+
+    与从大到小逐个尝试的结果相同（文字尺寸随字号单调变化），但用二分查找：
+    从记忆或字宽表估计的字号开始验证，预热后每次只需测量两次。
+    """
+    key = (font_path, len(text), box_width, box_height, min_size, max_size)
+    hint = _lru_get(_fit_hints, key)
+    if hint is None:
+        hint = _estimate_size(text, box_width, font_path, min_size, max_size)
+    hint = max(min_size, min(max_size, hint))
+
+    def largest_fitting(low, high):
+        found = None
+        while low <= high:
+            middle = (low + high) // 2
+            if _text_fits(text, box_width, box_height, font_path, middle):
+                found, low = middle, middle + 1
+            else:
+                high = middle - 1
+        return found
+
+    if _text_fits(text, box_width, box_height, font_path, hint):
+        if hint == max_size or not _text_fits(text, box_width, box_height, font_path, hint + 1):
+            size = hint
+        else:
+            size = largest_fitting(hint + 2, max_size) or hint + 1
+    else:
+        size = largest_fitting(min_size, hint - 1)
+
+    _lru_put(_fit_hints, key, size if size is not None else min_size - 1, MAX_FIT_HINTS)
+    return size
+
+
+def fit_text_to_box(text, box_width, box_height, font_path, min_size=MIN_FONT_SIZE, max_size=MAX_FONT_SIZE):
+    """
+    调整文字大小并在必要时轻微变形以完全填充方框
+    返回：(字体, 调整后的文字图像)
+    """
+    # 先尝试调整字体大小
+    size = fit_font_size(text, box_width, box_height, font_path, min_size, max_size)
+    if size is not None:
+        return (_truetype(font_path, size), None)  # 无需变形
+
+    # 如果最大字体仍超出宽度，创建文字图像并轻微变形
+    font = _truetype(font_path, max_size)
+    text_img = Image.new('L', (int(box_width * 1.2), int(box_height * 1.2)), 0)
+    text_draw = ImageDraw.Draw(text_img)
+    text_draw.text((0, 0), text, font=font, fill=255)
+
+    # 计算缩放比例（限制在1.2倍以内，避免过度变形）
+    bbox = text_img.getbbox()
+    if not bbox:
+        return (font, None)
+
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    scale_x = min(box_width / text_width, 1.2)
+    scale_y = min(box_height / text_height, 1.2)
+
+    # 缩放文字图像
+    with render_profile.phase("stretch"):
+        scaled_img = text_img.resize(
+            (int(text_width * scale_x), int(text_height * scale_y)),
+            Image.Resampling.LANCZOS
+        )
+
+    return (None, scaled_img)
+
+
+def draw_fitted_text(img, draw, page, text, x, y, box_width, box_height, font_path):
+    """把文字适配到方框内，左上角贴紧(x, y)
+
+    page不为None时输出为矢量字形串（与栅格版本相同的字号和拉伸比例），否则画到img上。
+    """
+    with render_profile.phase("text_fit"):
+        font, text_img = fit_text_to_box(text, box_width, box_height, font_path)
+
+    if page is not None:
+        if text_img:
+            # 变形文字：最大字号的文字画布（方框的1.2倍）整体缩放成text_img的尺寸
+            font = _truetype(font_path, MAX_FONT_SIZE)
+            x_stretch = text_img.width / int(box_width * 1.2)
+            y_stretch = text_img.height / int(box_height * 1.2)
+        else:
+            x_stretch = y_stretch = 1.0
+        offsets = [font.getlength(text[:i]) for i in range(len(text))]
+        page.add_text(x, y, text, font, offsets, x_stretch, y_stretch)
+    elif text_img:
+        # 变形文字的绘制位置（贴紧方框左上角）
+        with render_profile.phase("text_draw"):
+            img.paste(
+                ImageOps.colorize(text_img, (255,255,255), (0,0,0)),
+                (int(x), int(y)),
+                text_img
+            )
+    else:
+        # 正常文字的绘制位置（左上角对齐，无任何内边距）
+        with render_profile.phase("text_draw"):
+            draw.text((x, y), text, font=font, fill='black')
+
+
+def _new_page(width, height, output_mode, vector):
+    """返回(图像, 绘图对象, 矢量页面)，矢量格式不创建位图"""
+    if vector:
+        return None, None, vector_output.VectorPage(width, height, DPI)
+    img = Image.new(page_output.render_mode(output_mode), (width, height), color='white')
+    return img, ImageDraw.Draw(img), None
+
+
+def render_grid_page(data, font_path, output_mode="RGB", vector=False):
+    """渲染一页网格贴纸：data为[(设备码, 密钥), ...]，返回图像（未二值化）或VectorPage"""
+    img, draw, page = _new_page(A4_WIDTH_PX, A4_HEIGHT_PX, output_mode, vector)
+    render_profile.count("labels", len(data))
+
+    # 绘制每个贴纸
+    for idx, (device_code, password) in enumerate(data):
+        x, y, _, _ = sticker_position(idx)
+
+        # 转换为像素坐标
+        x_px = x * MM_TO_PIXEL
+        y_px = y * MM_TO_PIXEL
+        width_px = STICKER_WIDTH * MM_TO_PIXEL
+        height_px = STICKER_HEIGHT * MM_TO_PIXEL
+
+        # 绘制贴纸边框
+        if page is not None:
+            page.add_rect(x_px, y_px, x_px + width_px, y_px + height_px, width=1)
+        else:
+            draw.rectangle(
+                [x_px, y_px, x_px + width_px, y_px + height_px],
+                outline='black', width=1
+            )
+
+        # 计算上下区域高度（各占一半）
+        upper_height = height_px / 2
+        lower_height = height_px / 2
+
+        # 绘制设备码（顶部贴紧上边框）
+        if device_code:
+            draw_fitted_text(img, draw, page, f"设备码：{device_code}",
+                             x_px, y_px, width_px, upper_height, font_path)
+
+        # 绘制密码（底部贴紧下边框，紧接上半区域，无间隙）
+        if password:
+            draw_fitted_text(img, draw, page, f"密钥：{password}",
+                             x_px, y_px + upper_height, width_px, lower_height, font_path)
+
+    return page if page is not None else img
+
+
+def render_contour_page(data, contours, size, font_path, output_mode="RGB", vector=False):
+    """渲染一页按图像识别位置排列的贴纸
+
+    contours为检测到的标签矩形[(x, y, w, h), ...]（像素），size为原始图像尺寸(宽, 高)。
+    """
+    img, draw, page = _new_page(size[0], size[1], output_mode, vector)
+    render_profile.count("labels", min(len(data), len(contours)))
+
+    # 绘制每个标签内容
+    for idx, (device_code, password) in enumerate(data):
+        if idx >= len(contours):
+            break  # 防止数据超出检测到的标签数量
+
+        x, y, w, h = contours[idx]
+
+        # 计算上下区域高度（各占一半），四周留一点边距
+        upper_height = h / 2
+        lower_height = h / 2
+
+        # 绘制设备码（顶部）
+        if device_code:
+            draw_fitted_text(img, draw, page, f"设备码：{device_code}",
+                             x + 5, y + 5, w - 10, upper_height - 10, font_path)
+
+        # 绘制密码（底部）
+        if password:
+            draw_fitted_text(img, draw, page, f"密钥：{password}",
+                             x + 5, y + int(upper_height) + 5, w - 10, lower_height - 10, font_path)
+
+    return page if page is not None else img
+
+
+def detect_stickers(image_bgr, color_tolerance=30, min_area=500, max_area=50000):
+    """检测贴纸图像中的白色标签区域
+
+    返回(标签矩形列表[(x, y, w, h), ...], 标出检测结果的BGR图像)。
+    需要opencv（只在按图像识别时导入）。
+    """
+    import cv2
+    import numpy as np
+
+    # 创建原始图像的副本用于绘制结果
+    processed_img = image_bgr.copy()
+
+    # 转换为HSV颜色空间，便于颜色检测
+    hsv = cv2.cvtColor(processed_img, cv2.COLOR_BGR2HSV)
+
+    # 定义白色的HSV范围（标签颜色）
+    lower_white = np.array([0, 0, 255 - color_tolerance])
+    upper_white = np.array([180, color_tolerance, 255])
+
+    # 创建掩码
+    mask = cv2.inRange(hsv, lower_white, upper_white)
+
+    # 形态学操作，去除噪声
+    kernel = np.ones((5, 5), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    # 查找轮廓
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # 筛选轮廓（基于面积）
+    detected = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if min_area < area < max_area:
+            # 获取最小外接矩形
+            x, y, w, h = cv2.boundingRect(contour)
+            detected.append((x, y, w, h))
+
+            # 在图像上绘制边界框
+            cv2.rectangle(processed_img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+            # 标记序号
+            cv2.putText(processed_img, f"{len(detected)}",
+                        (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+    return detected, processed_img
+
+
+def encode_page(output_dir, output_mode, image_format, page_num, page):
+    """编码第page_num页（不访问PDF文件，可在子进程中执行）
+
+    png/tiff/svg直接写盘并返回None；pdf返回encode_image的结果，pdf-vector返回VectorPage本身，
+    由PageSink.commit按页序写入。
+    """
+    with render_profile.phase("encode"):
+        if image_format == "svg":
+            vector_output.save_svg(page, os.path.join(output_dir, f"page_{page_num}.svg"))
+        elif vector_output.is_vector_format(image_format):
+            return page
+        elif image_format == "pdf":
+            # 单色为1位Group-4，灰度/彩色为Flate无损压缩
+            return pdf_output.encode_image(page_output.finalize(page, output_mode))
+        else:
+            # 单色为1位PNG或Group-4 TIFF
+            img_path = os.path.join(output_dir, f"page_{page_num}{page_output.extension(image_format)}")
+            page_output.save_image(page, img_path, output_mode, image_format, dpi=(DPI, DPI))
+    return None
+
+
+class PageSink:
+    """按输出格式保存贴纸页面（线程安全，页面可以乱序写入）
+
+    png/tiff/svg每页一个文件（page_{n}），pdf/pdf-vector所有页面按页序写入同一个PDF_FILENAME。
+    path为实际保存位置（目录或PDF文件）。
+    """
+
+    def __init__(self, output_dir, output_mode="RGB", image_format="png", title="stickers"):
+        self.output_dir = output_dir
+        self.output_mode = output_mode
+        self.image_format = image_format
+        self.vector = vector_output.is_vector_format(image_format)
+        self.path = output_dir
+        self.pdf = None
+        if image_format == "pdf":
+            self.path = os.path.join(output_dir, PDF_FILENAME)
+            self.pdf = pdf_output.PdfWriter(self.path, title=title)
+        elif image_format == "pdf-vector":
+            self.path = os.path.join(output_dir, PDF_FILENAME)
+            self.pdf = vector_output.VectorPdfWriter(self.path, title=title)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    def encoder(self):
+        """返回可传给子进程的编码函数encoder(page_num, page)，结果交给commit"""
+        return functools.partial(encode_page, self.output_dir, self.output_mode, self.image_format)
+
+    def commit(self, page_num, encoded):
+        """写入encode_page的结果：逐页文件已经写盘，PDF页面按页序加入文件"""
+        if encoded is None:
+            return
+        with render_profile.phase("encode"):
+            if self.vector:
+                self.pdf.add_page(encoded, index=page_num - 1)
+            else:
+                self.pdf.add_image_page(encoded, index=page_num - 1, dpi=DPI)
+
+    def write(self, page_num, page):
+        """保存第page_num页（从1开始）：page为render_*_page的结果"""
+        self.commit(page_num, encode_page(self.output_dir, self.output_mode, self.image_format, page_num, page))
+        render_profile.count("pages")
+
+    def close(self):
+        with self._lock:
+            if self.pdf is not None:
+                self.pdf.close()
+                self.pdf = None
@@ -1,46 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import pandas as pd
+import functools
 import os
-import threading
-from queue import Queue
-import math
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-import platform
-
-# 常量定义 - 单位：mm
-A4_WIDTH = 210  # A4宽度
-A4_HEIGHT = 297  # A4高度
-
-# 贴纸区域总尺寸（用户指定）
-STICKER_SHEET_WIDTH = 198  # 横向总宽度19.8cm
-STICKER_SHEET_HEIGHT = 165  # 竖向总高度16.5cm
-
-# 贴纸网格参数
-COLUMNS = 6  # 横向6列
-ROWS = 14    # 竖向14行
-
-# 贴纸区域内部边缘和间隔（用户指定）
-HORIZONTAL_EDGE = 2  # 横向两边边缘（左/右各2mm）
-VERTICAL_EDGE = 1    # 竖向两边边缘（上/下各1mm）
-COLUMN_GAP = 1       # 列之间间隔1mm
-ROW_GAP = 1          # 行之间间隔1mm
-
-# 精确计算单张贴纸尺寸
-STICKER_WIDTH = (STICKER_SHEET_WIDTH - HORIZONTAL_EDGE*2 - COLUMN_GAP*(COLUMNS-1)) / COLUMNS  # 31.5mm
-STICKER_HEIGHT = (STICKER_SHEET_HEIGHT - VERTICAL_EDGE*2 - ROW_GAP*(ROWS-1)) / ROWS  # ~10.714mm
-
-# 贴纸区域在A4上的位置（整体左移2mm，下移0.5mm）
-SHEET_ORIGIN_X = -2   # 左移2mm
-SHEET_ORIGIN_Y = 0.5  # 下移0.5mm（按最新要求调整）
-
-# 图片参数（300dpi保证打印清晰度）
-DPI = 300
-MM_TO_PIXEL = DPI / 25.4  # 毫米到像素的转换因子（1mm ≈ 11.811像素）
-
-# A4尺寸（像素）
-A4_WIDTH_PX = int(A4_WIDTH * MM_TO_PIXEL)
-A4_HEIGHT_PX = int(A4_HEIGHT * MM_TO_PIXEL)
+from PIL import ImageFont
+from device_table import DeviceBatch
+import vector_output
+import sticker_core
+import render_profile
+import font_registry
+from page_scheduler import PageScheduler
+from sticker_core import (A4_WIDTH, A4_HEIGHT, STICKER_SHEET_WIDTH, STICKER_SHEET_HEIGHT, COLUMNS, ROWS,
+                          STICKER_WIDTH, STICKER_HEIGHT, SHEET_ORIGIN_X, SHEET_ORIGIN_Y)
 
 class StickerGeneratorApp:
     def __init__(self, root):
@@ -64,7 +34,14 @@ class StickerGeneratorApp:
         self.file_path = tk.StringVar()
         self.progress_var = tk.DoubleVar()
         self.status_var = tk.StringVar(value="就绪")
-        self.generating = False
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        self.scheduler = None  # 当前的页面调度器（生成中时非None）
+        
+        # 输出设置：页面模式（RGB彩色 / L灰度 / 1单色）和格式（png / tiff / pdf，pdf-vector / svg为矢量文字）
+        self.output_mode_var = tk.StringVar(value="RGB")
+        self.image_format_var = tk.StringVar(value="png")
+        self.output_options = ("RGB", "png")
+        self.sink = None  # 本次生成的页面保存器（PDF格式时按页序写入同一个文件）
         
         # 字体相关
         self.fonts = {}
@@ -73,25 +50,13 @@ class StickerGeneratorApp:
         # 创建UI
         self.create_widgets()
         
-        # 线程队列
-        self.queue = Queue()
-        self.max_threads = 2
-        
         # 绑定事件
         self.preview_canvas.bind("<Configure>", self.on_canvas_resize)
     
     def load_fonts(self):
         """加载中文字体，确保绘图时可用"""
-        system = platform.system()
         try:
-            if system == "Windows":
-                self.fonts["simhei"] = "C:/Windows/Fonts/simhei.ttf"
-                self.fonts["msyh"] = "C:/Windows/Fonts/msyh.ttc"
-            elif system == "Darwin":  # macOS
-                self.fonts["simhei"] = "/Library/Fonts/SimHei.ttf"
-                self.fonts["msyh"] = "/Library/Fonts/Microsoft YaHei.ttc"
-            else:  # Linux
-                self.fonts["simhei"] = "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"
+            self.fonts.update(sticker_core.system_fonts())
             
             # 测试字体是否可用
             test_font = ImageFont.truetype(self.fonts["simhei"], 12)
@@ -119,7 +84,17 @@ class StickerGeneratorApp:
         btn_frame = ttk.Frame(top_frame)
         btn_frame.pack(side=tk.RIGHT, padx=5)
         
+        ttk.Label(btn_frame, text="模式:").pack(side=tk.LEFT)
+        ttk.Combobox(btn_frame, textvariable=self.output_mode_var, values=["RGB", "L", "1"],
+                     state="readonly", width=4).pack(side=tk.LEFT, padx=2)
+        ttk.Combobox(btn_frame, textvariable=self.image_format_var,
+                     values=["png", "tiff", "pdf", "pdf-vector", "svg"],
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Label(btn_frame, text="进程数:").pack(side=tk.LEFT)
+        ttk.Spinbox(btn_frame, textvariable=self.workers_var, from_=1, to=os.cpu_count() or 1,
+                    width=3).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="生成图片", command=self.start_generation).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="取消", command=self.cancel_generation).pack(side=tk.LEFT, padx=5)
         
         # 分页控制
         page_frame = ttk.Frame(main_frame)
@@ -154,7 +129,7 @@ class StickerGeneratorApp:
     
     def browse_file(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("数据文件", "*.xlsx;*.xls;*.csv")],
+            filetypes=[("数据文件", "*.xlsx;*.xls;*.csv;*.txt")],
             title="选择包含device_code和password的文件"
         )
         if file_path:
@@ -164,38 +139,12 @@ class StickerGeneratorApp:
     def load_data(self, file_path):
         """加载并过滤数据"""
         try:
-            if file_path.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_path)
-            else:  # CSV
-                encodings = ['utf-8', 'gbk', 'gb2312']
-                for encoding in encodings:
-                    try:
-                        df = pd.read_csv(file_path, encoding=encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                else:
-                    raise ValueError("无法解析CSV编码，请尝试UTF-8格式")
-            
-            # 验证必要列
-            required = ['device_code', 'password']
-            missing = [c for c in required if c not in df.columns]
-            if missing:
-                raise ValueError(f"文件缺少必要列：{', '.join(missing)}")
-            
-            # 过滤空行
-            self.raw_data = []
-            for _, row in df.iterrows():
-                dev = str(row['device_code']).strip() if pd.notna(row['device_code']) else ""
-                pwd = str(row['password']).strip() if pd.notna(row['password']) else ""
-                if dev or pwd:
-                    self.raw_data.append((dev, pwd))
+            # CSV/Excel/纯文本统一加载为列式数据，过滤空行
+            self.raw_data = DeviceBatch.load(file_path).non_empty().pairs()
             
             # 分页处理
-            items_per_page = ROWS * COLUMNS
-            self.total_pages = max(1, math.ceil(len(self.raw_data) / items_per_page))
-            self.paged_data = [self.raw_data[i*items_per_page:(i+1)*items_per_page] 
-                              for i in range(self.total_pages)]
+            self.paged_data = sticker_core.paginate(self.raw_data, ROWS * COLUMNS)
+            self.total_pages = len(self.paged_data)
             
             self.current_page = 0
             self.update_page_label()
@@ -208,13 +157,7 @@ class StickerGeneratorApp:
     
     def get_sticker_position(self, index):
         """计算贴纸绝对坐标（mm）"""
-        row = index // COLUMNS
-        col = index % COLUMNS
-        
-        x = round(SHEET_ORIGIN_X + HORIZONTAL_EDGE + col * (STICKER_WIDTH + COLUMN_GAP), 4)
-        y = round(SHEET_ORIGIN_Y + VERTICAL_EDGE + row * (STICKER_HEIGHT + ROW_GAP), 4)
-        
-        return (x, y, row, col)
+        return sticker_core.sticker_position(index)
     
     def update_preview(self):
         """绘制预览，文字贴紧边框"""
@@ -326,6 +269,9 @@ class StickerGeneratorApp:
         self.update_preview()
     
     def start_generation(self):
+        if self.scheduler is not None:
+            messagebox.showwarning("警告", "正在生成，请等待完成或取消")
+            return
         if not self.paged_data:
             messagebox.showwarning("警告", "请先加载数据")
             return
@@ -334,176 +280,71 @@ class StickerGeneratorApp:
         if not output_dir:
             return
             
-        self.generating = True
+        # 输出设置在主线程读取，工作进程只拿到这个元组
+        self.output_options = (self.output_mode_var.get(), self.image_format_var.get())
+        if vector_output.is_vector_format(self.output_options[1]) and not self.default_font:
+            messagebox.showerror("错误", "矢量输出需要TrueType中文字体，未找到可用字体")
+            return
         self.progress_var.set(0)
         self.status_var.set(f"开始生成 {self.total_pages} 张图片...")
         
-        threading.Thread(target=self.generate_all_pages, args=(output_dir,), daemon=True).start()
+        self.generate_all_pages(output_dir)
+    
+    def cancel_generation(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+            self.status_var.set("正在取消...")
     
     def generate_all_pages(self, output_dir):
-        """生成所有页图片"""
-        for page_num in range(self.total_pages):
-            if not self.generating:
-                break
-            self.queue.put((page_num + 1, self.paged_data[page_num], output_dir))
-        
-        # 启动工作线程
-        threads = [threading.Thread(target=self.image_worker) 
-                  for _ in range(min(self.max_threads, self.total_pages))]
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
+        """在进程池中生成所有页图片，进度和结果由调度器在主线程回调"""
+        try:
+            workers = self.workers_var.get()
+        except tk.TclError:
+            workers = 1
+        
+        # PDF格式：子进程编码好页面，主进程按页序写入同一个文件，不在内存中积累页面
+        output_mode, image_format = self.output_options
+        self.sink = sticker_core.PageSink(output_dir, output_mode, image_format)
+        render = functools.partial(sticker_core.render_grid_page, font_path=self.default_font,
+                                   output_mode=self.sink.output_mode, vector=self.sink.vector)
+        pages = [(page_num + 1, data) for page_num, data in enumerate(self.paged_data)]
+        
+        self.scheduler = PageScheduler(self.root, workers, on_progress=self.on_page_done,
+                                       on_error=self.on_page_error, on_done=self.on_generation_done)
+        self.scheduler.start(pages, render, self.sink.encoder(), self.sink.commit)
+    
+    def on_page_done(self, done, total, page_num):
+        self.progress_var.set(done / total * 100)
+        self.status_var.set(f"已生成：第 {page_num} 页（{done}/{total}）")
+    
+    def on_page_error(self, page_num, message):
+        print(f"错误：第 {page_num} 页：{message}")
+        self.status_var.set(f"第 {page_num} 页生成失败：{message}")
+    
+    def on_generation_done(self, completed, failed, cancelled):
+        self.scheduler = None
+        self.sink.close()
+        render_profile.report("生成所有页面")
         
-        self.generating = False
+        if cancelled:
+            self.status_var.set(f"已取消：生成了 {completed}/{self.total_pages} 张图片")
+            return
+        if failed:
+            pages = "、".join(str(page_num) for page_num, _ in failed[:10])
+            self.status_var.set(f"完成 {completed} 张，{len(failed)} 页失败")
+            messagebox.showerror("部分页面失败",
+                                 f"已生成 {completed} 张图片，以下页面失败：{pages}"
+                                 f"{' 等' if len(failed) > 10 else ''}\n\n{failed[0][1]}")
+            return
         self.progress_var.set(100)
-        self.status_var.set(f"生成完成：{self.total_pages}张图片保存至 {output_dir}")
+        self.status_var.set(f"生成完成：{self.total_pages}张图片保存至 {self.sink.path}")
         messagebox.showinfo("完成", f"已生成 {self.total_pages} 张图片")
     
     def get_font(self, size):
         """获取指定大小的字体"""
-        try:
-            if self.default_font:
-                return ImageFont.truetype(self.default_font, size)
-            return ImageFont.load_default()
-        except:
-            return ImageFont.load_default()
-    
-    def fit_text_to_box(self, draw, text, box_width, box_height, font_path, min_size=5, max_size=30):
-        """
-        调整文字大小并在必要时轻微变形以完全填充方框
-        返回：(字体, 调整后的文字图像)
-        """
-        # 先尝试调整字体大小
-        for size in range(max_size, min_size - 1, -1):
-            font = ImageFont.truetype(font_path, size) if font_path else ImageFont.load_default()
-            bbox = font.getbbox(text)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            if text_width <= box_width and text_height <= box_height:
-                return (font, None)  # 无需变形
-        
-        # 如果最大字体仍超出宽度，创建文字图像并轻微变形
-        font = ImageFont.truetype(font_path, max_size) if font_path else ImageFont.load_default()
-        text_img = Image.new('L', (int(box_width * 1.2), int(box_height * 1.2)), 0)
-        text_draw = ImageDraw.Draw(text_img)
-        text_draw.text((0, 0), text, font=font, fill=255)
-        
-        # 计算缩放比例（限制在1.2倍以内，避免过度变形）
-        bbox = text_img.getbbox()
-        if not bbox:
-            return (font, None)
-            
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        scale_x = min(box_width / text_width, 1.2)
-        scale_y = min(box_height / text_height, 1.2)
-        
-        # 缩放文字图像
-        scaled_img = text_img.resize(
-            (int(text_width * scale_x), int(text_height * scale_y)),
-            Image.Resampling.LANCZOS
-        )
-        
-        return (None, scaled_img)
-    
-    def image_worker(self):
-        """图片生成工作线程"""
-        while not self.queue.empty() and self.generating:
-            try:
-                page_num, data, output_dir = self.queue.get(timeout=1)
-                img_path = os.path.join(output_dir, f"page_{page_num}.png")
-                
-                # 创建A4图片
-                img = Image.new('RGB', (A4_WIDTH_PX, A4_HEIGHT_PX), color='white')
-                draw = ImageDraw.Draw(img)
-                
-                # 绘制每个贴纸
-                for idx, (device_code, password) in enumerate(data):
-                    x, y, _, _ = self.get_sticker_position(idx)
-                    
-                    # 转换为像素坐标
-                    x_px = x * MM_TO_PIXEL
-                    y_px = y * MM_TO_PIXEL
-                    width_px = STICKER_WIDTH * MM_TO_PIXEL
-                    height_px = STICKER_HEIGHT * MM_TO_PIXEL
-                    
-                    # 绘制贴纸边框
-                    draw.rectangle(
-                        [x_px, y_px, x_px + width_px, y_px + height_px],
-                        outline='black', width=1
-                    )
-                    
-                    # 计算上下区域高度（各占一半）
-                    upper_height = height_px / 2
-                    lower_height = height_px / 2
-                    
-                    # 绘制设备码（顶部贴紧上边框）
-                    if device_code:
-                        text = f"设备码：{device_code}"
-                        # 适配文字到上半区域
-                        font, text_img = self.fit_text_to_box(
-                            draw, text, 
-                            width_px, upper_height,
-                            self.default_font
-                        )
-                        
-                        if text_img:
-                            # 变形文字的绘制位置（贴紧上边缘）
-                            img.paste(
-                                ImageOps.colorize(text_img, (255,255,255), (0,0,0)),
-                                (int(x_px), int(y_px)),
-                                text_img
-                            )
-                        else:
-                            # 正常文字的绘制位置（贴紧上边缘）
-                            draw.text(
-                                (x_px, y_px),  # 左上角对齐，无任何内边距
-                                text,
-                                font=font,
-                                fill='black'
-                            )
-                    
-                    # 绘制密码（底部贴紧下边框）
-                    if password:
-                        text = f"密钥：{password}"
-                        # 适配文字到下半区域
-                        font, text_img = self.fit_text_to_box(
-                            draw, text, 
-                            width_px, lower_height,
-                            self.default_font
-                        )
-                        
-                        if text_img:
-                            # 变形文字的绘制位置（贴紧下边缘）
-                            img.paste(
-                                ImageOps.colorize(text_img, (255,255,255), (0,0,0)),
-                                (int(x_px), int(y_px + upper_height)),
-                                text_img
-                            )
-                        else:
-                            # 正常文字的绘制位置（贴紧下边缘）
-                            draw.text(
-                                (x_px, y_px + upper_height),  # 紧接上半区域，无间隙
-                                text,
-                                font=font,
-                                fill='black'
-                            )
-                
-                # 保存图片
-                img.save(img_path, dpi=(DPI, DPI))
-                
-                # 更新进度
-                progress = (page_num / self.total_pages) * 100
-                self.progress_var.set(progress)
-                self.status_var.set(f"已生成：第 {page_num} 页")
-                
-            except Exception as e:
-                self.status_var.set(f"生成失败：{str(e)}")
-                print(f"错误：{e}")
-            finally:
-                self.queue.task_done()
+        if self.default_font:
+            return font_registry.load_font([self.default_font], size)
+        return font_registry.default_font()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+
+# 被测模块都在仓库根目录（没有打包），直接加入导入路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 需要TrueType字体的测试：LABEL_TEST_FONT指定，否则在常见位置查找，都没有时跳过
+FONT_CANDIDATES = (
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+)
+
+
+@pytest.fixture(scope="session")
+def font_path():
+    for path in (os.environ.get("LABEL_TEST_FONT"),) + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    pytest.skip("没有可用的TrueType字体（可用LABEL_TEST_FONT指定）")
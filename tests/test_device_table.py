@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from device_table import DeviceBatch, read_table
+
+
+def old_devices(filename):
+    """原版本：pd.read_csv后逐行 str(df.iloc[i][列名])"""
+    df = pd.read_csv(filename)
+    return [(str(df.iloc[i]['device_code']), str(df.iloc[i]['password'])) for i in range(len(df))]
+
+
+def write(path, text, encoding="utf-8"):
+    path.write_text(text, encoding=encoding)
+    return str(path)
+
+
+def test_csv_matches_old_row_access(tmp_path):
+    rows = [(f"DEV{i:05d}X", f"k{i * 7919:x}Z") for i in range(50)]
+    filename = write(tmp_path / "devices.csv",
+                     "device_code,password\n" + "".join(f"{a},{b}\n" for a, b in rows))
+
+    batch = DeviceBatch.load(filename)
+    assert len(batch) == 50
+    assert batch.pairs() == old_devices(filename) == rows
+    assert batch[3] == rows[3]
+
+
+def test_leading_zeros_are_kept(tmp_path):
+    filename = write(tmp_path / "devices.csv", "device_code,password\n000123,0042\n")
+    assert DeviceBatch.load(filename).pairs() == [("000123", "0042")]
+
+
+def test_text_file_without_header(tmp_path):
+    filename = write(tmp_path / "devices.txt", "A001 key1\nA002,key2\nA003\tkey3\n")
+    assert DeviceBatch.load(filename).pairs() == [("A001", "key1"), ("A002", "key2"), ("A003", "key3")]
+
+
+def test_gbk_csv(tmp_path):
+    filename = write(tmp_path / "devices.csv", "device_code,password,备注\nA1,K1,一号\n", encoding="gbk")
+    assert DeviceBatch.load(filename).pairs() == [("A1", "K1")]
+
+
+def test_missing_column(tmp_path):
+    filename = write(tmp_path / "devices.csv", "device_code,other\nA1,K1\n")
+    with pytest.raises(ValueError):
+        read_table(filename, ("device_code", "password"))
+
+
+def test_slice_and_non_empty():
+    batch = DeviceBatch([" A1", "", "A3", ""], ["K1", "", "", "K4"])
+    part = batch[1:3]
+    assert isinstance(part, DeviceBatch)
+    assert part.pairs() == [("", ""), ("A3", "")]
+    assert batch.non_empty().pairs() == [(" A1", "K1"), ("A3", ""), ("", "K4")]
+
+    with pytest.raises(ValueError):
+        DeviceBatch(["A1"], [])
+
+
+def test_from_frame_strips_and_fills():
+    df = pd.DataFrame({"device_code": [" A1 ", None], "password": ["K1", " K2"]})
+    assert DeviceBatch.from_frame(df).pairs() == [("A1", "K1"), ("", "K2")]
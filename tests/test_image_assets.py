@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from image_assets import ImageAssetCache
+
+
+def old_asset(path, scale, rotation):
+    """原barcode_designer._draw_label_image中粘贴前的图片"""
+    with Image.open(path) as source:
+        img = source.convert("RGBA")
+    if scale != 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    if rotation != 0:
+        img = img.rotate(rotation, expand=True)
+    return img
+
+
+def write_logo(path, color=(200, 30, 30)):
+    image = Image.new("RGB", (64, 40), "white")
+    ImageDraw.Draw(image).ellipse((8, 4, 56, 36), fill=color)
+    image.save(path)
+    return str(path)
+
+
+def same(a, b):
+    return a.size == b.size and np.array_equal(np.asarray(a), np.asarray(b))
+
+
+@pytest.mark.parametrize("scale, rotation", [(1.0, 0), (0.5, 0), (1.7, 0), (1.0, 30), (0.8, -45)])
+def test_matches_old_decode(tmp_path, scale, rotation):
+    path = write_logo(tmp_path / "logo.png")
+    assert same(ImageAssetCache().get(path, scale, rotation), old_asset(path, scale, rotation))
+
+
+def test_decodes_once(tmp_path, monkeypatch):
+    path = write_logo(tmp_path / "logo.png")
+    cache = ImageAssetCache()
+    first = cache.get(path, 0.5, 10)
+
+    opened = []
+    original = Image.open
+    monkeypatch.setattr(Image, "open", lambda *args, **kwargs: opened.append(args) or original(*args, **kwargs))
+    assert cache.get(path, 0.5, 10) is first
+    assert opened == []
+    assert cache.get(path, 0.5, 20) is not first
+    assert len(opened) == 1
+
+
+def test_modified_file_is_reloaded(tmp_path):
+    path = write_logo(tmp_path / "logo.png")
+    cache = ImageAssetCache()
+    cache.get(path)
+
+    write_logo(path, color=(30, 30, 200))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert same(cache.get(path), old_asset(path, 1.0, 0))
+    assert cache.size == 64 * 40 * 4
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(OSError):
+        ImageAssetCache().get(str(tmp_path / "missing.png"))
+
+
+def test_evicts_by_size(tmp_path):
+    path = write_logo(tmp_path / "logo.png")
+    cache = ImageAssetCache(max_bytes=64 * 40 * 4 * 2)
+    for rotation in (0, 90, 180):
+        cache.get(path, 1.0, rotation)
+    assert cache.size == 64 * 40 * 4 * 2
+
+    # 超过上限的图片直接返回，不放入缓存
+    big = cache.get(path, 2.0, 0)
+    assert big.size == (128, 80)
+    assert cache.size == 64 * 40 * 4 * 2
+
+    cache.clear()
+    assert cache.size == 0
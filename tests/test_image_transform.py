@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from image_transform import skew_image
+
+
+def old_skew(image, skew_x, skew_y):
+    """原barcode_designer._skew_image：逐像素正向映射"""
+    width, height = image.size
+    skew_x_rad = math.radians(skew_x)
+    skew_y_rad = math.radians(skew_y)
+    new_width = int(width + abs(height * math.tan(skew_x_rad)))
+    new_height = int(height + abs(width * math.tan(skew_y_rad)))
+    result = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 0))
+    for y in range(height):
+        for x in range(width):
+            pixel = image.getpixel((x, y))
+            if pixel[3] > 0:
+                new_x = x + int(y * math.tan(skew_x_rad))
+                new_y = y + int(x * math.tan(skew_y_rad))
+                if 0 <= new_x < new_width and 0 <= new_y < new_height:
+                    result.putpixel((new_x, new_y), pixel)
+    return result
+
+
+def text_block(size=(90, 40)):
+    image = Image.new("RGBA", size, (255, 255, 255, 0))
+    ImageDraw.Draw(image).text((5, 5), "DEV-0042\nKEY-17", fill=(0, 0, 0, 255))
+    ImageDraw.Draw(image).rectangle((0, 0, size[0] - 1, size[1] - 1), outline=(200, 0, 0, 255))
+    return image
+
+
+def opaque(image):
+    return np.asarray(image)[:, :, 3] > 0
+
+
+def shifted(row, shift):
+    """行向右平移shift个像素，移出画布的像素丢掉"""
+    result = np.zeros_like(row)
+    result[shift:] = row[:len(row) - shift]
+    return result
+
+
+def test_no_skew_keeps_pixels():
+    image = text_block()
+    assert np.array_equal(np.asarray(skew_image(image, 0, 0, Image.Resampling.NEAREST)), np.asarray(image))
+    # 双三次采样时全透明像素的颜色可能变化，不影响作为蒙版粘贴的结果
+    result = np.asarray(skew_image(image, 0, 0))
+    assert np.array_equal(result[:, :, 3], np.asarray(image)[:, :, 3])
+    visible = result[:, :, 3] > 0
+    assert np.array_equal(result[visible], np.asarray(image)[visible])
+
+
+@pytest.mark.parametrize("skew_x, skew_y", [(10, 0), (0, 15), (30, 0), (5, 7), (20, 12), (-10, 0), (0, -25)])
+def test_size_matches_old(skew_x, skew_y):
+    image = text_block()
+    assert skew_image(image, skew_x, skew_y).size == old_skew(image, skew_x, skew_y).size
+
+
+@pytest.mark.parametrize("skew_x", [8, 20, 35])
+def test_horizontal_skew_rows_match_old(skew_x):
+    """只在X方向倾斜时每行都是原行的平移，与逐像素版本最多相差1像素（采样点取像素中心）"""
+    image = text_block()
+    old = opaque(old_skew(image, skew_x, 0))
+    new = opaque(skew_image(image, skew_x, 0, Image.Resampling.NEAREST))
+    for y in range(image.height):
+        assert any(np.array_equal(shifted(old[y], shift), new[y]) for shift in (0, 1)), y
+
+
+@pytest.mark.parametrize("skew_x, skew_y", [(-20, 0), (0, -20)])
+def test_negative_skew_keeps_content(skew_x, skew_y):
+    """负角度时原版本把内容移出画布丢掉，这里整体平移，只有边缘可能差1像素"""
+    image = text_block()
+    total = opaque(image).sum()
+    new = opaque(skew_image(image, skew_x, skew_y, Image.Resampling.NEAREST)).sum()
+    old = opaque(old_skew(image, skew_x, skew_y)).sum()
+    assert total - new <= 2
+    assert old < total - 2
+
+
+@pytest.mark.parametrize("skew_x, skew_y", [(20, 20), (10, 25), (30, 5), (35, 30)])
+def test_two_axis_footprint_matches_old(skew_x, skew_y):
+    image = Image.new("RGBA", (60, 60), (0, 0, 0, 255))
+    old = opaque(old_skew(image, skew_x, skew_y))
+    new = opaque(skew_image(image, skew_x, skew_y, Image.Resampling.NEAREST))
+    assert (old & new).sum() / (old | new).sum() > 0.9
+
+
+def test_singular_angles():
+    result = skew_image(text_block(), 45, 45)
+    assert result.mode == "RGBA"
+    assert opaque(result).any()
+
+
+def test_converts_to_rgba():
+    image = text_block().convert("RGB")
+    assert skew_image(image, 10, 0).mode == "RGBA"
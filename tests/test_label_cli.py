@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from PIL import Image
+
+import label_cli
+
+
+def write_config(tmp_path, config):
+    filename = tmp_path / "config.json"
+    filename.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    return str(filename)
+
+
+def test_defaults_without_config():
+    args = label_cli.parse_args(["sticker", "--devices", "d.csv", "--output", "out"])
+    assert (args.format, args.mode, args.font) == ("png", "RGB", None)
+    assert args.func is label_cli.run_sticker
+
+
+def test_config_supplies_defaults(tmp_path):
+    config = write_config(tmp_path, {"devices": "d.csv", "output": "out", "format": "pdf",
+                                     "mode": "1", "threads": 3})
+    args = label_cli.parse_args(["sticker", "--config", config])
+    assert (args.devices, args.output, args.format, args.mode, args.threads) == ("d.csv", "out", "pdf", "1", 3)
+
+
+def test_command_line_overrides_config(tmp_path):
+    config = write_config(tmp_path, {"devices": "d.csv", "output": "out", "format": "pdf", "mode": "1"})
+    args = label_cli.parse_args(["sticker", "--format", "tiff", "--config", config, "--workers", "2"])
+    assert (args.format, args.mode, args.threads) == ("tiff", "1", 2)
+
+
+def test_config_keys_with_dashes(tmp_path):
+    config = write_config(tmp_path, {"image": "sheet.png", "devices": "d.csv", "output": "out",
+                                     "min-area": 10, "max_area": 20})
+    args = label_cli.parse_args(["image-sticker", "--config", config, "--tolerance", "5"])
+    assert (args.min_area, args.max_area, args.tolerance) == (10, 20, 5)
+
+
+def test_config_does_not_leak_into_other_commands(tmp_path):
+    config = write_config(tmp_path, {"count": 5, "seed": 7, "output": "keys.csv"})
+    args = label_cli.parse_args(["keys", "--config", config])
+    assert (args.count, args.seed) == (5, 7)
+
+    with pytest.raises(SystemExit):
+        label_cli.parse_args(["sticker", "--output", "out"])
+
+
+def test_coordinate_config_is_generator_config(tmp_path):
+    """coordinate的--config是生成器自己的配置文件，不作为命令行默认值"""
+    config = write_config(tmp_path, {"format": "pdf", "font_size": 20})
+    args = label_cli.parse_args(["coordinate", "--config", config, "--devices", "d.csv", "--output", "out"])
+    assert args.format == "png"
+    assert args.config == config
+    with pytest.raises(SystemExit):
+        label_cli.parse_args(["coordinate", "--config", config, "--output", "out"])
+
+
+def test_coordinate_keeps_a4_height(tmp_path):
+    """默认高度297mm时页面与界面相同，为2480×3508"""
+    devices = tmp_path / "devices.csv"
+    devices.write_text("device_code,password\nA001,K001\nA002,K002\n", encoding="utf-8")
+    output = tmp_path / "out"
+    label_cli.main(["coordinate", "--devices", str(devices), "--output", str(output), "--workers", "1"])
+
+    with Image.open(output / "label_page_1.png") as page:
+        assert page.size == (2480, 3508)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import label_layout
+from label_generator_core import LabelGeneratorCore
+
+
+# 原逐点版本（打印条码/1.py）的公式，向量化结果必须逐位一致
+
+def old_positions(core, rows, columns, x_spacing, y_spacing):
+    col_spacing = core.print_width_px / (columns - 1) * (x_spacing / 100.0) if columns > 1 else 0
+    row_spacing = core.print_height_px / (rows - 1) * (y_spacing / 100.0) if rows > 1 else 0
+    return [(core.margin_left_px + col * col_spacing, core.margin_top_px + row * row_spacing)
+            for row in range(rows) for col in range(columns)]
+
+
+def old_value_width(text, advance, spacing):
+    if not text:
+        return 0
+    return sum(advance(c) for c in text) + (len(text) - 1) * spacing
+
+
+# FreeType字宽都是1/64像素的整数倍
+WIDTHS = {c: (17 + 5 * i) / 64 for i, c in enumerate("0123456789ABCDEFabcdef-")}
+
+
+@pytest.mark.parametrize("rows, columns, x_spacing, y_spacing",
+                         [(14, 6, 90, 57), (12, 6, 100, 100), (1, 1, 90, 57), (3, 1, 33, 71), (1, 7, 13, 50)])
+def test_slot_positions_match_old_loop(rows, columns, x_spacing, y_spacing):
+    core = LabelGeneratorCore()
+    assert core.calculate_positions(rows, columns, x_spacing, y_spacing) == \
+        old_positions(core, rows, columns, x_spacing, y_spacing)
+
+
+def test_uneven_pitches():
+    xs, ys = label_layout.slot_positions(2, 3, 10.0, 20.0, [5.0, 7.5], [11.0])
+    assert xs.tolist() == [10.0, 15.0, 22.5] * 2
+    assert ys.tolist() == [20.0] * 3 + [31.0] * 3
+
+    with pytest.raises(ValueError):
+        label_layout.pitch_offsets(3, [5.0])
+
+
+def test_device_anchors_cycle_slots():
+    core = LabelGeneratorCore()
+    positions = old_positions(core, 3, 2, 90, 57)
+    slot_x, slot_y = (np.array(values) for values in zip(*positions))
+    anchors = label_layout.device_anchors(5, 20, slot_x, slot_y, 6, 20, -23)
+
+    for n, i in enumerate(range(5, 25)):
+        base_x, base_y = positions[i % len(positions)]
+        assert anchors["page"][n] == i // 6
+        assert anchors["x"][n] == base_x + 20
+        assert anchors["y"][n] == base_y - 23
+
+
+def test_spaced_text_widths_match_per_char_sum():
+    texts = ["0123456789", "", "A", "abcdef-0042", "FFFFFFFFFFFF", "9"]
+    for spacing in (0, 2, 3.5):
+        widths = label_layout.spaced_text_widths(texts, WIDTHS.__getitem__, spacing)
+        assert widths.tolist() == [old_value_width(t, WIDTHS.__getitem__, spacing) for t in texts]
+
+    assert label_layout.spaced_text_widths([], WIDTHS.__getitem__).size == 0
+    assert label_layout.spaced_text_widths(["", ""], WIDTHS.__getitem__).tolist() == [0.0, 0.0]
+
+
+def test_spaced_text_widths_query_each_char_once():
+    calls = []
+
+    def advance(char):
+        calls.append(char)
+        return WIDTHS[char]
+
+    label_layout.spaced_text_widths(["0011", "1100", "0101"], advance)
+    assert sorted(calls) == ["0", "1"]
+
+
+def test_text_origins_match_old_formula():
+    anchors = {"x": np.array([100.0, 512.25]), "y": np.array([300.0, 77.5])}
+    values1 = ["0042", "ABCDEF"]
+    values2 = ["abc", ""]
+    font_size, spacing, number_spacing, x_stretch, y_stretch = 30, 4, 2, 1.1, 0.9
+    label1_width, label2_width = 120.0, 60.0
+
+    origins = label_layout.text_origins(
+        anchors, label1_width, label_layout.spaced_text_widths(values1, WIDTHS.__getitem__, number_spacing),
+        label2_width, label_layout.spaced_text_widths(values2, WIDTHS.__getitem__, number_spacing),
+        font_size, spacing, x_stretch, y_stretch)
+
+    for n, (x, y) in enumerate(zip(anchors["x"], anchors["y"])):
+        total1_width = (label1_width + old_value_width(values1[n], WIDTHS.__getitem__, number_spacing)) * x_stretch
+        total2_width = (label2_width + old_value_width(values2[n], WIDTHS.__getitem__, number_spacing)) * x_stretch
+        assert origins["text1_x"][n] == x - total1_width / 2
+        assert origins["text1_y"][n] == y - (font_size * y_stretch) - spacing
+        assert origins["text2_x"][n] == x - total2_width / 2
+        assert origins["text2_y"][n] == y + spacing
+
+
+def test_slice_layout():
+    layout = {"index": np.arange(10), "x": np.arange(10) * 2.0}
+    part = label_layout.slice_layout(layout, 3, 6)
+    assert part["index"].tolist() == [3, 4, 5]
+    assert part["x"].tolist() == [6.0, 8.0, 10.0]
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from label_generator_core import LabelGeneratorCore, page_digest, saved_page_digest
+
+
+def make_page(seed, size=(240, 320)):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(6):
+        x, y = (seed * 37 + i * 29) % size[0], (seed * 53 + i * 41) % size[1]
+        draw.ellipse((x, y, x + 12, y + 12), fill="black")
+        draw.text((x, y + 14), f"{seed}-{i}", fill="black")
+    return image
+
+
+def pixels(filename):
+    with Image.open(filename) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def test_saved_page_matches_old_export(tmp_path):
+    """原版本直接 image.save(filename, dpi=(300, 300))，像素必须一致"""
+    core = LabelGeneratorCore()
+    image = make_page(1)
+    old, new = str(tmp_path / "old.png"), str(tmp_path / "new.png")
+    image.save(old, dpi=(300, 300))
+    assert core.save_page(image, new, compress_level=1)
+
+    assert np.array_equal(pixels(old), pixels(new))
+    with Image.open(old) as expected, Image.open(new) as saved:
+        assert saved.info["dpi"] == expected.info["dpi"]
+    assert saved_page_digest(new) == page_digest(image)
+
+
+def test_skip_unchanged(tmp_path):
+    core = LabelGeneratorCore()
+    filename = str(tmp_path / "label_page_1.png")
+    image = make_page(2)
+
+    assert core.save_page(image, filename, skip_unchanged=True)
+    mtime = os.stat(filename).st_mtime_ns
+    assert not core.save_page(image, filename, skip_unchanged=True)
+    assert os.stat(filename).st_mtime_ns == mtime
+
+    # 默认总是写盘；内容变化时即使要求跳过也要写
+    assert core.save_page(image, filename)
+    assert core.save_page(make_page(3), filename, skip_unchanged=True)
+    assert np.array_equal(pixels(filename), np.asarray(make_page(3)))
+
+
+def test_file_without_digest_is_rewritten(tmp_path):
+    core = LabelGeneratorCore()
+    filename = str(tmp_path / "label_page_1.png")
+    image = make_page(4)
+    image.save(filename, dpi=(300, 300))
+
+    assert saved_page_digest(filename) is None
+    assert core.save_page(image, filename, skip_unchanged=True)
+
+
+def test_tiff_digest(tmp_path):
+    core = LabelGeneratorCore()
+    filename = str(tmp_path / "label_page_1.tif")
+    image = make_page(5).convert("1")
+
+    assert core.save_page(image, filename, image_format="tiff")
+    assert saved_page_digest(filename) == page_digest(image)
+    assert not core.save_page(image, filename, skip_unchanged=True, image_format="tiff")
+
+
+def test_export_all_pages_counts_skipped(tmp_path):
+    core = LabelGeneratorCore()
+    core.generated_images = [make_page(seed) for seed in range(3)]
+    progress = []
+
+    assert core.export_all_pages(str(tmp_path), progress_callback=lambda *p: progress.append(p)) == (True, 3)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert core.export_skipped == 0
+
+    core.generated_images[1] = make_page(9)
+    assert core.export_all_pages(str(tmp_path), workers=2, skip_unchanged=True) == (True, 3)
+    assert core.export_skipped == 2
+    for page, image in enumerate(core.generated_images, 1):
+        assert np.array_equal(pixels(tmp_path / f"label_page_{page}.png"), np.asarray(image))
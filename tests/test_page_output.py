@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, features
+
+import page_output
+
+
+def make_page():
+    image = Image.new("L", (160, 120), 255)
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 10), "0123456789", fill=0)
+    draw.ellipse((60, 60, 90, 90), fill=100)   # 灰色，二值化后为黑
+    draw.rectangle((100, 60, 140, 90), fill=200)  # 浅灰，二值化后为白
+    return image
+
+
+def test_render_mode():
+    assert page_output.render_mode("RGB") == "RGB"
+    assert page_output.render_mode("L") == "L"
+    assert page_output.render_mode("1") == "L"
+
+
+def test_finalize_keeps_rgb_pages():
+    image = make_page().convert("RGB")
+    assert page_output.finalize(image, "RGB") is image
+    assert page_output.finalize(image, "L").mode == "L"
+
+
+def test_finalize_thresholds_without_dither():
+    image = make_page()
+    mono = page_output.finalize(image, "1")
+    assert mono.mode == "1"
+    expected = np.asarray(image) >= page_output.MONO_THRESHOLD
+    assert np.array_equal(np.asarray(mono), expected)
+
+
+@pytest.mark.parametrize("filename, image_format", [
+    ("a.png", "png"), ("a.PNG", "png"), ("a.tif", "tiff"), ("a.tiff", "tiff"),
+    ("a.jpg", "jpeg"), ("a.jpeg", "jpeg"), ("a.bmp", None)])
+def test_format_from_filename(filename, image_format):
+    assert page_output.format_from_filename(filename) == image_format
+
+
+def test_extension():
+    assert page_output.extension("png") == ".png"
+    assert page_output.extension("tiff") == ".tif"
+
+
+def test_rgb_png_matches_plain_save(tmp_path):
+    """RGB模式与原来的 image.save(filename, dpi=(300, 300)) 像素一致"""
+    image = make_page().convert("RGB")
+    image.save(tmp_path / "old.png", dpi=(300, 300))
+    page_output.save_image(image, str(tmp_path / "new.png"), description="note")
+
+    with Image.open(tmp_path / "old.png") as old, Image.open(tmp_path / "new.png") as new:
+        assert new.mode == "RGB"
+        assert np.array_equal(np.asarray(old), np.asarray(new))
+    assert page_output.saved_description(str(tmp_path / "new.png")) == "note"
+
+
+def test_one_bit_png(tmp_path):
+    filename = str(tmp_path / "page.png")
+    page_output.save_image(make_page(), filename, "1")
+    with Image.open(filename) as saved:
+        assert saved.mode == "1"
+        assert np.array_equal(np.asarray(saved), np.asarray(page_output.finalize(make_page(), "1")))
+
+
+@pytest.mark.skipif(not features.check("libtiff"), reason="Pillow未带libtiff")
+def test_group4_tiff(tmp_path):
+    filename = str(tmp_path / "page.tif")
+    page_output.save_image(make_page(), filename, "1", "tiff", description="digest")
+    with Image.open(filename) as saved:
+        assert saved.info["compression"] == "group4"
+        assert np.array_equal(np.asarray(saved), np.asarray(page_output.finalize(make_page(), "1")))
+    assert page_output.saved_description(filename) == "digest"
+
+
+def test_jpeg_saves_mono_as_gray(tmp_path):
+    filename = str(tmp_path / "page.jpg")
+    page_output.save_image(make_page(), filename, "1", "jpeg")
+    with Image.open(filename) as saved:
+        assert saved.mode == "L"
+
+
+def test_saved_description_of_missing_file(tmp_path):
+    assert page_output.saved_description(str(tmp_path / "missing.png")) is None
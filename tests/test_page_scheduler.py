@@ -0,0 +1,113 @@
+import functools
+
+from PIL import Image, ImageDraw
+
+import sticker_core
+from page_scheduler import PageScheduler
+
+
+# render要能传给子进程，必须是模块级函数
+def render(data, size=(200, 120)):
+    if data == "bad":
+        raise ValueError("无法渲染")
+    image = Image.new("RGB", size, "white")
+    ImageDraw.Draw(image).text((10, 10), data, fill="black")
+    return image
+
+
+def make_pages(count):
+    return [(n, f"page {n}") for n in range(1, count + 1)]
+
+
+def run(pages, sink, workers=1, scheduler=None, commit=None):
+    events = {"progress": [], "error": []}
+    scheduler = scheduler or PageScheduler(None, workers,
+                                           on_progress=lambda *e: events["progress"].append(e),
+                                           on_error=lambda *e: events["error"].append(e))
+    result = scheduler.run(pages, render, sink.encoder(), commit or sink.commit)
+    return result, events
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_serial_matches_direct_writes(tmp_path):
+    """串行调度的输出与原来逐页render后sink.write的结果逐字节一致"""
+    (tmp_path / "old").mkdir()
+    (tmp_path / "new").mkdir()
+    pages = make_pages(4)
+    old = sticker_core.PageSink(str(tmp_path / "old"))
+    for page_num, data in pages:
+        old.write(page_num, render(data))
+
+    with sticker_core.PageSink(str(tmp_path / "new")) as sink:
+        result, events = run(pages, sink)
+
+    assert result == (4, [], False)
+    assert events["progress"] == [(4, 4, 4)]   # 同一批中的进度只回调最后一次
+    assert events["error"] == []
+    for page_num, _ in pages:
+        assert read(tmp_path / "new" / f"page_{page_num}.png") == read(tmp_path / "old" / f"page_{page_num}.png")
+
+
+def test_serial_pdf_matches_direct_writes(tmp_path):
+    (tmp_path / "old").mkdir()
+    (tmp_path / "new").mkdir()
+    pages = make_pages(3)
+    with sticker_core.PageSink(str(tmp_path / "old"), "1", "pdf") as old:
+        for page_num, data in pages:
+            old.write(page_num, render(data))
+    with sticker_core.PageSink(str(tmp_path / "new"), "1", "pdf") as sink:
+        run(pages, sink)
+
+    assert read(sink.path) == read(old.path)
+
+
+def test_failed_page_does_not_stop_others(tmp_path):
+    pages = [(1, "page 1"), (2, "bad"), (3, "page 3")]
+    with sticker_core.PageSink(str(tmp_path)) as sink:
+        (completed, failed, cancelled), events = run(pages, sink)
+
+    assert (completed, cancelled) == (2, False)
+    assert [page_num for page_num, _ in failed] == [2]
+    assert "ValueError" in failed[0][1]
+    assert [page_num for page_num, _ in events["error"]] == [2]
+    assert (tmp_path / "page_1.png").exists() and (tmp_path / "page_3.png").exists()
+    assert not (tmp_path / "page_2.png").exists()
+
+
+def test_cancel_stops_after_current_page(tmp_path):
+    scheduler = PageScheduler(None, 1)
+    with sticker_core.PageSink(str(tmp_path)) as sink:
+        def commit(page_num, encoded):
+            sink.commit(page_num, encoded)
+            scheduler.cancel()
+
+        result, _ = run(make_pages(5), sink, scheduler=scheduler, commit=commit)
+
+    assert result == (1, [], True)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["page_1.png"]
+
+
+def test_process_pool_keeps_page_order(tmp_path):
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "pool").mkdir()
+    pages = make_pages(6)
+    with sticker_core.PageSink(str(tmp_path / "serial"), "L", "pdf") as serial:
+        run(pages, serial)
+    with sticker_core.PageSink(str(tmp_path / "pool"), "L", "pdf") as pool:
+        result, _ = run(pages, pool, workers=2)
+
+    assert result == (6, [], False)
+    assert read(pool.path) == read(serial.path)
+
+
+def test_render_partial_is_accepted(tmp_path):
+    with sticker_core.PageSink(str(tmp_path)) as sink:
+        result = PageScheduler(None, 1).run(make_pages(2), functools.partial(render, size=(50, 40)),
+                                            sink.encoder(), sink.commit)
+    assert result == (2, [], False)
+    with Image.open(tmp_path / "page_2.png") as page:
+        assert page.size == (50, 40)
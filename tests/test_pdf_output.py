@@ -0,0 +1,132 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import pdf_output
+from label_generator_core import LabelGeneratorCore, PDF_FILENAME
+
+
+def make_page(seed, mode="RGB", size=(120, 90)):
+    image = Image.new("L", size, 255)
+    ImageDraw.Draw(image).text((5 + seed, 5 + seed), f"page {seed}", fill=0)
+    return image.convert(mode)
+
+
+def read_objects(filename):
+    """按交叉引用表读出所有对象：{编号: (字典部分, 流数据或None)}，并检查文件结构"""
+    with open(filename, "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF-1.4\n")
+    assert data.endswith(b"%%EOF\n")
+
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    header = re.match(rb"xref\n0 (\d+)\n", data[startxref:])
+    count = int(header.group(1))
+    entries = data[startxref + header.end():].split(b"\n")[:count]
+
+    objects = {}
+    for number, entry in enumerate(entries[1:], 1):
+        offset = int(entry[:10])
+        assert data[offset:].startswith(b"%d 0 obj\n" % number)
+        body = data[offset + len(b"%d 0 obj\n" % number):]
+        # 字典序列化后只占一行，后面是流或对象结尾
+        dictionary, rest = body.split(b"\n", 1)
+        if rest.startswith(b"stream\n"):
+            length = int(re.search(rb"/Length (\d+)", dictionary).group(1))
+            stream = rest[len(b"stream\n"):len(b"stream\n") + length]
+            assert rest[len(b"stream\n") + length:].startswith(b"\nendstream\nendobj\n")
+            objects[number] = (dictionary, stream)
+        else:
+            assert rest.startswith(b"endobj\n")
+            objects[number] = (dictionary, None)
+    return objects
+
+
+def page_images(filename):
+    """按页面树顺序取出每页的图像对象"""
+    objects = read_objects(filename)
+    tree = next(dictionary for dictionary, _ in objects.values() if b"/Type /Pages" in dictionary)
+    pages = [int(n) for n in re.findall(rb"(\d+) 0 R", re.search(rb"/Kids \[(.*?)\]", tree).group(1))]
+    images = []
+    for page in pages:
+        xobject = int(re.search(rb"/Page (\d+) 0 R", objects[page][0]).group(1))
+        images.append(objects[xobject])
+    return images
+
+
+def decode(dictionary, stream):
+    width = int(re.search(rb"/Width (\d+)", dictionary).group(1))
+    height = int(re.search(rb"/Height (\d+)", dictionary).group(1))
+    assert b"/Filter /FlateDecode" in dictionary
+    mode = "RGB" if b"/DeviceRGB" in dictionary else "L"
+    return Image.frombytes(mode, (width, height), zlib.decompress(stream))
+
+
+def test_pages_in_index_order(tmp_path):
+    filename = str(tmp_path / "out.pdf")
+    pages = [make_page(i) for i in range(4)]
+    with pdf_output.PdfWriter(filename, title="标签") as writer:
+        for index in (2, 0, 3, 1):
+            writer.add_image_page(pages[index], index=index)
+        assert writer.page_count == 4
+    assert writer.closed
+
+    images = page_images(filename)
+    assert len(images) == 4
+    for page, (dictionary, stream) in zip(pages, images):
+        assert np.array_equal(np.asarray(decode(dictionary, stream)), np.asarray(page))
+
+
+def test_page_size_in_points(tmp_path):
+    filename = str(tmp_path / "out.pdf")
+    with pdf_output.PdfWriter(filename) as writer:
+        writer.add_image_page(make_page(0, size=(2480, 30)))
+    with open(filename, "rb") as f:
+        assert b"/MediaBox [0 0 595.2 7.2]" in f.read()
+
+
+def test_encode_gray_and_rgb():
+    gray = pdf_output.encode_image(make_page(1, "L"))
+    assert (gray.color_space, gray.bits, gray.filter) == ("DeviceGray", 8, "FlateDecode")
+    assert zlib.decompress(gray.data) == make_page(1, "L").tobytes()
+
+    rgb = pdf_output.encode_image(make_page(1, "RGBA"))
+    assert rgb.color_space == "DeviceRGB"
+    assert zlib.decompress(rgb.data) == make_page(1).tobytes()
+
+
+def test_encode_one_bit():
+    image = make_page(2, "1")
+    encoded = pdf_output.encode_image(image)
+    assert (encoded.width, encoded.height, encoded.bits) == (image.width, image.height, 1)
+    assert encoded.filter in ("CCITTFaxDecode", "FlateDecode")
+    if encoded.filter == "FlateDecode":
+        assert zlib.decompress(encoded.data) == image.tobytes()
+
+
+def test_unsupported_object():
+    with pytest.raises(TypeError):
+        pdf_output._serialize(object())
+
+
+def test_export_all_pages_to_pdf(tmp_path):
+    core = LabelGeneratorCore()
+    core.generated_images = [make_page(i) for i in range(3)]
+    progress = []
+
+    assert core.export_all_pages(str(tmp_path), image_format="pdf", workers=2,
+                                 progress_callback=lambda *p: progress.append(p)) == (True, 3)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    images = page_images(str(tmp_path / PDF_FILENAME))
+    for page, (dictionary, stream) in zip(core.generated_images, images):
+        assert np.array_equal(np.asarray(decode(dictionary, stream)), np.asarray(page))
+
+
+def test_export_to_missing_directory(tmp_path):
+    core = LabelGeneratorCore()
+    core.generated_images = [make_page(0)]
+    assert core.export_all_pages(str(tmp_path / "missing"), image_format="pdf") == (False, 0)
+    assert core.last_error
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from spatial_index import SpatialIndex
+
+
+def label_rect(label):
+    half_w = label['width'] / 2
+    half_h = label['height'] / 2
+    return (label['x'] - half_w, label['y'] - half_h, label['x'] + half_w, label['y'] + half_h)
+
+
+def old_click(labels, x, y):
+    """原barcode_designer.on_canvas_click：按顺序取第一个包含点击位置的标签"""
+    for i, label in enumerate(labels):
+        x1, y1, x2, y2 = label_rect(label)
+        if x1 <= x <= x2 and y1 <= y <= y2:
+            return i
+    return None
+
+
+def old_nearest(centers, x, y, max_distance):
+    """原barcode_label_designer.on_canvas_click：距离严格小于阈值的最近点，相同时取第一个"""
+    selected = None
+    min_distance = float('inf')
+    for i, (center_x, center_y) in enumerate(centers):
+        distance = ((center_x - x) ** 2 + (center_y - y) ** 2) ** 0.5
+        if distance < min_distance and distance < max_distance:
+            min_distance = distance
+            selected = i
+    return selected
+
+
+def brute_rect(rects, x0, y0, x1, y1):
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    return [i for i, r in enumerate(rects) if r[0] <= x1 and x0 <= r[2] and r[1] <= y1 and y0 <= r[3]]
+
+
+def random_labels(rng, count):
+    return [{'x': rng.uniform(-20, 210), 'y': rng.uniform(-20, 297),
+             'width': rng.choice((0, 10, 25.5, 40)), 'height': rng.choice((0, 8, 15, 30))}
+            for _ in range(count)]
+
+
+def click_points(rng, labels, count):
+    points = [(rng.uniform(-30, 220), rng.uniform(-30, 310)) for _ in range(count)]
+    # 边界和角点（含边界）
+    for label in labels[:50]:
+        x1, y1, x2, y2 = label_rect(label)
+        points += [(x1, y1), (x2, y2), (x1, label['y']), (label['x'], y2)]
+    return points
+
+
+@pytest.mark.parametrize("cell_size", [5, 37.5, 400])
+def test_click_matches_linear_scan(cell_size):
+    rng = random.Random(cell_size)
+    labels = random_labels(rng, 300)
+    index = SpatialIndex(cell_size, ((i, label_rect(label)) for i, label in enumerate(labels)))
+    assert len(index) == 300
+
+    for x, y in click_points(rng, labels, 2000):
+        hits = index.query_point(x, y)
+        assert (hits[0] if hits else None) == old_click(labels, x, y), (x, y)
+
+
+def test_click_after_updates():
+    rng = random.Random(1)
+    labels = random_labels(rng, 120)
+    index = SpatialIndex(20, ((i, label_rect(label)) for i, label in enumerate(labels)))
+
+    for i in rng.sample(range(len(labels)), 40):
+        labels[i] = dict(labels[i], x=labels[i]['x'] + rng.uniform(-50, 50), width=rng.choice((5, 60)))
+        index.update(i, label_rect(labels[i]))
+    moved = rng.sample(range(len(labels)), 30)
+    index.move(moved, 12.5, -7)
+    for i in moved:
+        labels[i] = dict(labels[i], x=labels[i]['x'] + 12.5, y=labels[i]['y'] - 7)
+    for i in moved:
+        assert index.rect(i) == pytest.approx(label_rect(labels[i]))
+
+    for x, y in click_points(rng, labels, 1500):
+        hits = index.query_point(x, y)
+        assert (hits[0] if hits else None) == old_click(labels, x, y)
+
+
+def test_remove_and_clear():
+    index = SpatialIndex(10, [(0, (0, 0, 50, 50)), (1, (20, 20, 30, 30))])
+    assert index.query_point(25, 25) == [0, 1]
+    index.remove(0)
+    index.remove(0)
+    assert index.query_point(25, 25) == [1]
+    assert index.query_point(5, 5) == []
+    index.clear()
+    assert len(index) == 0 and index.query_rect(-100, -100, 100, 100) == []
+
+
+@pytest.mark.parametrize("max_distance", [3, 20, 75])
+def test_nearest_matches_linear_scan(max_distance):
+    rng = random.Random(max_distance)
+    centers = [(rng.uniform(0, 1000), rng.uniform(0, 800)) for _ in range(500)]
+    centers += centers[:20]                                   # 重合的点：取序号最小的
+    centers += [(x + max_distance, y) for x, y in centers[:10]]  # 恰好在阈值上：不选中
+    index = SpatialIndex(max_distance * 2)
+    for i, (x, y) in enumerate(centers):
+        index.insert_point(i, x, y)
+
+    points = [(rng.uniform(-50, 1050), rng.uniform(-50, 850)) for _ in range(2000)] + centers[:40]
+    for x, y in points:
+        assert index.nearest(x, y, max_distance) == old_nearest(centers, x, y, max_distance), (x, y)
+
+
+def test_query_rect_matches_brute_force():
+    rng = random.Random(5)
+    rects = [label_rect(label) for label in random_labels(rng, 200)]
+    index = SpatialIndex(15, enumerate(rects))
+
+    boxes = [(rng.uniform(-40, 230), rng.uniform(-40, 320), rng.uniform(-40, 230), rng.uniform(-40, 320))
+             for _ in range(300)]
+    boxes.append((-1e4, -1e4, 1e4, 1e4))   # 比已占用的格子还大，走遍历格子的分支
+    for box in boxes:
+        assert index.query_rect(*box) == brute_rect(rects, *box)
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+from PIL import ImageFont
+
+import sticker_core
+
+
+def old_fit_size(text, box_width, box_height, font_path, min_size=5, max_size=30):
+    """原sticker_generator.fit_text_to_box：从大到小逐个字号尝试"""
+    for size in range(max_size, min_size - 1, -1):
+        bbox = ImageFont.truetype(font_path, size).getbbox(text)
+        if bbox[2] - bbox[0] <= box_width and bbox[3] - bbox[1] <= box_height:
+            return size
+    return None
+
+
+@pytest.fixture
+def fresh_memo():
+    sticker_core._fit_hints.clear()
+    sticker_core._width_tables.clear()
+    yield
+    sticker_core._fit_hints.clear()
+    sticker_core._width_tables.clear()
+
+
+def cases(seed=7, count=300):
+    rng = random.Random(seed)
+    alphabet = "0123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnpqrstuvwxyz-_:"
+    for _ in range(count):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 18)))
+        yield text, rng.randint(4, 400), rng.randint(4, 60)
+
+
+def test_matches_linear_search(font_path, fresh_memo):
+    all_cases = list(cases())
+    # 冷启动（按字宽表估计起点）和预热后（按记忆起点）都要与逐个尝试一致
+    for _ in range(2):
+        for text, box_width, box_height in all_cases:
+            assert sticker_core.fit_font_size(text, box_width, box_height, font_path) == \
+                old_fit_size(text, box_width, box_height, font_path), (text, box_width, box_height)
+
+
+def test_same_length_texts_reuse_hint(font_path, fresh_memo):
+    texts = [f"{n:012d}" for n in range(0, 10 ** 12, 10 ** 11 + 12345)]
+    for text in texts:
+        assert sticker_core.fit_font_size(text, 330, 40, font_path) == old_fit_size(text, 330, 40, font_path)
+    assert len(sticker_core._fit_hints) == 1
+
+
+def test_custom_range(font_path, fresh_memo):
+    for text, box_width, box_height in cases(seed=3, count=60):
+        assert sticker_core.fit_font_size(text, box_width, box_height, font_path, 8, 12) == \
+            old_fit_size(text, box_width, box_height, font_path, 8, 12)
+
+
+def test_memo_is_bounded(font_path, fresh_memo, monkeypatch):
+    monkeypatch.setattr(sticker_core, "MAX_FIT_HINTS", 8)
+    for box_width in range(50, 80):
+        sticker_core.fit_font_size("A1B2C3", box_width, 30, font_path)
+    assert len(sticker_core._fit_hints) == 8
+    assert list(sticker_core._fit_hints)[-1][2] == 79
+
+
+def test_fit_text_to_box_font_size(font_path, fresh_memo):
+    font, image = sticker_core.fit_text_to_box("DEV-000123", 300, 40, font_path)
+    assert image is None
+    assert font.size == old_fit_size("DEV-000123", 300, 40, font_path)
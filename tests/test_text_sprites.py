@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+import text_sprites
+from image_transform import skew_image
+
+
+def old_sprite(text, font, color, scale=(1.0, 1.0), skew=(0, 0), rotation=0):
+    """原barcode_designer._draw_label_text中粘贴前的文字图块"""
+    canvas = ImageDraw.Draw(Image.new("RGB", (10, 10), "white"))
+    text_bbox = canvas.textbbox((0, 0), text, font=font)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    temp_img = Image.new('RGBA', (text_width + 10, text_height + 10), (255, 255, 255, 0))
+    ImageDraw.Draw(temp_img).text((5, 5), text, font=font, fill=color + (255,))
+    if scale != (1.0, 1.0):
+        temp_img = temp_img.resize((int(temp_img.width * scale[0]), int(temp_img.height * scale[1])),
+                                   Image.Resampling.LANCZOS)
+    if skew != (0, 0):
+        temp_img = skew_image(temp_img, *skew)
+    if rotation != 0:
+        temp_img = temp_img.rotate(rotation, expand=True)
+    return temp_img
+
+
+def same(a, b):
+    return a.size == b.size and np.array_equal(np.asarray(a), np.asarray(b))
+
+
+@pytest.mark.parametrize("text, scale, skew, rotation", [
+    ("DEV-0042", (1.0, 1.0), (0, 0), 0),
+    ("设备码：0042\n密钥：ABCD", (1.0, 1.0), (0, 0), 0),
+    ("DEV-0042", (1.5, 0.8), (0, 0), 0),
+    ("DEV-0042", (1.0, 1.0), (0, 0), 30),
+    ("DEV-0042", (1.2, 1.0), (10, 5), 90),
+])
+def test_matches_old_pipeline(font_path, text, scale, skew, rotation):
+    font = ImageFont.truetype(font_path, 24)
+    color = (10, 20, 200)
+    assert same(text_sprites.render_text_sprite(text, font, color, scale, skew, rotation),
+                old_sprite(text, font, color, scale, skew, rotation))
+
+
+def test_cache_loads_font_by_path(font_path):
+    cache = text_sprites.TextSpriteCache()
+    sprite = cache.get("A-17", font_path, 20, [0, 0, 0], scale=[1.1, 1.0], rotation=15)
+    assert same(sprite, old_sprite("A-17", ImageFont.truetype(font_path, 20), (0, 0, 0), (1.1, 1.0), rotation=15))
+
+
+def test_unknown_font_falls_back_to_default():
+    cache = text_sprites.TextSpriteCache()
+    sprite = cache.get("A-17", "no-such-font", 20, (0, 0, 0))
+    assert same(sprite, old_sprite("A-17", ImageFont.load_default(), (0, 0, 0)))
+
+
+def test_hits_return_the_same_sprite():
+    cache = text_sprites.TextSpriteCache()
+    first = cache.get("A-17", "no-such-font", 20, (0, 0, 0))
+    assert cache.get("A-17", "no-such-font", 20, [0, 0, 0]) is first
+    assert cache.get("A-18", "no-such-font", 20, (0, 0, 0)) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_evicts_least_recently_used():
+    cache = text_sprites.TextSpriteCache()
+    first = cache.get("A-1", "no-such-font", 20, (0, 0, 0))
+    cache.max_bytes = first.width * first.height * 4 * 2
+    cache.get("A-2", "no-such-font", 20, (0, 0, 0))
+    cache.get("A-1", "no-such-font", 20, (0, 0, 0))   # A-1变为最近使用
+    cache.get("A-3", "no-such-font", 20, (0, 0, 0))   # 淘汰A-2
+
+    assert cache.get("A-1", "no-such-font", 20, (0, 0, 0)) is first
+    assert cache.size <= cache.max_bytes
+    misses = cache.misses
+    cache.get("A-2", "no-such-font", 20, (0, 0, 0))
+    assert cache.misses == misses + 1
+
+    cache.clear()
+    assert cache.size == 0
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+
+import font_registry
+import image_transform
+import render_profile
+
+
+# ----------------------------------------------------------------------
+# 变换后文字图块缓存（渲染一次，到处粘贴）
+#
+# 条码设计器里每个标签的文字都要经过：加载字体、测量、画到临时RGBA图像、
+# 缩放、倾斜、旋转。很多标签的文字相同，所有标签的变换参数也相同，
+# 这里按 (文字, 字体, 字号, 颜色, 缩放, 倾斜, 旋转) 缓存变换后的图块，
+# 按占用内存做LRU淘汰。图块只读，粘贴时作为源图像和蒙版使用。
+# ----------------------------------------------------------------------
+
+MAX_BYTES = 64 * 1024 * 1024
+PADDING = 5
+
+
+def render_text_sprite(text, font, color, scale=(1.0, 1.0), skew=(0, 0), rotation=0):
+    """把文字画到透明背景上并依次缩放、倾斜、旋转，返回RGBA图像"""
+    # 用ImageDraw测量（支持多行文字），与绘制时的排版一致
+    left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font)
+    img = Image.new('RGBA', (right - left + PADDING * 2, bottom - top + PADDING * 2), (255, 255, 255, 0))
+    ImageDraw.Draw(img).text((PADDING, PADDING), text, font=font, fill=tuple(color) + (255,))
+
+    with render_profile.phase("transform"):
+        if scale != (1.0, 1.0):
+            img = img.resize((int(img.width * scale[0]), int(img.height * scale[1])), Image.Resampling.LANCZOS)
+        if skew != (0, 0):
+            img = image_transform.skew_image(img, skew[0], skew[1])
+        if rotation != 0:
+            img = img.rotate(rotation, expand=True)
+    return img
+
+
+class TextSpriteCache:
+    """按内存上限做LRU淘汰的文字图块缓存（线程安全）"""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text, font_name, font_size, color, scale=(1.0, 1.0), skew=(0, 0), rotation=0):
+        """返回变换后的文字图块，字体按 font_name.ttf / font_name 查找，找不到时用默认字体"""
+        key = (text, font_name, font_size, tuple(color), tuple(scale), tuple(skew), rotation)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                render_profile.count("sprite_hits")
+                return sprite
+
+        font = font_registry.load_font([f"{font_name}.ttf", font_name], font_size)
+        sprite = render_text_sprite(text, font, color, tuple(scale), tuple(skew), rotation)
+        nbytes = sprite.width * sprite.height * 4
+
+        with self._lock:
+            self.misses += 1
+            if key not in self._sprites and nbytes <= self.max_bytes:
+                self._sprites[key] = sprite
+                self.size += nbytes
+                while self.size > self.max_bytes:
+                    _, old = self._sprites.popitem(last=False)
+                    self.size -= old.width * old.height * 4
+        return sprite
+
+    def clear(self):
+        with self._lock:
+            self._sprites.clear()
+            self.size = 0
@@ -0,0 +1,487 @@
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from xml.sax.saxutils import escape, quoteattr
+
+import pdf_output
+from pdf_output import Name, format_number
+
+
+# ----------------------------------------------------------------------
+# 矢量页面输出（PDF / SVG）
+#
+# 版面与栅格渲染共用同一套布局（像素坐标，左上角原点），文字以定位好的
+# 字形串输出，不经过栅格化：PDF内嵌字体子集（TrueType轮廓），SVG引用字体名。
+# 字符间距和x/y拉伸作为文字变换矩阵，打印质量与dpi无关。
+# ----------------------------------------------------------------------
+
+VECTOR_FORMATS = ("pdf-vector", "svg")
+
+
+def is_vector_format(image_format):
+    return image_format in VECTOR_FORMATS
+
+
+class TrueTypeFont:
+    """读取TrueType字体中矢量输出需要的表：字符映射、字宽、度量，并可生成字形子集
+
+    只支持TrueType轮廓（glyf）字体，.ttc取index指定的字体；CFF轮廓的OpenType字体不支持。
+    """
+
+    def __init__(self, path, index=0):
+        with open(path, "rb") as f:
+            self.data = data = f.read()
+        self.path = path
+
+        offset = 0
+        if data[:4] == b"ttcf":
+            offset = struct.unpack_from(">I", data, 12 + 4 * index)[0]
+        num_tables = struct.unpack_from(">H", data, offset + 4)[0]
+        self.tables = {}
+        for i in range(num_tables):
+            tag, _, table_offset, length = struct.unpack_from(">4sIII", data, offset + 12 + 16 * i)
+            self.tables[tag.decode("latin-1")] = (table_offset, length)
+        if "glyf" not in self.tables:
+            raise ValueError(f"矢量输出只支持TrueType轮廓字体：{os.path.basename(path)}")
+
+        head = self.table("head")
+        self.units_per_em = struct.unpack_from(">H", head, 18)[0]
+        self.bbox = struct.unpack_from(">hhhh", head, 36)
+        long_loca = struct.unpack_from(">h", head, 50)[0] == 1
+
+        hhea = self.table("hhea")
+        self.ascent, self.descent = struct.unpack_from(">hh", hhea, 4)
+        num_metrics = struct.unpack_from(">H", hhea, 34)[0]
+        self.num_glyphs = struct.unpack_from(">H", self.table("maxp"), 4)[0]
+
+        advances = struct.unpack_from(f">{num_metrics * 2}H", self.table("hmtx"))[0::2]
+        self.advances = advances + (advances[-1],) * (self.num_glyphs - num_metrics)
+
+        loca = self.table("loca")
+        if long_loca:
+            self.loca = struct.unpack_from(f">{self.num_glyphs + 1}I", loca)
+        else:
+            self.loca = tuple(2 * v for v in struct.unpack_from(f">{self.num_glyphs + 1}H", loca))
+
+        self.cmap = self._read_cmap()
+        self.postscript_name = self._read_postscript_name()
+
+    def table(self, tag):
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def glyph_id(self, char):
+        """字符对应的字形编号，字体中没有的字符为0（.notdef）"""
+        return self.cmap.get(ord(char), 0)
+
+    def advance(self, gid):
+        """字形宽度，单位为1/1000 em（PDF字体宽度单位）"""
+        return self.advances[gid] * 1000.0 / self.units_per_em
+
+    def _read_cmap(self):
+        cmap = self.table("cmap")
+        count = struct.unpack_from(">H", cmap, 2)[0]
+        subtables = {}
+        for i in range(count):
+            platform, encoding, offset = struct.unpack_from(">HHI", cmap, 4 + 8 * i)
+            subtables[(platform, encoding)] = offset
+
+        # 优先使用完整Unicode（格式12），其次BMP（格式4）
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3), (0, 1), (0, 0)):
+            offset = subtables.get(key)
+            if offset is None:
+                continue
+            fmt = struct.unpack_from(">H", cmap, offset)[0]
+            if fmt == 12:
+                return self._read_cmap12(cmap, offset)
+            if fmt == 4:
+                return self._read_cmap4(cmap, offset)
+        return {}
+
+    @staticmethod
+    def _read_cmap12(cmap, offset):
+        mapping = {}
+        groups = struct.unpack_from(">I", cmap, offset + 12)[0]
+        for i in range(groups):
+            start, end, gid = struct.unpack_from(">III", cmap, offset + 16 + 12 * i)
+            for code in range(start, end + 1):
+                mapping[code] = gid + code - start
+        return mapping
+
+    @staticmethod
+    def _read_cmap4(cmap, offset):
+        mapping = {}
+        segments = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+        ends = struct.unpack_from(f">{segments}H", cmap, offset + 14)
+        starts = struct.unpack_from(f">{segments}H", cmap, offset + 16 + 2 * segments)
+        deltas = struct.unpack_from(f">{segments}h", cmap, offset + 16 + 4 * segments)
+        range_base = offset + 16 + 6 * segments
+        range_offsets = struct.unpack_from(f">{segments}H", cmap, range_base)
+        for i in range(segments):
+            for code in range(starts[i], ends[i] + 1):
+                if code == 0xFFFF:
+                    break
+                if range_offsets[i] == 0:
+                    gid = (code + deltas[i]) & 0xFFFF
+                else:
+                    position = range_base + 2 * i + range_offsets[i] + 2 * (code - starts[i])
+                    gid = struct.unpack_from(">H", cmap, position)[0]
+                    if gid:
+                        gid = (gid + deltas[i]) & 0xFFFF
+                if gid:
+                    mapping[code] = gid
+        return mapping
+
+    def _read_postscript_name(self):
+        fallback = "".join(c for c in os.path.splitext(os.path.basename(self.path))[0] if c.isalnum()) or "Font"
+        if "name" not in self.tables:
+            return fallback
+        name = self.table("name")
+        count, strings = struct.unpack_from(">HH", name, 2)
+        for i in range(count):
+            platform, encoding, _, name_id, length, offset = struct.unpack_from(">6H", name, 6 + 12 * i)
+            if name_id != 6:
+                continue
+            raw = name[strings + offset:strings + offset + length]
+            text = raw.decode("utf-16-be", "ignore") if platform in (0, 3) else raw.decode("latin-1")
+            text = "".join(c for c in text if c.isascii() and c.isalnum() or c in "-_")
+            if text:
+                return text
+        return fallback
+
+    def _glyph(self, gid):
+        start, end = self.loca[gid], self.loca[gid + 1]
+        offset = self.tables["glyf"][0]
+        return self.data[offset + start:offset + end]
+
+    def _components(self, glyph):
+        """复合字形引用的字形编号"""
+        if len(glyph) < 10 or struct.unpack_from(">h", glyph, 0)[0] >= 0:
+            return []
+        components = []
+        position = 10
+        while True:
+            flags, gid = struct.unpack_from(">HH", glyph, position)
+            components.append(gid)
+            position += 4 + (4 if flags & 0x0001 else 2)
+            if flags & 0x0008:
+                position += 2
+            elif flags & 0x0040:
+                position += 4
+            elif flags & 0x0080:
+                position += 8
+            if not flags & 0x0020:
+                return components
+
+    def subset(self, gids):
+        """只保留gids（及其复合字形部件）的轮廓，字形编号不变，其余字形置空
+
+        配合Identity CIDToGIDMap使用；保留PDF嵌入TrueType所需的表。
+        """
+        keep = set(gids) | {0}
+        pending = list(keep)
+        while pending:
+            for gid in self._components(self._glyph(pending.pop())):
+                if gid not in keep and gid < self.num_glyphs:
+                    keep.add(gid)
+                    pending.append(gid)
+
+        glyf = bytearray()
+        loca = []
+        for gid in range(self.num_glyphs):
+            loca.append(len(glyf))
+            if gid in keep:
+                glyf += self._glyph(gid)
+                glyf += b"\0" * (-len(glyf) % 4)
+        loca.append(len(glyf))
+
+        head = bytearray(self.table("head"))
+        head[8:12] = b"\0\0\0\0"
+        struct.pack_into(">h", head, 50, 1)
+
+        tables = {"head": bytes(head), "glyf": bytes(glyf), "loca": struct.pack(f">{len(loca)}I", *loca)}
+        for tag in ("hhea", "maxp", "hmtx", "cvt ", "fpgm", "prep"):
+            if tag in self.tables:
+                tables[tag] = self.table(tag)
+        font, offsets = _build_sfnt(tables)
+
+        # 整个字体的校验和调整值
+        adjustment = (0xB1B0AFBA - _checksum(font)) & 0xFFFFFFFF
+        head_offset = offsets["head"]
+        return font[:head_offset + 8] + struct.pack(">I", adjustment) + font[head_offset + 12:]
+
+
+def _checksum(data):
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def _build_sfnt(tables):
+    """按表拼出字体文件，返回(字体数据, 各表偏移)"""
+    tags = sorted(tables)
+    count = len(tags)
+    entry_selector = count.bit_length() - 1
+    search_range = 16 << entry_selector
+    header = struct.pack(">IHHHH", 0x00010000, count, search_range, entry_selector, count * 16 - search_range)
+
+    directory = b""
+    body = b""
+    offsets = {}
+    for tag in tags:
+        data = tables[tag]
+        offsets[tag] = 12 + 16 * count + len(body)
+        directory += struct.pack(">4sIII", tag.encode("latin-1"), _checksum(data), offsets[tag], len(data))
+        body += data + b"\0" * (-len(data) % 4)
+    return header + directory + body, offsets
+
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def load_font(path, index=0):
+    """按路径缓存已解析的字体"""
+    with _fonts_lock:
+        font = _fonts.get((path, index))
+        if font is None:
+            font = _fonts[(path, index)] = TrueTypeFont(path, index)
+        return font
+
+
+class VectorPage:
+    """一页矢量内容，坐标为像素（与栅格页面相同，左上角原点），输出时按dpi换算"""
+
+    def __init__(self, width, height, dpi=pdf_output.PDF_DPI):
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.texts = []
+        self.dots = []
+        self.rects = []
+
+    def add_text(self, x, y, text, font, offsets, x_stretch=1.0, y_stretch=1.0):
+        """添加一串定位好的字形
+
+        x, y: 文字左上角（与draw.text默认锚点相同，y为上升线）；font: PIL的FreeTypeFont；
+        offsets: 每个字符相对行首的横向位置（未拉伸的像素，已含字符间距）；
+        x_stretch/y_stretch: 以左上角为原点的横向/纵向拉伸
+        """
+        baseline = y + font.getmetrics()[0] * y_stretch
+        self.texts.append((font.path, font.index, font.getname()[0], font.size,
+                           x, baseline, text, list(offsets), x_stretch, y_stretch))
+
+    def add_dot(self, x, y, radius):
+        self.dots.append((x, y, radius))
+
+    def add_rect(self, x0, y0, x1, y1, width=1):
+        """描边矩形（不填充）"""
+        self.rects.append((x0, y0, x1, y1, width))
+
+
+def spaced_offsets(text, advance, spacing=0, start=0.0):
+    """逐字符绘制（字宽 + 字符间距）时每个字符的横向位置"""
+    offsets = []
+    x = start
+    for char in text:
+        offsets.append(x)
+        x += advance(char) + spacing
+    return offsets
+
+
+# ----------------------------------------------------------------------
+# SVG
+# ----------------------------------------------------------------------
+def _svg_number(value):
+    return format_number(value).decode("ascii")
+
+
+def svg_document(page):
+    """整页SVG：viewBox为像素坐标，物理尺寸按dpi换算为毫米"""
+    mm = 25.4 / page.dpi
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_svg_number(page.width * mm)}mm" '
+        f'height="{_svg_number(page.height * mm)}mm" viewBox="0 0 {page.width} {page.height}">',
+        f'<rect width="{page.width}" height="{page.height}" fill="white"/>',
+    ]
+    for x0, y0, x1, y1, width in page.rects:
+        lines.append(f'<rect x="{_svg_number(x0)}" y="{_svg_number(y0)}" width="{_svg_number(x1 - x0)}" '
+                     f'height="{_svg_number(y1 - y0)}" fill="none" stroke="black" stroke-width="{width}"/>')
+    for x, y, radius in page.dots:
+        lines.append(f'<circle cx="{_svg_number(x)}" cy="{_svg_number(y)}" r="{_svg_number(radius)}"/>')
+    for _, _, family, size, x, baseline, text, offsets, x_stretch, y_stretch in page.texts:
+        xs = " ".join(_svg_number(offset) for offset in offsets)
+        lines.append(
+            f'<text transform="matrix({_svg_number(x_stretch)} 0 0 {_svg_number(y_stretch)} '
+            f'{_svg_number(x)} {_svg_number(baseline)})" x="{xs}" y="0" font-size="{size}" '
+            f'font-family={quoteattr(family)} xml:space="preserve">{escape(text)}</text>')
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def save_svg(page, filename):
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(svg_document(page))
+
+
+# ----------------------------------------------------------------------
+# PDF
+# ----------------------------------------------------------------------
+class VectorPdfWriter:
+    """矢量页面写入多页PDF（逐页写出，线程安全）
+
+    字体在关闭时按整份文件用到的字形生成子集并嵌入（CIDFontType2 + Identity-H），
+    附ToUnicode映射，PDF中的文字可以搜索和复制。
+    """
+
+    def __init__(self, filename, title=None):
+        self.writer = pdf_output.PdfWriter(filename, title)
+        self._fonts = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    def _font(self, path, index):
+        with self._lock:
+            entry = self._fonts.get((path, index))
+            if entry is None:
+                entry = {
+                    "font": load_font(path, index),
+                    "name": f"F{len(self._fonts) + 1}",
+                    "ref": self.writer.reserve_object(),
+                    "used": {},
+                }
+                self._fonts[(path, index)] = entry
+            return entry
+
+    def add_page(self, page, index=None):
+        scale = pdf_output.POINTS_PER_INCH / page.dpi
+        height = page.height * scale
+        ops = []
+
+        if page.rects:
+            for x0, y0, x1, y1, width in page.rects:
+                ops.append(b"%s w %s %s %s %s re S" % (
+                    format_number(width * scale), format_number(x0 * scale), format_number(height - y1 * scale),
+                    format_number((x1 - x0) * scale), format_number((y1 - y0) * scale)))
+
+        # 圆点用4段贝塞尔曲线近似
+        k = 0.5523
+        for x, y, radius in page.dots:
+            cx, cy, r = x * scale, height - y * scale, radius * scale
+            points = [(cx + r, cy), (cx + r, cy + k * r), (cx + k * r, cy + r), (cx, cy + r),
+                      (cx - k * r, cy + r), (cx - r, cy + k * r), (cx - r, cy),
+                      (cx - r, cy - k * r), (cx - k * r, cy - r), (cx, cy - r),
+                      (cx + k * r, cy - r), (cx + r, cy - k * r), (cx + r, cy)]
+            path = [b"%s %s m" % tuple(map(format_number, points[0]))]
+            for i in range(1, 13, 3):
+                path.append(b"%s %s %s %s %s %s c" % tuple(
+                    format_number(v) for point in points[i:i + 3] for v in point))
+            ops.append(b" ".join(path) + b" f")
+
+        fonts = {}
+        for path, font_index, _, size, x, baseline, text, offsets, x_stretch, y_stretch in page.texts:
+            entry = self._font(path, font_index)
+            font = entry["font"]
+            fonts[entry["name"]] = entry["ref"]
+
+            # 字号为1，字号与拉伸都放进文字矩阵；TJ里的调整量把字形移到布局算好的位置
+            run = []
+            for i, char in enumerate(text):
+                gid = font.glyph_id(char)
+                with self._lock:
+                    entry["used"].setdefault(gid, char)
+                run.append(b"<%04X>" % gid)
+                if i + 1 < len(text):
+                    adjust = font.advance(gid) - (offsets[i + 1] - offsets[i]) * 1000.0 / size
+                    if abs(adjust) > 0.001:
+                        run.append(format_number(adjust))
+            ops.append(b"BT /%s 1 Tf %s 0 0 %s %s %s Tm [%s] TJ ET" % (
+                entry["name"].encode("ascii"),
+                format_number(size * x_stretch * scale), format_number(size * y_stretch * scale),
+                format_number((x + offsets[0] * x_stretch) * scale if offsets else x * scale),
+                format_number(height - baseline * scale),
+                b" ".join(run)))
+
+        content = b"0 g 0 G\n" + b"\n".join(ops) + b"\n"
+        resources = {"Font": fonts} if fonts else {}
+        self.writer.add_page(page.width * scale, height, content, resources, index)
+
+    def _write_font(self, entry):
+        font = entry["font"]
+        used = entry["used"]
+        writer = self.writer
+
+        data = font.subset(used)
+        tag = "".join(chr(65 + b % 26) for b in hashlib.md5(repr(sorted(used)).encode()).digest()[:6])
+        base_font = Name(f"{tag}+{font.postscript_name}")
+        em = 1000.0 / font.units_per_em
+
+        font_file = writer.add_object({"Filter": Name("FlateDecode"), "Length1": len(data)}, zlib.compress(data))
+        descriptor = writer.add_object({
+            "Type": Name("FontDescriptor"),
+            "FontName": base_font,
+            "Flags": 4,
+            "FontBBox": [round(v * em) for v in font.bbox],
+            "ItalicAngle": 0,
+            "Ascent": round(font.ascent * em),
+            "Descent": round(font.descent * em),
+            "CapHeight": round(font.ascent * em),
+            "StemV": 80,
+            "FontFile2": font_file,
+        })
+        widths = []
+        for gid in sorted(used):
+            widths += [gid, [float(font.advance(gid))]]
+        cid_font = writer.add_object({
+            "Type": Name("Font"),
+            "Subtype": Name("CIDFontType2"),
+            "BaseFont": base_font,
+            "CIDSystemInfo": {"Registry": b"Adobe", "Ordering": b"Identity", "Supplement": 0},
+            "FontDescriptor": descriptor,
+            "W": widths,
+            "CIDToGIDMap": Name("Identity"),
+        })
+        to_unicode = writer.add_object({"Filter": Name("FlateDecode")}, zlib.compress(_to_unicode_cmap(used)))
+        writer.write_reserved(entry["ref"], {
+            "Type": Name("Font"),
+            "Subtype": Name("Type0"),
+            "BaseFont": base_font,
+            "Encoding": Name("Identity-H"),
+            "DescendantFonts": [cid_font],
+            "ToUnicode": to_unicode,
+        })
+
+    def close(self):
+        """嵌入字体子集，写尾部并关闭文件"""
+        if self.writer.closed:
+            return
+        try:
+            for entry in self._fonts.values():
+                self._write_font(entry)
+        finally:
+            self.writer.close()
+
+
+def _to_unicode_cmap(used):
+    """字形编号到Unicode的映射（CMap），每段最多100条"""
+    items = sorted(used.items())
+    lines = [b"/CIDInit /ProcSet findresource begin", b"12 dict begin", b"begincmap",
+             b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+             b"/CMapName /Adobe-Identity-UCS def", b"/CMapType 2 def",
+             b"1 begincodespacerange", b"<0000> <FFFF>", b"endcodespacerange"]
+    for start in range(0, len(items), 100):
+        block = items[start:start + 100]
+        lines.append(b"%d beginbfchar" % len(block))
+        for gid, char in block:
+            lines.append(b"<%04X> <%s>" % (gid, char.encode("utf-16-be").hex().upper().encode("ascii")))
+        lines.append(b"endbfchar")
+    lines += [b"endcmap", b"CMapName currentdict /CMap defineresource pop", b"end", b"end"]
+    return b"\n".join(lines) + b"\n"
@@ -1,10 +1,15 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont, ImageTk
+from PIL import ImageTk
 import os
+import sys
 import json
-import math
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from label_generator_core import LabelGeneratorCore, PDF_FILENAME
+import render_profile
+from progress_channel import ProgressChannel
 
 class CoordinateLabelGenerator:
     def __init__(self, root):
@@ -19,49 +24,13 @@ class CoordinateLabelGenerator:
         # 配置文件路径
         self.config_file = "label_generator_config.json"
         
-        # A4纸张尺寸（毫米）和对应像素（300dpi）
-        self.a4_width_mm = 210
-        self.a4_height_mm = 297
-        self.a4_width_px = 2480  # 300dpi下A4宽度像素
-        self.a4_height_px = 3508  # 300dpi下A4高度像素
-        self.mm_to_px = self.a4_width_px / self.a4_width_mm  # 毫米到像素的转换因子（约11.811像素/毫米）
-        
-        # 网格设置 - 统一为3毫米
-        self.grid_size_mm = 3  # 网格尺寸（毫米）
-        self.grid_size_px = int(round(self.grid_size_mm * self.mm_to_px))  # 转换为像素
-        
-        # 边距设置（毫米）
-        self.margin_left_mm = 10
-        self.margin_right_mm = 10
-        self.margin_top_mm = 10
-        self.margin_bottom_mm = 10
-        
-        # 转换为像素
-        self.margin_left_px = int(round(self.margin_left_mm * self.mm_to_px))
-        self.margin_right_px = int(round(self.margin_right_mm * self.mm_to_px))
-        self.margin_top_px = int(round(self.margin_top_mm * self.mm_to_px))
-        self.margin_bottom_px = int(round(self.margin_bottom_mm * self.mm_to_px))
-        
-        # 有效打印区域
-        self.print_width_px = self.a4_width_px - self.margin_left_px - self.margin_right_px
-        self.print_height_px = self.a4_height_px - self.margin_top_px - self.margin_bottom_px
-        
-        # 设置中文字体支持
-        self.system_fonts = ["simhei.ttf", "microsoftyahei.ttf", "simsun.ttc", "simkai.ttf", 
-                             "msyh.ttc", "msyhbd.ttc", "simfang.ttf"]
-        self.selected_font = None
+        # 渲染核心（与界面无关，可在命令行/测试中复用）
+        self.core = LabelGeneratorCore(self.config_file)
         
         # 数据存储
-        self.coordinates_df = None
-        self.devices_df = None
-        self.generated_images = []  # 存储所有生成的图像
         self.current_page = 0
         self.zoom_factor = 0.5  # 默认缩放比例
         
-        # 点标记设置（始终打印）
-        self.print_dot = True  # 强制打印点标记
-        self.dot_radius_px = 2  # 点标记半径（像素）
-        
         # 参数变量初始化 - 使用用户提供的默认参数
         self._init_variables()
         
@@ -117,6 +86,25 @@ class CoordinateLabelGenerator:
         
         # 网格打印选项
         self.print_grid_var = tk.BooleanVar(value=False)
+        
+        # 流式生成：不在内存中保留所有页面，预览按需渲染，导出时逐页写盘
+        self.stream_mode_var = tk.BooleanVar(value=True)
+        
+        # 渲染进程数（多进程并行渲染整页）
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        
+        # PNG导出设置：压缩级别0~9（越小越快、文件越大）、optimize、跳过内容未变的页面
+        self.compress_level_var = tk.IntVar(value=6)
+        self.png_optimize_var = tk.BooleanVar(value=False)
+        self.skip_unchanged_var = tk.BooleanVar(value=False)
+        
+        # 页面模式（RGB彩色 / L灰度 / 1单色）和导出格式（png / tiff，单色TIFF为Group-4压缩）
+        self.output_mode_var = tk.StringVar(value="RGB")
+        self.image_format_var = tk.StringVar(value="png")
+        
+        # 后台导出线程
+        self._export_thread = None
+        self._preview_pending = False  # 导出期间的翻页/缩放，导出完成后再刷新预览
     
     def _create_widgets(self):
         # 创建主框架
@@ -227,10 +215,36 @@ class CoordinateLabelGenerator:
         
         ttk.Checkbutton(print_frame, text="调试模式(显示3mm网格和标度)", variable=self.debug_mode_var).pack(anchor=tk.W, pady=2)
         ttk.Checkbutton(print_frame, text="导出时包含网格", variable=self.print_grid_var).pack(anchor=tk.W, pady=2)
+        ttk.Checkbutton(print_frame, text="流式生成(低内存，导出时逐页渲染)", variable=self.stream_mode_var).pack(anchor=tk.W, pady=2)
+        
+        workers_frame = ttk.Frame(print_frame)
+        workers_frame.pack(anchor=tk.W, pady=2)
+        ttk.Label(workers_frame, text="渲染进程数:").pack(side=tk.LEFT)
+        ttk.Entry(workers_frame, textvariable=self.workers_var, width=5).pack(side=tk.LEFT, padx=(5, 0))
+        
+        png_frame = ttk.Frame(print_frame)
+        png_frame.pack(anchor=tk.W, pady=2)
+        ttk.Label(png_frame, text="PNG压缩级别(0-9):").pack(side=tk.LEFT)
+        ttk.Spinbox(png_frame, from_=0, to=9, textvariable=self.compress_level_var, width=3).pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Checkbutton(png_frame, text="optimize", variable=self.png_optimize_var).pack(side=tk.LEFT)
+        ttk.Checkbutton(print_frame, text="跳过内容未变的页面", variable=self.skip_unchanged_var).pack(anchor=tk.W, pady=2)
+        
+        mode_frame = ttk.Frame(print_frame)
+        mode_frame.pack(anchor=tk.W, pady=2)
+        ttk.Label(mode_frame, text="页面模式:").pack(side=tk.LEFT)
+        ttk.Combobox(mode_frame, textvariable=self.output_mode_var, values=["RGB", "L", "1"],
+                     state="readonly", width=4).pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Label(mode_frame, text="格式:").pack(side=tk.LEFT)
+        ttk.Combobox(mode_frame, textvariable=self.image_format_var,
+                     values=["png", "tiff", "pdf", "pdf-vector", "svg"],
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(print_frame, text="L为灰度，1为单色(1位)，单色页面不显示调试图层", font=('Arial', 8)).pack(anchor=tk.W)
+        ttk.Label(print_frame, text="pdf: 所有页面写入一个多页PDF，一次送打印机", font=('Arial', 8)).pack(anchor=tk.W)
+        ttk.Label(print_frame, text="pdf-vector/svg: 矢量文字，不栅格化（不含网格）", font=('Arial', 8)).pack(anchor=tk.W)
         
         # 网格信息显示
-        ttk.Label(print_frame, text=f"网格尺寸: {self.grid_size_mm}mm", font=('Arial', 8)).pack(anchor=tk.W)
-        ttk.Label(print_frame, text=f"等效像素: {self.grid_size_px}px", font=('Arial', 8)).pack(anchor=tk.W)
+        ttk.Label(print_frame, text=f"网格尺寸: {self.core.grid_size_mm}mm", font=('Arial', 8)).pack(anchor=tk.W)
+        ttk.Label(print_frame, text=f"等效像素: {self.core.grid_size_px}px", font=('Arial', 8)).pack(anchor=tk.W)
         
         # 参数保存
         param_frame = ttk.Frame(content_frame)
@@ -290,340 +304,125 @@ class CoordinateLabelGenerator:
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
     def _browse_coord_file(self):
+        if self._is_exporting():
+            messagebox.showinfo("提示", "正在导出，请等待导出完成")
+            return
+        
         filename = filedialog.askopenfilename(
             filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")]
         )
         if filename:
             self.coord_file_var.set(filename)
             try:
-                self.coordinates_df = pd.read_csv(filename)
-                self.status_var.set(f"已加载坐标文件，包含 {len(self.coordinates_df)} 个点")
+                self.core.load_coordinates(filename)
+                self.status_var.set(f"已加载坐标文件，包含 {len(self.core.coordinates_df)} 个点")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取坐标文件: {str(e)}")
-                self.coordinates_df = None
+                self.core.coordinates_df = None
     
     def _browse_device_file(self):
+        if self._is_exporting():
+            messagebox.showinfo("提示", "正在导出，请等待导出完成")
+            return
+        
         filename = filedialog.askopenfilename(
-            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")]
+            filetypes=[("设备文件", "*.csv *.xlsx *.xls *.txt"), ("CSV文件", "*.csv"), ("所有文件", "*.*")]
         )
         if filename:
             self.device_file_var.set(filename)
             try:
-                self.devices_df = pd.read_csv(filename)
-                self.status_var.set(f"已加载设备文件，包含 {len(self.devices_df)} 个设备")
+                self.core.load_devices(filename)
+                self.status_var.set(f"已加载设备文件，包含 {len(self.core.devices)} 个设备")
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取设备文件: {str(e)}")
-                self.devices_df = None
-    
-    def _get_font(self, size):
-        if self.selected_font:
-            try:
-                return ImageFont.truetype(self.selected_font, size)
-            except:
-                pass
-                
-        # 尝试系统字体
-        for font_name in self.system_fonts:
-            try:
-                return ImageFont.truetype(font_name, size)
-            except:
-                continue
-                
-        # 如果都失败，使用默认字体
-        return ImageFont.load_default()
+                self.core.devices = None
     
-    def _calculate_positions(self, rows, columns):
-        """计算行列的平均间距位置"""
-        positions = []
-        
-        # 计算列间距（平均分布）
-        if columns > 1:
-            col_spacing = self.print_width_px / (columns - 1) * (self.x_spacing_var.get() / 100.0)
-        else:
-            col_spacing = 0
-            
-        # 计算行间距（平均分布）
-        if rows > 1:
-            row_spacing = self.print_height_px / (rows - 1) * (self.y_spacing_var.get() / 100.0)
-        else:
-            row_spacing = 0
-        
-        # 计算每个点的位置
-        for row in range(rows):
-            for col in range(columns):
-                x = self.margin_left_px + col * col_spacing
-                y = self.margin_top_px + row * row_spacing
-                positions.append((x, y))
-                
-        return positions
+    def _collect_params(self):
+        """从界面控件收集渲染参数（拉伸转换为比例）"""
+        return {
+            "rows": self.rows_var.get(),
+            "columns": self.columns_var.get(),
+            "points_per_page": self.points_per_page_var.get(),
+            "x_spacing": self.x_spacing_var.get(),
+            "y_spacing": self.y_spacing_var.get(),
+            "font_size": self.font_size_var.get(),
+            "spacing": self.spacing_var.get(),
+            "number_spacing": self.number_spacing_var.get(),
+            "x_offset": self.x_offset_var.get(),
+            "y_offset": self.y_offset_var.get(),
+            "x_stretch": self.x_stretch_var.get() / 100.0,
+            "y_stretch": self.y_stretch_var.get() / 100.0,
+            "debug_mode": self.debug_mode_var.get(),
+            "print_grid": self.print_grid_var.get(),
+            "print_dot": True,  # 强制打印点标记
+            "prefix_sprites": True,  # 拉伸时固定前缀只渲染缩放一次
+            "output_mode": self.output_mode_var.get()
+        }
     
-    def _draw_text_with_spacing(self, draw, text, x, y, font, spacing=0):
-        """在指定位置绘制带有字符间距的文本"""
-        current_x = x
-        for char in text:
-            # 绘制单个字符
-            draw.text((current_x, y), char, font=font, fill='black')
-            # 计算当前字符宽度并加上间距
-            char_width = draw.textlength(char, font=font)
-            current_x += char_width + spacing
-        return current_x - x  # 返回总宽度
+    def _on_page_generated(self, page, total_pages):
+        self.status_var.set(f"已生成第 {page}/{total_pages} 页")
+        self.root.update()
     
-    def _draw_debug_elements(self, draw, width, height, include_in_export=False):
-        """绘制调试元素：3毫米网格和毫米标度尺"""
-        # 只有在调试模式或设置了导出包含网格时才绘制
-        if not (self.debug_mode_var.get() or include_in_export):
-            return
-            
-        # 绘制3毫米网格（基于精确的毫米到像素转换）
-        grid_color = (200, 200, 200, 100) if self.debug_mode_var.get() else (200, 200, 200)
-        
-        # 横向网格线（Y方向）
-        for y in range(0, height, self.grid_size_px):
-            draw.line([(0, y), (width, y)], fill=grid_color, width=1)
-        
-        # 纵向网格线（X方向）
-        for x in range(0, width, self.grid_size_px):
-            draw.line([(x, 0), (x, height)], fill=grid_color, width=1)
-        
-        # 绘制毫米标度尺（边缘刻度）- 仅在调试模式显示
-        if self.debug_mode_var.get():
-            ruler_color = (100, 100, 100)
-            font = self._get_font(10)
-            mm_major_interval = 10  # 主刻度间隔（毫米）
-            mm_minor_interval = self.grid_size_mm  # 次刻度间隔（等于网格尺寸）
-            
-            # 转换为像素间隔
-            px_major_interval = int(round(mm_major_interval * self.mm_to_px))
-            px_minor_interval = self.grid_size_px  # 次刻度等于网格尺寸
-            
-            # 顶部标度尺
-            draw.line([(0, 0), (width, 0)], fill=ruler_color, width=2)
-            for x in range(0, width + 1, px_minor_interval):
-                # 计算对应的毫米值
-                mm_value = int(round(x / self.mm_to_px))
-                
-                # 主刻度（每10毫米）
-                if mm_value % mm_major_interval == 0:
-                    draw.line([(x, 0), (x, 15)], fill=ruler_color, width=2)
-                    draw.text((x - 10, 15), f"{mm_value}mm", font=font, fill=ruler_color)
-                else:
-                    # 次刻度（每3毫米，与网格对齐）
-                    draw.line([(x, 0), (x, 8)], fill=ruler_color, width=1)
-            
-            # 左侧标度尺
-            draw.line([(0, 0), (0, height)], fill=ruler_color, width=2)
-            for y in range(0, height + 1, px_minor_interval):
-                # 计算对应的毫米值
-                mm_value = int(round(y / self.mm_to_px))
-                
-                # 主刻度（每10毫米）
-                if mm_value % mm_major_interval == 0:
-                    draw.line([(0, y), (15, y)], fill=ruler_color, width=2)
-                    draw.text((15, y - 5), f"{mm_value}mm", font=font, fill=ruler_color)
-                else:
-                    # 次刻度（每3毫米，与网格对齐）
-                    draw.line([(0, y), (8, y)], fill=ruler_color, width=1)
+    def _on_device_error(self, index, error):
+        messagebox.showerror("错误", f"处理第 {index+1} 个设备时出错: {str(error)}")
     
     def _generate_all_pages(self):
-        if self.coordinates_df is None or self.devices_df is None:
+        if self.core.coordinates_df is None or self.core.devices is None:
             messagebox.showerror("错误", "请先加载坐标文件和设备文件")
             return
         
+        if self._is_exporting():
+            messagebox.showinfo("提示", "正在导出，请等待导出完成")
+            return
+        
+        if self.stream_mode_var.get():
+            # 流式模式只计算页数，预览时按需渲染当前页
+            with render_profile.phase("prepare_pages"):
+                total_pages = self.core.prepare_pages(self._collect_params())
+            self.current_page = 0
+            self._update_preview()
+            self.status_var.set(f"共 {total_pages} 页（流式模式，导出时逐页生成）")
+            render_profile.report("生成（流式）")
+            return
+        
         self.status_var.set("正在生成所有页面...")
         self.root.update()
         
-        try:
-            # 获取布局设置
-            rows = self.rows_var.get()
-            columns = self.columns_var.get()
-            points_per_page = min(self.points_per_page_var.get(), rows * columns)
-            total_devices = len(self.devices_df)
-            total_pages = max(1, (total_devices + points_per_page - 1) // points_per_page)
-            
-            # 计算行列平均分布的位置
-            base_positions = self._calculate_positions(rows, columns)
-            
-            # 获取参数
-            font_size = self.font_size_var.get()
-            spacing = self.spacing_var.get()
-            number_spacing = self.number_spacing_var.get()  # 获取数字间隔参数
-            x_offset = self.x_offset_var.get()
-            y_offset = self.y_offset_var.get()
-            x_stretch = self.x_stretch_var.get() / 100.0
-            y_stretch = self.y_stretch_var.get() / 100.0
-            debug_mode = self.debug_mode_var.get()
-            
-            self.generated_images = []
-            
-            # 为每一页生成图像
-            for page in range(total_pages):
-                start_idx = page * points_per_page
-                end_idx = min((page + 1) * points_per_page, total_devices)
-                
-                # 创建A4尺寸图像（300dpi: 2480 × 3508像素）
-                width, height = self.a4_width_px, self.a4_height_px
-                image = Image.new('RGB', (width, height), color='white')
-                draw = ImageDraw.Draw(image)
-                
-                # 创建调试图层
-                debug_layer = None
-                debug_draw = None
-                if debug_mode:
-                    debug_layer = Image.new('RGBA', (width, height), (255, 255, 255, 0))
-                    debug_draw = ImageDraw.Draw(debug_layer)
-                    self._draw_debug_elements(debug_draw, width, height)
-                
-                # 绘制实际网格（如果需要导出）
-                if self.print_grid_var.get():
-                    self._draw_debug_elements(draw, width, height, include_in_export=True)
-                
-                # 获取字体
-                font = self._get_font(font_size)
-                
-                # 处理当前页的每个设备
-                for i in range(start_idx, end_idx):
-                    pos_idx = i % len(base_positions)  # 循环使用计算出的位置
-                    
-                    try:
-                        # 获取计算好的坐标并应用偏移
-                        base_x, base_y = base_positions[pos_idx]
-                        x = base_x + x_offset
-                        y = base_y + y_offset
-                        
-                        # 获取设备信息
-                        device_code = self.devices_df.iloc[i]['device_code']
-                        password = self.devices_df.iloc[i]['password']
-                        
-                        # 准备要显示的文本
-                        label1 = "设备码："
-                        value1 = str(device_code)
-                        label2 = "密钥："
-                        value2 = str(password)
-                        
-                        # 计算标签文字宽度（不包含数字间隔）
-                        label1_width = draw.textlength(label1, font=font)
-                        label2_width = draw.textlength(label2, font=font)
-                        
-                        # 计算数字/值的宽度（包含数字间隔）
-                        if value1:
-                            char1_width = sum(draw.textlength(c, font=font) for c in value1)
-                            value1_width = char1_width + (len(value1) - 1) * number_spacing
-                        else:
-                            value1_width = 0
-                            
-                        if value2:
-                            char2_width = sum(draw.textlength(c, font=font) for c in value2)
-                            value2_width = char2_width + (len(value2) - 1) * number_spacing
-                        else:
-                            value2_width = 0
-                        
-                        # 总宽度（标签+值）
-                        total1_width = (label1_width + value1_width) * x_stretch
-                        total2_width = (label2_width + value2_width) * x_stretch
-                        
-                        # 计算文字位置（以坐标点为中心）
-                        text1_x = x - total1_width / 2
-                        text1_y = y - (font_size * y_stretch) - spacing
-                        
-                        text2_x = x - total2_width / 2
-                        text2_y = y + spacing
-                        
-                        # 绘制文字（支持拉伸变形）
-                        if x_stretch != 1.0 or y_stretch != 1.0:
-                            # 处理第一行文字：标签 + 带间隔的设备码
-                            temp_width = int(total1_width * 1.2)
-                            temp_height = int(font_size * 1.2)
-                            temp_img = Image.new('RGBA', (temp_width, temp_height), (255, 255, 255, 0))
-                            temp_draw = ImageDraw.Draw(temp_img)
-                            
-                            # 绘制标签（无间隔）
-                            temp_draw.text((0, 0), label1, font=font, fill='black')
-                            # 绘制设备码（有间隔）
-                            self._draw_text_with_spacing(temp_draw, value1, label1_width, 0, font, number_spacing)
-                            
-                            # 应用拉伸变形
-                            new_width = int(temp_width * x_stretch)
-                            new_height = int(temp_height * y_stretch)
-                            transformed_img = temp_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                            image.paste(transformed_img, (int(text1_x), int(text1_y)), transformed_img)
-                            
-                            # 处理第二行文字：标签 + 带间隔的密码
-                            temp_width2 = int(total2_width * 1.2)
-                            temp_height2 = int(font_size * 1.2)
-                            temp_img2 = Image.new('RGBA', (temp_width2, temp_height2), (255, 255, 255, 0))
-                            temp_draw2 = ImageDraw.Draw(temp_img2)
-                            
-                            # 绘制标签（无间隔）
-                            temp_draw2.text((0, 0), label2, font=font, fill='black')
-                            # 绘制密码（有间隔）
-                            self._draw_text_with_spacing(temp_draw2, value2, label2_width, 0, font, number_spacing)
-                            
-                            # 应用拉伸变形
-                            new_width2 = int(temp_width2 * x_stretch)
-                            new_height2 = int(temp_height2 * y_stretch)
-                            transformed_img2 = temp_img2.resize((new_width2, new_height2), Image.Resampling.LANCZOS)
-                            image.paste(transformed_img2, (int(text2_x), int(text2_y)), transformed_img2)
-                            
-                        else:
-                            # 正常绘制，不拉伸
-                            # 绘制标签（无间隔）
-                            draw.text((text1_x, text1_y), label1, font=font, fill='black')
-                            # 绘制设备码（有间隔）
-                            self._draw_text_with_spacing(draw, value1, text1_x + label1_width, text1_y, font, number_spacing)
-                            
-                            # 绘制标签（无间隔）
-                            draw.text((text2_x, text2_y), label2, font=font, fill='black')
-                            # 绘制密码（有间隔）
-                            self._draw_text_with_spacing(draw, value2, text2_x + label2_width, text2_y, font, number_spacing)
-                            
-                        # 绘制点标记（始终打印）
-                        draw.ellipse([
-                            (x - self.dot_radius_px, y - self.dot_radius_px),
-                            (x + self.dot_radius_px, y + self.dot_radius_px)
-                        ], fill='black')
-                            
-                        # 在调试模式下显示坐标信息
-                        if debug_mode and debug_draw:
-                            # 显示像素和毫米双坐标
-                            mm_x = round(x / self.mm_to_px, 1)
-                            mm_y = round(y / self.mm_to_px, 1)
-                            debug_draw.text((x + 10, y), f"({int(x)}px/{mm_x}mm, {int(y)}px/{mm_y}mm)", 
-                                          font=font, fill='red')
-                            
-                    except Exception as e:
-                        messagebox.showerror("错误", f"处理第 {i+1} 个设备时出错: {str(e)}")
-                        continue
-                
-                # 将调试图层合并到主图像
-                if debug_mode and debug_layer:
-                    image = Image.alpha_composite(image.convert('RGBA'), debug_layer).convert('RGB')
-                
-                self.generated_images.append(image)
-                self.status_var.set(f"已生成第 {page+1}/{total_pages} 页")
-                self.root.update()
-            
+        with render_profile.phase("generate_all_pages"):
+            success, total_pages = self.core.generate_all_pages(
+                self._collect_params(),
+                progress_callback=self._on_page_generated,
+                error_callback=self._on_device_error,
+                workers=max(1, self.workers_var.get())
+            )
+        render_profile.report("生成所有页面")
+        if success:
             self.current_page = 0
             self._update_preview()
             self.status_var.set(f"已完成所有 {total_pages} 页的生成")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"生成页面时出错: {str(e)}")
+        else:
+            messagebox.showerror("错误", f"生成页面时出错: {self.core.last_error}")
             self.status_var.set("生成失败")
     
     def _update_preview(self):
-        if not self.generated_images:
+        if self._is_exporting():
+            # 导出线程正在使用渲染核心（背景、字形缓存不是线程安全的），导出完成后再刷新
+            self._preview_pending = True
+            self.status_var.set("正在导出，预览将在导出完成后刷新")
+            return
+        total_pages = self.core.page_count()
+        if not total_pages:
             self.preview_canvas.delete("all")
             self.page_label_var.set("页: 0/0")
             return
         
-        total_pages = len(self.generated_images)
         self.page_label_var.set(f"页: {self.current_page+1}/{total_pages}")
         
         # 获取当前页图像并缩放 - 保持精确比例
-        current_image = self.generated_images[self.current_page]
+        current_image = self.core.get_page(self.current_page, error_callback=self._on_device_error)
         scaled_width = int(current_image.width * self.zoom_factor)
         scaled_height = int(current_image.height * self.zoom_factor)
-        preview_img = current_image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
+        preview_img = self.core.resize_image(current_image, scaled_width, scaled_height)
         
         # 转换为Tkinter可用的图像格式
         self.preview_photo = ImageTk.PhotoImage(preview_img)
@@ -637,12 +436,12 @@ class CoordinateLabelGenerator:
         self.preview_canvas.configure(scrollregion=self.preview_canvas.bbox("all"))
     
     def _prev_page(self):
-        if self.generated_images and self.current_page > 0:
+        if self.core.page_count() and self.current_page > 0:
             self.current_page -= 1
             self._update_preview()
     
     def _next_page(self):
-        if self.generated_images and self.current_page < len(self.generated_images) - 1:
+        if self.current_page < self.core.page_count() - 1:
             self.current_page += 1
             self._update_preview()
     
@@ -677,7 +476,8 @@ class CoordinateLabelGenerator:
             "x_stretch": self.x_stretch_var.get(),
             "y_stretch": self.y_stretch_var.get(),
             "debug_mode": self.debug_mode_var.get(),
-            "print_grid": self.print_grid_var.get()
+            "print_grid": self.print_grid_var.get(),
+            "output_mode": self.output_mode_var.get()
         }
         
         try:
@@ -712,6 +512,7 @@ class CoordinateLabelGenerator:
             self.y_stretch_var.set(config.get("y_stretch", 100))
             self.debug_mode_var.set(config.get("debug_mode", True))
             self.print_grid_var.set(config.get("print_grid", False))
+            self.output_mode_var.set(config.get("output_mode", "RGB"))
             
             self.status_var.set("已加载保存的参数")
         except Exception as e:
@@ -733,7 +534,8 @@ class CoordinateLabelGenerator:
             "x_stretch": 130,
             "y_stretch": 100,
             "debug_mode": True,
-            "print_grid": False
+            "print_grid": False,
+            "output_mode": "RGB"
         }
         
         self.points_per_page_var.set(default_params["points_per_page"])
@@ -750,41 +552,89 @@ class CoordinateLabelGenerator:
         self.y_stretch_var.set(default_params["y_stretch"])
         self.debug_mode_var.set(default_params["debug_mode"])
         self.print_grid_var.set(default_params["print_grid"])
+        self.output_mode_var.set(default_params["output_mode"])
         
         self.status_var.set("已加载默认参数")
     
+    def _is_exporting(self):
+        return self._export_thread is not None and self._export_thread.is_alive()
+    
     def _export_all_pages(self):
-        """导出与预览完全一致的图像"""
-        if not self.generated_images:
+        """导出与预览完全一致的图像（后台线程编码写盘，界面不阻塞）"""
+        if not self.core.page_count():
             messagebox.showerror("错误", "请先生成页面")
             return
         
-        self.status_var.set("正在导出所有页面...")
-        self.root.update()
+        if self._is_exporting():
+            messagebox.showinfo("提示", "正在导出，请等待导出完成")
+            return
         
-        try:
-            # 询问保存目录
-            output_dir = filedialog.askdirectory(title="选择导出目录")
-            if not output_dir:
-                self.status_var.set("导出取消")
-                return
-            
-            total_pages = len(self.generated_images)
-            
-            # 导出已生成的图像（与预览完全一致）
-            for page in range(total_pages):
-                # 直接保存已生成的图像，确保与预览一致
-                filename = os.path.join(output_dir, f"label_page_{page+1}.png")
-                self.generated_images[page].save(filename, dpi=(300, 300))
-                self.status_var.set(f"已导出第 {page+1}/{total_pages} 页")
-                self.root.update()
-            
-            self.status_var.set(f"所有 {total_pages} 页已成功导出")
-            messagebox.showinfo("成功", f"所有 {total_pages} 页已导出至:\n{output_dir}")
+        # 询问保存目录
+        output_dir = filedialog.askdirectory(title="选择导出目录")
+        if not output_dir:
+            self.status_var.set("导出取消")
+            return
+        
+        # 界面变量只在主线程读取
+        options = {
+            "workers": max(1, self.workers_var.get()),
+            "compress_level": min(9, max(0, self.compress_level_var.get())),
+            "optimize": self.png_optimize_var.get(),
+            "skip_unchanged": self.skip_unchanged_var.get(),
+            "image_format": self.image_format_var.get(),
+        }
+        
+        # PDF导出为目录下的单个多页文件
+        output_path = output_dir
+        if options["image_format"] in ("pdf", "pdf-vector"):
+            output_path = os.path.join(output_dir, PDF_FILENAME)
+        
+        # 后台线程只往通道里放事件，由主线程定时取出更新界面（进度按批合并）
+        events = ProgressChannel(self.root, {
+            "progress": self._on_page_exported,
+            "error": self._on_device_error,
+            "done": lambda success, total_pages: self._on_export_done(success, total_pages, output_path),
+        })
+        
+        def run():
+            # 无论成功与否都要投递结束事件，否则界面一直停在导出状态
+            result = (False, 0)
+            try:
+                with render_profile.phase("export_all_pages"):
+                    result = self.core.export_all_pages(
+                        output_dir,
+                        progress_callback=lambda page, total: events.post("progress", page, total),
+                        error_callback=lambda index, error: events.post("error", index, error),
+                        **options
+                    )
+            except Exception as e:
+                self.core.last_error = str(e)
+            finally:
+                events.post("done", *result)
+        
+        self.status_var.set("正在导出所有页面...")
+        self._export_thread = threading.Thread(target=run, daemon=True)
+        self._export_thread.start()
+        events.start(self._export_thread)
+    
+    def _on_page_exported(self, page, total_pages):
+        self.status_var.set(f"已导出第 {page}/{total_pages} 页")
+    
+    def _on_export_done(self, success, total_pages, output_dir):
+        # 结束事件是导出线程最后发出的，等它退出后渲染核心才能安全地用于预览
+        self._export_thread.join()
+        render_profile.report("导出所有页面")
+        if self._preview_pending:
+            self._preview_pending = False
+            self._update_preview()
+        if success:
+            skipped = self.core.export_skipped
+            note = f"（{skipped} 页内容未变，已跳过）" if skipped else ""
+            self.status_var.set(f"所有 {total_pages} 页已成功导出{note}")
+            messagebox.showinfo("成功", f"所有 {total_pages} 页已导出至:\n{output_dir}{note}")
             messagebox.showinfo("注意", "导出的图像与预览完全一致，包含所有标记点")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"导出页面时出错: {str(e)}")
+        else:
+            messagebox.showerror("错误", f"导出页面时出错: {self.core.last_error}")
             self.status_var.set("导出失败")
 
 if __name__ == "__main__":